@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark the cold start time of the scout command line.
+
+Every round starts a new python process that imports the cli and resolves a
+command, which is what each call of scout pays before any work is done. With
+python 3.7 or later the slowest imports of each command are listed from
+`python -X importtime`.
+
+    python benchmarks/cli_startup.py --command view --command load --rounds 5
+"""
+import logging
+import statistics
+import subprocess
+import sys
+import time
+
+import click
+
+from scout.commands.base import COMMANDS
+
+LOG = logging.getLogger(__name__)
+
+STARTUP_CODE = (
+    "import click\n"
+    "from scout.commands import cli\n"
+    "cli.get_command(click.Context(cli), {command!r})\n"
+)
+
+
+def run_startup(command, *options):
+    """Start a python process that resolves a scout command
+
+    Returns:
+        seconds(float), stderr(str)
+    """
+    args = [sys.executable] + list(options) + ['-c', STARTUP_CODE.format(command=command)]
+    start = time.perf_counter()
+    process = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                             universal_newlines=True)
+    seconds = time.perf_counter() - start
+    if process.returncode != 0:
+        raise click.ClickException("Could not start command {0}:\n{1}".format(
+            command, process.stderr))
+    return seconds, process.stderr
+
+
+def slowest_imports(importtime_lines, nr_imports):
+    """Return the top level imports with the longest cumulative time
+
+    Args:
+        importtime_lines(iterable(str)): Output from python -X importtime
+        nr_imports(int)
+
+    Returns:
+        imports(list(tuple)): [(<module>, <cumulative seconds>), ...]
+    """
+    imports = []
+    for line in importtime_lines:
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, module = line[len('import time:'):].split('|')
+        # Modules imported by other modules are indented
+        if module.startswith('  '):
+            continue
+        imports.append((module.strip(), int(cumulative) / 1e6))
+    return sorted(imports, key=lambda entry: entry[1], reverse=True)[:nr_imports]
+
+
+@click.command()
+@click.option('-c', '--command', 'commands', multiple=True,
+              type=click.Choice(sorted(COMMANDS)),
+              help='Command to start, defaults to all commands')
+@click.option('--rounds', default=5, show_default=True)
+@click.option('--imports', 'nr_imports', default=10, show_default=True,
+              help='Nr of slowest imports to list per command, 0 to skip')
+def cli(commands, rounds, nr_imports):
+    """Time the cold start of scout commands"""
+    for command in (commands or sorted(COMMANDS)):
+        timings = [run_startup(command)[0] for _ in range(rounds)]
+        click.echo("{0}\tbest {1:.3f}s\tmedian {2:.3f}s".format(
+            command, min(timings), statistics.median(timings)))
+
+        if not nr_imports:
+            continue
+        if sys.version_info < (3, 7):
+            LOG.warning("Listing imports needs python -X importtime, from python 3.7")
+            nr_imports = 0
+            continue
+        _, stderr = run_startup(command, '-X', 'importtime')
+        for module, seconds in slowest_imports(stderr.splitlines(), nr_imports):
+            click.echo("\t{0}\t{1:.3f}s".format(module, seconds))
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING)
+    cli()
@@ -0,0 +1,331 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark the load and query hot paths of scout on the demo data.
+
+A database is set up like `scout setup demo`, with the reduced reference files in
+scout/demo/resources that are written by scout/demo/resources/generate_test_data.py,
+and the demo case is loaded --cases times under new case ids to scale the database.
+Every benchmark is run for a number of rounds and the results are written as JSON,
+so the timings of two releases can be compared.
+
+The benchmark database is dropped before and after the run. With --mock the
+database is a mongomock client, where unordered bulk writes are run in order and
+index creation is skipped. The mock timings only check that the benchmarks run,
+they are not comparable to those of a mongod.
+
+    python benchmarks/hot_paths.py --uri mongodb://localhost:27017 --cases 10 -o 4.6.json
+    python benchmarks/hot_paths.py -b build_query:clinical_filter -b dashboard --rounds 10
+"""
+import json
+import logging
+import platform
+import statistics
+import time
+from datetime import datetime
+
+import click
+import yaml
+from cyvcf2 import VCF
+
+from scout import __version__
+from scout.adapter.client import get_connection
+from scout.adapter.mongo import MongoAdapter
+from scout.build import build_variant
+from scout.constants import SEVERE_SO_TERMS
+from scout.demo import load_path
+from scout.load.setup import setup_scout
+from scout.parse.variant import parse_variant
+from scout.parse.variant.headers import (parse_rank_results_header, parse_vep_header)
+from scout.server.blueprints.dashboard.controllers import get_dashboard_info
+from scout.server.blueprints.variants.controllers import variants as variants_controller
+
+LOG = logging.getLogger(__name__)
+
+DATABASE_NAME = 'scout-benchmark'
+INSTITUTE_ID = 'cust000'
+
+# Filters that are often used on the variants page, the clinical filter is the one of the
+# 'Clinical filter' button
+QUERY_FILTERS = {
+    'default': {
+        'variant_type': 'clinical',
+    },
+    'clinical_filter': {
+        'variant_type': 'clinical',
+        'region_annotations': ['exonic', 'splicing'],
+        'functional_annotations': SEVERE_SO_TERMS,
+        'clinsig': [4, 5],
+        'clinsig_confident_always_returned': True,
+        'gnomad_frequency': 0.01,
+        'gene_panels': ['panel1'],
+    },
+    'gene_panel': {
+        'variant_type': 'clinical',
+        'gene_panels': ['panel1'],
+        'gnomad_frequency': 0.01,
+    },
+    'region': {
+        'variant_type': 'clinical',
+        'chrom': '1',
+        'start': 1,
+        'end': 100000000,
+    },
+}
+
+
+class BenchmarkData(object):
+    """The database and demo case that the benchmarks run on
+
+    Args:
+        adapter(MongoAdapter): A database set up with `setup_database`
+        repeat(int): Read the VCF this many times in the parse and build benchmarks
+        threads(int): Nr of threads when updating compounds
+    """
+
+    def __init__(self, adapter, repeat=1, threads=None):
+        self.adapter = adapter
+        self.repeat = repeat
+        self.threads = threads
+        self.institute_obj = adapter.institute(INSTITUTE_ID)
+        self.case_obj = adapter.case_collection.find_one({'owner': INSTITUTE_ID})
+        self.vcf_path = self.case_obj['vcf_files']['vcf_snv']
+
+        vcf_obj = VCF(self.vcf_path)
+        self.rank_results_header = parse_rank_results_header(vcf_obj)
+        self.vep_header = parse_vep_header(vcf_obj)
+        self.individual_positions = {ind: i for i, ind in enumerate(vcf_obj.samples)}
+        self._parsed_variants = None
+
+    def parse_variants(self):
+        """Parse the variants of the demo VCF, repeat times
+
+        Returns:
+            parsed_variants(list(dict))
+        """
+        return [
+            parse_variant(
+                variant=variant,
+                case=self.case_obj,
+                rank_results_header=self.rank_results_header,
+                vep_header=self.vep_header,
+                individual_positions=self.individual_positions,
+                category='snv',
+            )
+            for _ in range(self.repeat) for variant in VCF(self.vcf_path)
+        ]
+
+    @property
+    def parsed_variants(self):
+        """The parsed variants of the demo VCF, parsed on first use"""
+        if self._parsed_variants is None:
+            self._parsed_variants = self.parse_variants()
+        return self._parsed_variants
+
+
+def time_parse_variant(data):
+    """Parse the variants of the demo VCF"""
+    start = time.perf_counter()
+    nr_variants = len(data.parse_variants())
+    return nr_variants, time.perf_counter() - start
+
+
+def time_build_variant(data):
+    """Build variant objects from parsed variants"""
+    parsed_variants = data.parsed_variants
+    hgncid_to_gene = data.adapter.hgncid_to_gene(build='37')
+    gene_to_panels = data.adapter.gene_to_panels(data.case_obj)
+
+    start = time.perf_counter()
+    for parsed_variant in parsed_variants:
+        build_variant(parsed_variant, INSTITUTE_ID, gene_to_panels=gene_to_panels,
+                      hgncid_to_gene=hgncid_to_gene)
+    return len(parsed_variants), time.perf_counter() - start
+
+
+def time_load_variants(data):
+    """Delete and load the clinical SNVs of the demo case, only the load is timed"""
+    case_obj = data.case_obj
+    data.adapter.delete_variants(case_obj['_id'], 'clinical', 'snv')
+
+    start = time.perf_counter()
+    nr_variants = data.adapter.load_variants(
+        case_obj, 'clinical', 'snv', rank_threshold=case_obj.get('rank_score_threshold', 0))
+    return nr_variants, time.perf_counter() - start
+
+
+def time_update_case_compounds(data):
+    """Update the compounds of all variants of the demo case"""
+    start = time.perf_counter()
+    nr_variants = data.adapter.update_case_compounds(data.case_obj, build='37',
+                                                     threads=data.threads)
+    return nr_variants, time.perf_counter() - start
+
+
+def build_query_benchmark(filter_name, nr_queries=1000):
+    """Return a benchmark that builds the mongo query of a filter"""
+    def time_build_query(data):
+        query = QUERY_FILTERS[filter_name]
+        start = time.perf_counter()
+        for _ in range(nr_queries):
+            data.adapter.build_query(data.case_obj['_id'], query=query)
+        return nr_queries, time.perf_counter() - start
+    return time_build_query
+
+
+def variants_controller_benchmark(filter_name, per_page=50):
+    """Return a benchmark that fetches and prepares the first page of the variants list"""
+    def time_variants_controller(data):
+        query = QUERY_FILTERS[filter_name]
+        start = time.perf_counter()
+        variants_query = data.adapter.variants(data.case_obj['_id'], query=query,
+                                               nr_of_variants=per_page + 1, projection='list')
+        page = variants_controller(data.adapter, data.institute_obj, data.case_obj,
+                                   variants_query, per_page=per_page)
+        return len(page['variants']), time.perf_counter() - start
+    return time_variants_controller
+
+
+def time_dashboard(data):
+    """Compute the dashboard statistics of the institute and of all institutes"""
+    start = time.perf_counter()
+    for institute_id in [INSTITUTE_ID, None]:
+        get_dashboard_info(data.adapter, institute_id=institute_id)
+    return 2, time.perf_counter() - start
+
+
+BENCHMARKS = {
+    'parse_variant': time_parse_variant,
+    'build_variant': time_build_variant,
+    'load_variants': time_load_variants,
+    'update_case_compounds': time_update_case_compounds,
+    'dashboard': time_dashboard,
+}
+for _filter_name in QUERY_FILTERS:
+    BENCHMARKS['build_query:' + _filter_name] = build_query_benchmark(_filter_name)
+    BENCHMARKS['variants_controller:' + _filter_name] = variants_controller_benchmark(
+        _filter_name)
+
+
+def setup_database(adapter, nr_cases=1):
+    """Set up a demo database with nr_cases copies of the demo case
+
+    Returns:
+        seconds(float)
+    """
+    start = time.perf_counter()
+    setup_scout(adapter, institute_id=INSTITUTE_ID, demo=True)
+
+    with open(load_path, 'r') as config_handle:
+        config_data = yaml.load(config_handle)
+    for case_nr in range(1, nr_cases):
+        config_data['family'] = 'benchmark_{0}'.format(case_nr)
+        config_data['family_name'] = 'benchmark_{0}'.format(case_nr)
+        adapter.load_case(config_data)
+    return time.perf_counter() - start
+
+
+def run_benchmark(benchmark, data, rounds):
+    """Run a benchmark for a number of rounds
+
+    Returns:
+        result(dict)
+    """
+    timings = []
+    nr_items = 0
+    for _ in range(rounds):
+        nr_items, seconds = benchmark(data)
+        timings.append(seconds)
+
+    best = min(timings)
+    return {
+        'items': nr_items,
+        'rounds': timings,
+        'best': best,
+        'median': statistics.median(timings),
+        'items_per_second': nr_items / best if best else None,
+    }
+
+
+def patch_mongomock(mongomock):
+    """Let mongomock run the writes of scout that it does not support
+
+    Unordered bulk writes are run in order and creating many indexes at once does nothing.
+    """
+    collection_class = mongomock.collection.Collection
+    bulk_write = collection_class.bulk_write
+
+    def ordered_bulk_write(self, requests, ordered=True, **kwargs):
+        return bulk_write(self, requests, **kwargs)
+
+    collection_class.bulk_write = ordered_bulk_write
+    if not hasattr(collection_class, 'create_indexes'):
+        collection_class.create_indexes = lambda self, indexes, **kwargs: []
+
+
+def get_database(uri, database_name, mock):
+    """Return a client and the benchmark database"""
+    if mock:
+        try:
+            import mongomock
+        except ImportError:
+            raise click.ClickException("--mock needs mongomock, pip install mongomock")
+        patch_mongomock(mongomock)
+        client = mongomock.MongoClient()
+    else:
+        client = get_connection(uri=uri)
+    return client, client[database_name]
+
+
+@click.command()
+@click.option('--uri', default='mongodb://localhost:27017', show_default=True)
+@click.option('--database', 'database_name', default=DATABASE_NAME, show_default=True,
+              help='Database to run the benchmarks in, it is dropped')
+@click.option('--mock', is_flag=True, help='Run against mongomock instead of a mongod')
+@click.option('-b', '--benchmark', 'benchmarks', multiple=True,
+              type=click.Choice(sorted(BENCHMARKS)),
+              help='Benchmark to run, defaults to all benchmarks')
+@click.option('--cases', 'nr_cases', default=1, show_default=True,
+              help='Nr of copies of the demo case in the database')
+@click.option('--repeat', default=1, show_default=True,
+              help='Read the demo VCF this many times in the parse and build benchmarks')
+@click.option('--rounds', default=3, show_default=True)
+@click.option('--threads', type=int, help='Nr of threads when updating compounds')
+@click.option('-o', '--output', type=click.File('w'), default='-',
+              help='File to write the JSON results to, defaults to stdout')
+def cli(uri, database_name, mock, benchmarks, nr_cases, repeat, rounds, threads, output):
+    """Time the load and query hot paths of scout and write the results as JSON"""
+    client, database = get_database(uri, database_name, mock)
+    client.drop_database(database_name)
+    adapter = MongoAdapter(database)
+
+    try:
+        LOG.info("Setting up a database with %s cases", nr_cases)
+        setup_seconds = setup_database(adapter, nr_cases)
+        data = BenchmarkData(adapter, repeat=repeat, threads=threads)
+
+        results = {}
+        for name in (benchmarks or sorted(BENCHMARKS)):
+            LOG.info("Running %s", name)
+            results[name] = run_benchmark(BENCHMARKS[name], data, rounds)
+            LOG.info("%s: best %.3fs", name, results[name]['best'])
+        nr_variants = adapter.variant_collection.count_documents({})
+    finally:
+        client.drop_database(database_name)
+
+    report = {
+        'scout_version': __version__,
+        'python_version': platform.python_version(),
+        'database': 'mongomock' if mock else client.server_info().get('version'),
+        'created_at': datetime.now().isoformat(),
+        'settings': {'cases': nr_cases, 'repeat': repeat, 'rounds': rounds, 'threads': threads},
+        'setup_seconds': setup_seconds,
+        'nr_variants': nr_variants,
+        'benchmarks': results,
+    }
+    json.dump(report, output, indent=2, sort_keys=True)
+    output.write('\n')
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING)
+    cli()
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark the rank score filter that runs before variants are parsed.
+
+Compares reading the rank score one record at a time with the chunked numpy
+filter used by the variant loader, in records per second.
+
+    python benchmarks/rank_filter.py --threshold 5 --repeat 50
+"""
+import logging
+import time
+
+import click
+from cyvcf2 import VCF
+
+from scout.adapter.mongo.variant_loader import rank_filter
+from scout.demo import research_snv_path
+from scout.parse.variant.rank_score import parse_rank_score
+
+LOG = logging.getLogger(__name__)
+
+CASE_ID = 'internal_id'
+
+
+def record_filter(variants, case_id, rank_threshold):
+    """Skip variants below the threshold one record at a time"""
+    for variant in variants:
+        rank_score = parse_rank_score(variant.INFO.get('RankScore'), case_id)
+        if (rank_score is None) or (rank_score > rank_threshold) or ('MT' in variant.CHROM):
+            yield variant
+
+
+def time_filter(vcf_path, filter_function, case_id, rank_threshold, repeat=1):
+    """Return the number of records read and passed and the time it took
+
+    The file is read repeat times to simulate a larger file.
+    """
+    nr_read = 0
+
+    def count_records(vcf_path):
+        nonlocal nr_read
+        for _ in range(repeat):
+            for variant in VCF(vcf_path):
+                nr_read += 1
+                yield variant
+
+    start = time.perf_counter()
+    nr_passed = sum(1 for _ in filter_function(count_records(vcf_path), case_id, rank_threshold))
+    return nr_read, nr_passed, time.perf_counter() - start
+
+
+@click.command()
+@click.option('--vcf', 'vcf_path', default=research_snv_path, show_default=True,
+              type=click.Path(exists=True))
+@click.option('--case-id', default=CASE_ID, show_default=True)
+@click.option('--threshold', default=5.0, show_default=True)
+@click.option('--repeat', default=1, show_default=True,
+              help='Read the file this many times in each round')
+@click.option('--rounds', default=3, show_default=True)
+def cli(vcf_path, case_id, threshold, repeat, rounds):
+    """Time the rank score filters on a VCF"""
+    for name, filter_function in [('record', record_filter), ('numpy', rank_filter)]:
+        best = None
+        for _ in range(rounds):
+            nr_read, nr_passed, seconds = time_filter(vcf_path, filter_function, case_id,
+                                                      threshold, repeat)
+            best = seconds if best is None else min(best, seconds)
+        click.echo("{0}\t{1} records\t{2} passed\t{3:.3f}s\t{4:.0f} records/s".format(
+            name, nr_read, nr_passed, best, nr_read / best))
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.WARNING)
+    cli()
@@ -1,4 +1,2 @@
 # -*- coding: utf-8 -*-
-from pkg_resources import get_distribution
-
-__version__ = get_distribution('scout-browser').version
+from .__version__ import __version__
@@ -43,13 +43,18 @@ from .acmg import ACMGHandler
 from .index import IndexHandler
 from .clinvar import ClinVarHandler
 from .matchmaker import MMEHandler
+from .cache import (CacheHandler, REFERENCE_CACHE)
+from .dashboard import DashboardHandler
+from .causative import CausativeHandler
+from .variant_stats import VariantStatsHandler
 
 log = logging.getLogger(__name__)
 
 class MongoAdapter(GeneHandler, CaseHandler, InstituteHandler, EventHandler,
                    HpoHandler, PanelHandler, QueryHandler, VariantHandler,
                    UserHandler, ACMGHandler, IndexHandler, ClinVarHandler,
-                   MMEHandler):
+                   MMEHandler, CacheHandler, DashboardHandler, CausativeHandler,
+                   VariantStatsHandler):
 
     """Adapter for cummunication with a mongo database."""
 
@@ -62,6 +67,7 @@ class MongoAdapter(GeneHandler, CaseHandler, InstituteHandler, EventHandler,
         host = app.config.get('MONGO_HOST', 'localhost')
         port = app.config.get('MONGO_PORT', 27017)
         dbname = app.config['MONGO_DBNAME']
+        REFERENCE_CACHE.maxsize = app.config.get('REFERENCE_CACHE_SIZE', REFERENCE_CACHE.maxsize)
         log.info("connecting to database: %s:%s/%s", host, port, dbname)
         self.setup(app.config['MONGO_DATABASE'])
 
@@ -83,6 +89,12 @@ class MongoAdapter(GeneHandler, CaseHandler, InstituteHandler, EventHandler,
         self.clinvar_submission_collection = database.clinvar_submission
         self.exon_collection = database.exon
         self.transcript_collection = database.transcript
+        self.coding_interval_collection = database.coding_interval
+        self.reference_version_collection = database.reference_version
+        self.dashboard_stats_collection = database.dashboard_stats
+        self.causative_collection = database.causative
+        # Versions of the cached reference data, see cache.py
+        self.reference_versions = {}
 
     def collections(self):
         """Return all collection names
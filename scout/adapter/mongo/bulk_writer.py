@@ -0,0 +1,240 @@
+"""
+bulk_writer.py
+
+Insert documents with unordered bulk writes in a background thread.
+
+Documents are collected until a bulk reaches a max size in bytes or documents,
+the bulk is then inserted by a writer thread while the caller continues to
+parse the next documents. Only a few bulks are waiting at a time, so a slow
+database holds back the parsing instead of filling the memory.
+
+When variants are written the variants that already exist are found from the
+errors of the insert and their compounds are updated with one more bulk
+write, like `upsert_variant` does for a single variant. In a shadow load the
+variants are tagged with the load generation and written as upserts, so a
+variant that is loaded twice replaces the staged one.
+"""
+import logging
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from bson import BSON
+from pymongo import (ReplaceOne, UpdateOne)
+from pymongo.errors import BulkWriteError
+from pymongo.write_concern import WriteConcern
+
+from scout.exceptions import IntegrityError
+
+LOG = logging.getLogger(__name__)
+
+# Error code from mongodb when a document with the same _id exists
+DUPLICATE_KEY_ERROR = 11000
+
+# Max size of the documents in one bulk, well below the 48MB of a mongodb message
+MAX_BULK_BYTES = 8 * 1024 * 1024
+MAX_BULK_DOCUMENTS = 10000
+
+# Nr of bulks that can wait for the writer thread
+MAX_PENDING_BULKS = 2
+
+
+class BulkWriter(object):
+    """Insert documents in bulks of bounded size from a background thread
+
+    Use as a context manager, all documents are written when the block is left.
+
+    Args:
+        collection(pymongo.Collection)
+        write_concern(dict): Options for pymongo.write_concern.WriteConcern, e.g.
+                             {'w': 1, 'j': False}. The write concern of the
+                             collection is used if None
+        max_bytes(int): Max size of the encoded documents in one bulk
+        max_documents(int): Max number of documents in one bulk
+        max_pending(int): Max number of bulks waiting to be written
+    """
+
+    def __init__(self, collection, write_concern=None, max_bytes=MAX_BULK_BYTES,
+                 max_documents=MAX_BULK_DOCUMENTS, max_pending=MAX_PENDING_BULKS):
+        if write_concern:
+            collection = collection.with_options(write_concern=WriteConcern(**write_concern))
+        self.collection = collection
+        self.max_bytes = max_bytes
+        self.max_documents = max_documents
+        self.max_pending = max_pending
+
+        self.nr_inserted = 0
+        self.nr_updated = 0
+        self.nr_bulks = 0
+
+        self._bulk = []
+        self._bulk_bytes = 0
+        self._pending = deque()
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._closed = False
+
+    def add(self, document):
+        """Add a document to the current bulk, and send the bulk to the writer when it is full
+
+        Args:
+            document(dict)
+        """
+        document_bytes = len(BSON.encode(document))
+        if self._bulk and (self._bulk_bytes + document_bytes > self.max_bytes or
+                           len(self._bulk) >= self.max_documents):
+            self.flush()
+        self._bulk.append(document)
+        self._bulk_bytes += document_bytes
+
+    def add_many(self, documents):
+        """Add documents to the writer
+
+        Args:
+            documents(iterable(dict))
+        """
+        for document in documents:
+            self.add(document)
+
+    def flush(self):
+        """Send the current bulk to the writer thread
+
+        Waits for the oldest bulk if too many bulks are pending, errors from
+        the writer are raised here.
+        """
+        if not self._bulk:
+            return
+        while len(self._pending) >= self.max_pending:
+            self._pending.popleft().result()
+        self._pending.append(self._executor.submit(self._write_bulk, self._bulk))
+        self._bulk = []
+        self._bulk_bytes = 0
+
+    def close(self):
+        """Write the remaining variants and wait for the writer thread
+
+        Returns:
+            nr_inserted(int): Nr of new documents
+        """
+        if self._closed:
+            return self.nr_inserted
+        self._closed = True
+        try:
+            self.flush()
+            while self._pending:
+                self._pending.popleft().result()
+        finally:
+            self._executor.shutdown(wait=True)
+        LOG.debug("Inserted %s documents and updated %s existing documents in %s bulks",
+                  self.nr_inserted, self.nr_updated, self.nr_bulks)
+        return self.nr_inserted
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+            return
+        # Leave the database as it is when the error is raised
+        self._closed = True
+        for future in self._pending:
+            future.cancel()
+        self._executor.shutdown(wait=True)
+
+    def _write_bulk(self, documents):
+        """Insert a bulk of documents and update the ones that exist"""
+        try:
+            result = self.collection.insert_many(documents, ordered=False)
+            nr_inserted = len(result.inserted_ids)
+            existing = []
+        except BulkWriteError as err:
+            nr_inserted = err.details['nInserted']
+            existing = duplicate_documents(err, documents)
+
+        if existing:
+            self.update_existing(existing)
+
+        self.nr_inserted += nr_inserted
+        self.nr_updated += len(existing)
+        self.nr_bulks += 1
+        return nr_inserted
+
+    def update_existing(self, documents):
+        """Handle documents that could not be inserted since they exist
+
+        Args:
+            documents(list(dict))
+
+        Raises:
+            IntegrityError: Documents are expected to be new
+        """
+        raise IntegrityError("{0} documents already exist in {1}, e.g. {2}".format(
+            len(documents), self.collection.name, documents[0].get('_id')))
+
+
+class VariantBulkWriter(BulkWriter):
+    """Insert variants in bulks of bounded size from a background thread
+
+    Variants that already exist get their compounds updated. If a load generation
+    is given the variants are tagged with it and upserted, replacing existing variants.
+    The collection is then the staging collection, see `VariantLoader.load_variant_files`.
+
+    Args:
+        generation(str): Id of the load that the variants belong to
+        See BulkWriter for the other arguments
+    """
+
+    def __init__(self, collection, generation=None, **kwargs):
+        super(VariantBulkWriter, self).__init__(collection, **kwargs)
+        self.generation = generation
+
+    def add(self, variant_obj):
+        if self.generation:
+            variant_obj['load_generation'] = self.generation
+        super(VariantBulkWriter, self).add(variant_obj)
+
+    def _write_bulk(self, variant_objs):
+        """Upsert a bulk of variants in a shadow load, otherwise insert them"""
+        if not self.generation:
+            return super(VariantBulkWriter, self)._write_bulk(variant_objs)
+
+        result = self.collection.bulk_write(
+            [ReplaceOne({'_id': variant_obj['_id']}, variant_obj, upsert=True)
+             for variant_obj in variant_objs],
+            ordered=False
+        )
+        self.nr_inserted += result.upserted_count
+        self.nr_updated += result.matched_count
+        self.nr_bulks += 1
+        return result.upserted_count
+
+    def update_existing(self, variant_objs):
+        """Update the compounds of the variants that exist with one bulk write"""
+        requests = [
+            UpdateOne({'_id': variant_obj['_id']},
+                      {'$set': {'compounds': variant_obj.get('compounds', [])}})
+            for variant_obj in variant_objs
+        ]
+        self.collection.bulk_write(requests, ordered=False)
+        LOG.debug("Updated %s existing variants", len(variant_objs))
+
+
+def duplicate_documents(err, documents):
+    """Return the documents of a bulk insert that failed since they already exist
+
+    Args:
+        err(pymongo.errors.BulkWriteError)
+        documents(list(dict)): The documents that were inserted
+
+    Returns:
+        duplicates(list(dict))
+
+    Raises:
+        BulkWriteError: If a document failed for another reason
+    """
+    duplicates = []
+    for write_error in err.details['writeErrors']:
+        if write_error['code'] != DUPLICATE_KEY_ERROR:
+            raise err
+        duplicates.append(documents[write_error['index']])
+    return duplicates
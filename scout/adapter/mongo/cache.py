@@ -0,0 +1,150 @@
+"""
+cache.py
+
+A process wide cache for reference data such as genes, transcripts, gene panels
+and disease terms.
+
+The cache is shared by everything that runs in the same process, that is the
+web server and the CLI loaders. Every entry is stored together with the
+version of its namespace ('genes', 'panels', 'diseases' or 'hpo'). The versions live
+in the database and are replaced whenever the reference data of a namespace
+is changed, so entries that were fetched before the change will never be
+returned again and are eventually evicted.
+"""
+import logging
+import threading
+
+from collections import OrderedDict
+from copy import deepcopy
+from datetime import datetime
+
+from bson import ObjectId
+
+LOG = logging.getLogger(__name__)
+
+REFERENCE_NAMESPACES = ('genes', 'panels', 'diseases', 'hpo')
+
+_MISSING = object()
+
+
+class ReferenceCache(object):
+    """A thread safe LRU cache with a bounded number of entries
+
+    Args:
+        maxsize(int): Max number of entries before the least recently used is evicted
+        check_interval(int): Nr of seconds a version read from the database is trusted
+    """
+
+    def __init__(self, maxsize=5000, check_interval=30):
+        self.maxsize = maxsize
+        self.check_interval = check_interval
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the value for a key or _MISSING if it is not cached"""
+        with self._lock:
+            value = self._entries.get(key, _MISSING)
+            if value is _MISSING:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        """Add a value to the cache and evict the least recently used entries"""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Remove all entries from the cache"""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+REFERENCE_CACHE = ReferenceCache()
+
+
+class CacheHandler(object):
+    """Methods to cache reference data fetched by the mongo adapter"""
+
+    def reference_version(self, namespace):
+        """Return the current version of a reference namespace
+
+        The version is read from the database at most once per check interval.
+        If the namespace has no version yet a new one is created.
+
+        Args:
+            namespace(str): choices=REFERENCE_NAMESPACES
+
+        Returns:
+            version(ObjectId)
+        """
+        now = datetime.now()
+        version, checked_at = self.reference_versions.get(namespace, (None, None))
+        if version and (now - checked_at).total_seconds() < REFERENCE_CACHE.check_interval:
+            return version
+
+        version_obj = self.reference_version_collection.find_one({'_id': namespace})
+        if not version_obj:
+            return self.update_reference_version(namespace)
+
+        version = version_obj['version']
+        self.reference_versions[namespace] = (version, now)
+        return version
+
+    def update_reference_version(self, namespace):
+        """Give a reference namespace a new version
+
+        This invalidates all cached entries of the namespace, in all processes
+        that use the same database.
+
+        Args:
+            namespace(str): choices=REFERENCE_NAMESPACES
+
+        Returns:
+            version(ObjectId)
+        """
+        if namespace not in REFERENCE_NAMESPACES:
+            raise ValueError("Invalid reference namespace {0}".format(namespace))
+        version = ObjectId()
+        LOG.debug("Updating version of %s to %s", namespace, version)
+        self.reference_version_collection.update_one(
+            {'_id': namespace},
+            {'$set': {'version': version, 'updated_at': datetime.now()}},
+            upsert=True
+        )
+        self.reference_versions[namespace] = (version, datetime.now())
+        return version
+
+    def cached(self, namespace, key, fetch, copy=False):
+        """Return a cached reference object, fetch it from the database if needed
+
+        Args:
+            namespace(str): choices=REFERENCE_NAMESPACES
+            key(tuple): Identifies the object within the namespace
+            fetch(callable): Called without arguments to get the object from database
+            copy(bool): If a copy should be returned, use when the caller modifies the object
+
+        Returns:
+            The cached object
+        """
+        cache_key = (namespace, self.reference_version(namespace)) + tuple(key)
+        value = REFERENCE_CACHE.get(cache_key)
+        if value is _MISSING:
+            value = fetch()
+            REFERENCE_CACHE.set(cache_key, value)
+        if copy:
+            return deepcopy(value)
+        return value
@@ -2,6 +2,7 @@
 from copy import deepcopy
 import logging
 import datetime
+import re
 
 from pprint import pprint as pp
 
@@ -15,6 +16,9 @@ from scout.exceptions import IntegrityError, ConfigError
 
 LOG = logging.getLogger(__name__)
 
+# Characters that separate the words of a case search key
+SEARCH_KEY_SEPARATORS = re.compile(r'[\s_\-.,;@]+')
+
 class CaseHandler(object):
     """Part of the pymongo adapter that handles cases and institutes"""
 
@@ -96,10 +100,7 @@ class CaseHandler(object):
 
         if name_query:
             name_value = name_query.split(':')[-1] # capture ant value provided after query descriptor
-            users = self.user_collection.find({'name': {'$regex': name_query, '$options': 'i'}})
-            if users.count() > 0:
-                query['assignees'] = {'$in': [user['email'] for user in users]}
-            elif name_query.startswith('HP:'):
+            if name_query.startswith('HP:'):
                 LOG.debug("HPO case query")
                 if name_value:
                     query['phenotype_terms.phenotype_id'] = name_query
@@ -128,10 +129,10 @@ class CaseHandler(object):
             elif name_query.startswith('is_research'):
                 query['is_research'] = {'$exists': True, '$eq': True}
             else:
-                query['$or'] = [
-                    {'display_name': {'$regex': name_query}},
-                    {'individuals.display_name': {'$regex': name_query}},
-                ]
+                # Prefix of a display name, individual, assignee, cohort or HPO term
+                query['search_keys'] = {
+                    '$regex': '^' + re.escape(normalize_search_key(name_query))
+                }
 
         if yield_query:
             return query
@@ -160,6 +161,100 @@ class CaseHandler(object):
 
         return nr_cases
 
+    def nr_cases_by_institute(self, institute_ids):
+        """Return the number of cases of many institutes with one aggregation
+
+        A case is counted for every institute that collaborates on it.
+
+        Args:
+            institute_ids(iterable(str))
+
+        Returns:
+            nr_cases(dict): {<institute_id>: <nr_cases>}, 0 for institutes without cases
+        """
+        institute_ids = list(institute_ids)
+        pipeline = [
+            {'$match': {'collaborators': {'$in': institute_ids}}},
+            {'$unwind': '$collaborators'},
+            {'$match': {'collaborators': {'$in': institute_ids}}},
+            {'$group': {'_id': '$collaborators', 'count': {'$sum': 1}}},
+        ]
+        nr_cases = {institute_id: 0 for institute_id in institute_ids}
+        for group in self.case_collection.aggregate(pipeline):
+            nr_cases[group['_id']] = group['count']
+
+        return nr_cases
+
+
+    def case_search_keys(self, case_obj):
+        """Return the keys that a case is found by in the case search
+
+        The keys are the lower case display name of the case, the display names of the
+        individuals, the assignees with their names, the cohorts and the HPO terms. Each
+        value is added both whole and split into words, so that a search for the prefix
+        of any word finds the case.
+
+        Args:
+            case_obj(dict)
+
+        Returns:
+            search_keys(list(str))
+        """
+        values = [case_obj.get('display_name')]
+        values.extend(ind.get('display_name') for ind in case_obj.get('individuals') or [])
+        values.extend(case_obj.get('cohorts') or [])
+        values.extend(term.get('phenotype_id') for term in case_obj.get('phenotype_terms') or [])
+
+        assignees = case_obj.get('assignees') or []
+        values.extend(assignees)
+        if assignees:
+            users = self.user_collection.find({'_id': {'$in': assignees}}, {'name': 1})
+            values.extend(user_obj.get('name') for user_obj in users)
+
+        search_keys = set()
+        for value in values:
+            if not value:
+                continue
+            search_key = normalize_search_key(value)
+            search_keys.add(search_key)
+            search_keys.update(word for word in SEARCH_KEY_SEPARATORS.split(search_key) if word)
+
+        return sorted(search_keys)
+
+    def update_case_search_keys(self, case_obj):
+        """Store the search keys of a case
+
+        Call this when the display names, individuals, assignees, cohorts or HPO terms
+        of a case are changed.
+
+        Args:
+            case_obj(dict)
+
+        Returns:
+            case_obj(dict): The case with the new search keys
+        """
+        if not case_obj:
+            return case_obj
+        search_keys = self.case_search_keys(case_obj)
+        self.case_collection.update_one(
+            {'_id': case_obj['_id']},
+            {'$set': {'search_keys': search_keys}}
+        )
+        case_obj['search_keys'] = search_keys
+        return case_obj
+
+    def rebuild_case_search_keys(self):
+        """Store the search keys of all cases
+
+        Returns:
+            nr_cases(int): Nr of cases updated
+        """
+        LOG.info("Updating the search keys of all cases")
+        nr_cases = 0
+        for case_obj in self.case_collection.find():
+            self.update_case_search_keys(case_obj)
+            nr_cases += 1
+        return nr_cases
 
     def update_dynamic_gene_list(self, case, hgnc_symbols=None, hgnc_ids=None,
                                  phenotype_ids=None, build='37'):
@@ -271,10 +366,14 @@ class CaseHandler(object):
             query['owner'] = institute_id
             query['display_name'] = display_name
 
+        case_obj = self.case_collection.find_one(query, {'owner': 1, 'collaborators': 1})
         result = self.case_collection.delete_one(query)
+        if case_obj:
+            self.delete_causative_index(case_obj['_id'])
+            self.expire_case_dashboard_stats(case_obj)
         return result
 
-    def load_case(self, config_data, update=False):
+    def load_case(self, config_data, update=False, workers=1, shadow=False):
         """Load a case into the database
 
         Check if the owner and the institute exists.
@@ -282,6 +381,9 @@ class CaseHandler(object):
         Args:
             config_data(dict): A dictionary with all the necessary information
             update(bool): If existing case should be updated
+            workers(int): Number of variant files to load at the same time
+            shadow(bool): Replace the variants of an existing case with a shadow load, the
+                          case keeps its variants until the new ones are loaded
 
         Returns:
             case_obj(dict)
@@ -315,28 +417,24 @@ class CaseHandler(object):
             {'file_name': 'vcf_str', 'variant_type': 'clinical', 'category': 'str'}
         ]
 
-        try:
-            for vcf_file in files:
-                # Check if file exists
-                if not case_obj['vcf_files'].get(vcf_file['file_name']):
-                    LOG.debug("didn't find {}, skipping".format(vcf_file['file_name']))
-                    continue
-
-                variant_type = vcf_file['variant_type']
-                category = vcf_file['category']
-                if update:
-                    self.delete_variants(
-                        case_id=case_obj['_id'],
-                        variant_type=variant_type,
-                        category=category
-                    )
-                self.load_variants(
-                    case_obj=case_obj,
-                    variant_type=variant_type,
-                    category=category,
-                    rank_threshold=case_obj.get('rank_score_threshold', 0),
-                )
+        jobs = []
+        for vcf_file in files:
+            # Check if file exists
+            if not case_obj['vcf_files'].get(vcf_file['file_name']):
+                LOG.debug("didn't find {}, skipping".format(vcf_file['file_name']))
+                continue
+
+            jobs.append({
+                'case_obj': case_obj,
+                'variant_type': vcf_file['variant_type'],
+                'category': vcf_file['category'],
+                'rank_threshold': case_obj.get('rank_score_threshold', 0),
+                'delete': update,
+            })
 
+        try:
+            self.load_variant_files(jobs, workers=workers,
+                                    shadow=bool(shadow and existing_case))
         except (IntegrityError, ValueError, ConfigError, KeyError) as error:
             LOG.warning(error)
 
@@ -345,6 +443,9 @@ class CaseHandler(object):
         else:
             LOG.info('Loading case %s into database', case_obj['display_name'])
             self._add_case(case_obj)
+            # The variants were loaded before the case existed
+            if jobs:
+                case_obj['variant_counts'] = self.update_variant_counts(case_obj['_id'])
 
         return case_obj
 
@@ -359,7 +460,10 @@ class CaseHandler(object):
         if self.case(case_obj['_id']):
             raise IntegrityError("Case %s already exists in database" % case_obj['_id'])
 
-        return self.case_collection.insert_one(case_obj)
+        case_obj['search_keys'] = self.case_search_keys(case_obj)
+        result = self.case_collection.insert_one(case_obj)
+        self.expire_case_dashboard_stats(case_obj)
+        return result
 
     def update_case(self, case_obj):
         """Update a case in the database
@@ -426,6 +530,9 @@ class CaseHandler(object):
             },
             return_document=pymongo.ReturnDocument.AFTER
         )
+        self.update_causative_index(updated_case)
+        updated_case = self.update_case_search_keys(updated_case)
+        self.expire_case_dashboard_stats(updated_case)
 
         LOG.info("Case updated")
         return updated_case
@@ -447,12 +554,14 @@ class CaseHandler(object):
         # update updated_at of case to "today"
 
         case_obj['updated_at'] = datetime.datetime.now(),
+        case_obj['search_keys'] = self.case_search_keys(case_obj)
 
         updated_case = self.case_collection.find_one_and_replace(
             {'_id': case_obj['_id']},
             case_obj,
             return_document=pymongo.ReturnDocument.AFTER
         )
+        self.update_causative_index(updated_case)
 
         return updated_case
 
@@ -503,12 +612,20 @@ class CaseHandler(object):
             )
 
         # insert the updated case
+        new_case['search_keys'] = self.case_search_keys(new_case)
         self.case_collection.insert_one(new_case)
         # delete the old case
         self.case_collection.find_one_and_delete({'_id': case_obj['_id']})
+        # the causatives of the new case are indexed when its variants are loaded
+        self.delete_causative_index(case_obj['_id'])
         return new_case
 
 
+def normalize_search_key(value):
+    """Return the form of a value that is stored as a case search key"""
+    return ' '.join(str(value).lower().split())
+
+
 def get_variantid(variant_obj, family_id):
     """Create a new variant id.
 
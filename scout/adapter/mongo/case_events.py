@@ -47,6 +47,7 @@ class CaseEventHandler(object):
             {'$addToSet': {'assignees': user['_id']}},
             return_document=pymongo.ReturnDocument.AFTER
         )
+        updated_case = self.update_case_search_keys(updated_case)
         return updated_case
 
     def unassign(self, institute, case, user, link):
@@ -86,6 +87,7 @@ class CaseEventHandler(object):
             {'$pull': {'assignees': user['_id']}},
             return_document=pymongo.ReturnDocument.AFTER
         )
+        updated_case = self.update_case_search_keys(updated_case)
         LOG.debug("Case updated")
         return updated_case
 
@@ -314,6 +316,7 @@ class CaseEventHandler(object):
             },
             return_document=pymongo.ReturnDocument.AFTER
         )
+        self.update_causative_index(updated_case)
         LOG.debug("Case updated")
         return updated_case
 
@@ -351,6 +354,7 @@ class CaseEventHandler(object):
             },
             return_document=pymongo.ReturnDocument.AFTER
         )
+        self.update_causative_index(updated_case)
         LOG.debug("Case updated")
         return updated_case
 
@@ -440,6 +444,7 @@ class CaseEventHandler(object):
             },
             return_document=pymongo.ReturnDocument.AFTER
         )
+        updated_case = self.update_case_search_keys(updated_case)
         LOG.debug("Case updated")
         return updated_case
 
@@ -476,6 +481,7 @@ class CaseEventHandler(object):
             },
             return_document=pymongo.ReturnDocument.AFTER
         )
+        updated_case = self.update_case_search_keys(updated_case)
         LOG.debug("Case updated")
         return updated_case
     
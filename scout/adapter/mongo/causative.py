@@ -0,0 +1,156 @@
+"""
+causative.py
+
+An index of the variants that are marked causative, one document per causative.
+
+Each document holds the positional ids of the variant and the institutes that
+can see its case, so that causatives matching a variant can be found with one
+indexed query instead of fetching every causative of an institute. The
+documents of a case are rebuilt whenever the causatives or the collaborators
+of the case are changed. An empty index is treated as not built: the causatives
+are collected from the cases, and the whole index is built when the first case
+is indexed.
+"""
+import logging
+
+LOG = logging.getLogger(__name__)
+
+CAUSATIVE_PROJECTION = {
+    'case_id': 1,
+    'variant_id': 1,
+    'simple_id': 1,
+    'display_name': 1,
+    'category': 1,
+}
+
+
+class CausativeHandler(object):
+    """Methods to keep the causative index up to date"""
+
+    def rebuild_causative_index(self):
+        """Rebuild the causative index for all cases with causatives
+
+        Returns:
+            nr_causatives(int): Nr of causatives in the index
+        """
+        LOG.info("Rebuilding the causative index")
+        self.causative_collection.delete_many({})
+        query = {'causatives': {'$exists': True, '$ne': []}}
+        projection = {'causatives': 1, 'owner': 1, 'collaborators': 1}
+        nr_causatives = 0
+        for case_obj in self.case_collection.find(query, projection):
+            causatives = self._case_causatives(case_obj)
+            if causatives:
+                self.causative_collection.insert_many(causatives)
+            nr_causatives += len(causatives)
+        return nr_causatives
+
+    def update_causative_index(self, case_obj):
+        """Rebuild the causative index for a case
+
+        Args:
+            case_obj(dict)
+
+        Returns:
+            nr_causatives(int): Nr of causatives in the index for the case
+        """
+        if not case_obj:
+            return 0
+
+        if self.causative_collection.find_one() is None:
+            # The causatives of the other cases are not indexed yet, index them all
+            self.rebuild_causative_index()
+            return self.causative_collection.count_documents({'case_id': case_obj['_id']})
+
+        self.causative_collection.delete_many({'case_id': case_obj['_id']})
+        causative_ids = case_obj.get('causatives') or []
+        if not causative_ids:
+            return 0
+
+        causatives = self._case_causatives(case_obj)
+        if causatives:
+            self.causative_collection.insert_many(causatives)
+        LOG.debug("Indexed %s causatives for case %s", len(causatives), case_obj['_id'])
+        return len(causatives)
+
+    def _case_causatives(self, case_obj):
+        """Build the causative index documents of a case
+
+        Args:
+            case_obj(dict)
+
+        Returns:
+            causatives(list(dict))
+        """
+        collaborators = list(case_obj.get('collaborators') or [case_obj['owner']])
+        causatives = []
+        for variant_obj in self.variant_collection.find(
+                {'_id': {'$in': case_obj['causatives']}}, CAUSATIVE_PROJECTION):
+            variant_obj['case_id'] = case_obj['_id']
+            variant_obj['simple_id'] = causative_simple_id(variant_obj)
+            variant_obj['collaborators'] = collaborators
+            causatives.append(variant_obj)
+        return causatives
+
+    def delete_causative_index(self, case_id):
+        """Remove the causatives of a case from the index
+
+        Args:
+            case_id(str)
+        """
+        self.causative_collection.delete_many({'case_id': case_id})
+
+    def institute_causatives(self, institute_id, simple_id=None, exclude_case=None):
+        """Return the indexed causatives that an institute can see
+
+        Args:
+            institute_id(str)
+            simple_id(str): Only causatives at this position, chrom_pos_ref_alt
+            exclude_case(str): Skip the causatives of this case
+
+        If the index is empty, e.g. in a database where `scout update causatives` has not
+        been run, the causatives are collected from the cases instead.
+
+        Returns:
+            causatives(iterable(dict)): Documents with CAUSATIVE_PROJECTION fields
+        """
+        if self.causative_collection.find_one() is None:
+            LOG.debug("The causative index is empty, collecting the causatives from the cases")
+            return self._scan_causatives(institute_id, simple_id, exclude_case)
+
+        query = {'collaborators': institute_id}
+        if simple_id:
+            query['simple_id'] = simple_id
+        if exclude_case:
+            query['case_id'] = {'$ne': exclude_case}
+        return self.causative_collection.find(query)
+
+    def _scan_causatives(self, institute_id, simple_id=None, exclude_case=None):
+        """Collect the causatives that an institute can see from the cases
+
+        Args:
+            institute_id(str)
+            simple_id(str): Only causatives at this position, chrom_pos_ref_alt
+            exclude_case(str): Skip the causatives of this case
+
+        Returns:
+            causatives(list(dict)): Documents like the ones in the causative index
+        """
+        query = {'collaborators': institute_id, 'causatives': {'$exists': True, '$ne': []}}
+        if exclude_case:
+            query['_id'] = {'$ne': exclude_case}
+        projection = {'causatives': 1, 'owner': 1, 'collaborators': 1}
+        causatives = []
+        for case_obj in self.case_collection.find(query, projection):
+            causatives.extend(self._case_causatives(case_obj))
+        if simple_id:
+            causatives = [item for item in causatives if item['simple_id'] == simple_id]
+        return causatives
+
+
+def causative_simple_id(variant_obj):
+    """Return the positional id, chrom_pos_ref_alt, of a variant
+
+    Variants loaded before the simple id was stored get it from the display name.
+    """
+    return variant_obj.get('simple_id') or variant_obj['display_name'].rsplit('_', 1)[0]
@@ -315,3 +315,23 @@ class ClinVarHandler(object):
             submitted_vars[clinvar.get('local_id')] = clinvar
 
         return submitted_vars
+
+
+    def cases_to_clinVars(self, case_ids):
+        """Get all variants included in clinvar submissions for many cases with one query
+
+        Args:
+            case_ids(iterable(str)): case _ids
+
+        Returns:
+            case_variants(dict): keys are case ids and values are dictionaries like the one
+                                 returned by case_to_clinVars
+
+        """
+        case_ids = list(case_ids)
+        query = {'case_id': {'$in': case_ids}, 'csv_type': 'variant'}
+        case_variants = {case_id: {} for case_id in case_ids}
+        for clinvar in self.clinvar_collection.find(query):
+            case_variants[clinvar['case_id']][clinvar.get('local_id')] = clinvar
+
+        return case_variants
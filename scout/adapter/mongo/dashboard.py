@@ -0,0 +1,76 @@
+"""
+dashboard.py
+
+Materialized dashboard statistics.
+
+The statistics of an institute are stored in one document. A document is
+removed when an event is created for the institute, when a case of the
+institute is added, updated or deleted or gets new variants, or when it is
+older than the max age that the caller accepts, and is then computed again on
+the next request.
+"""
+import logging
+from datetime import datetime
+
+LOG = logging.getLogger(__name__)
+
+
+class DashboardHandler(object):
+    """Methods to store the statistics shown on the dashboard"""
+
+    def dashboard_stats(self, institute_id=None, max_age=None):
+        """Return the stored dashboard statistics of an institute
+
+        Args:
+            institute_id(str): None means all institutes
+            max_age(int): Nr of seconds the statistics are valid
+
+        Returns:
+            data(dict): The statistics or None if nothing valid is stored
+        """
+        stats_obj = self.dashboard_stats_collection.find_one({'_id': str(institute_id)})
+        if not stats_obj:
+            return None
+        if max_age is not None:
+            age = (datetime.now() - stats_obj['created_at']).total_seconds()
+            if age > max_age:
+                LOG.debug("Dashboard statistics of %s are %s seconds old", institute_id, age)
+                return None
+        return stats_obj['data']
+
+    def update_dashboard_stats(self, data, institute_id=None):
+        """Store the dashboard statistics of an institute
+
+        Args:
+            data(dict): As returned by get_dashboard_info
+            institute_id(str): None means all institutes
+        """
+        LOG.debug("Storing dashboard statistics of %s", institute_id)
+        self.dashboard_stats_collection.replace_one(
+            {'_id': str(institute_id)},
+            {'_id': str(institute_id), 'data': data, 'created_at': datetime.now()},
+            upsert=True
+        )
+
+    def expire_dashboard_stats(self, *institute_ids):
+        """Remove the stored statistics of institutes and of all institutes
+
+        Args:
+            institute_ids(str)
+        """
+        expired_ids = [str(institute_id) for institute_id in institute_ids]
+        self.dashboard_stats_collection.delete_many(
+            {'_id': {'$in': expired_ids + [str(None)]}}
+        )
+
+    def expire_case_dashboard_stats(self, case_obj):
+        """Remove the stored statistics of the institutes that can see a case
+
+        Args:
+            case_obj(dict): With owner and collaborators
+        """
+        if not case_obj:
+            return
+        institute_ids = set(case_obj.get('collaborators') or [])
+        institute_ids.add(case_obj.get('owner'))
+        self.expire_dashboard_stats(*institute_ids)
@@ -69,6 +69,7 @@ class EventHandler(CaseEventHandler, VariantEventHandler):
         LOG.debug("Saving Event")
         self.event_collection.insert_one(event)
         LOG.debug("Event Saved")
+        self.expire_dashboard_stats(institute['_id'])
         return event
 
     def events(self, institute, case=None, variant_id=None, level=None,
@@ -134,6 +135,48 @@ class EventHandler(CaseEventHandler, VariantEventHandler):
 
         return self.event_collection.find(query).sort('created_at', pymongo.DESCENDING)
 
+    def variants_comments(self, institute, case, variant_ids):
+        """Fetch the comments for many variants with one query
+
+        Collects the same comments as `events(..., comments=True)` but for all variant_ids
+        at once.
+
+          Args:
+            institute (dict): A institute
+            case (dict): A case
+            variant_ids (list(str)): global variant ids
+
+          Returns:
+              comments(dict): {<variant_id>: [<comment event>, ...]} newest first
+        """
+        comments = {variant_id: [] for variant_id in variant_ids}
+        if not comments:
+            return comments
+
+        query = {
+            '$or': [
+                {
+                    'category' : 'variant',
+                    'variant_id' : {'$in': list(comments)},
+                    'verb' : 'comment',
+                    'level' : 'global'
+                },
+                {
+                    'category' : 'variant',
+                    'variant_id' : {'$in': list(comments)},
+                    'institute' : institute['_id'],
+                    'case' : case['_id'],
+                    'verb' : 'comment',
+                    'level' : 'specific'
+                }
+            ]
+        }
+        events = self.event_collection.find(query).sort('created_at', pymongo.DESCENDING)
+        for event in events:
+            comments[event['variant_id']].append(event)
+
+        return comments
+
     def user_events(self, user_obj=None):
         """Fetch all events by a specific user."""
         query = dict(user_id=user_obj['_id']) if user_obj else dict()
@@ -223,6 +266,7 @@ class EventHandler(CaseEventHandler, VariantEventHandler):
                     },
                     return_document=pymongo.ReturnDocument.AFTER
                 )
+        updated_case = self.update_case_search_keys(updated_case)
 
         LOG.debug("Case updated")
         return updated_case
@@ -265,6 +309,7 @@ class EventHandler(CaseEventHandler, VariantEventHandler):
                 },
                 return_document=pymongo.ReturnDocument.AFTER
             )
+        updated_case = self.update_case_search_keys(updated_case)
 
         LOG.info("Creating event for removing phenotype term {0}" \
                     " from case {1}".format(phenotype_id, case['display_name']))
@@ -1,19 +1,28 @@
 import logging
 from pprint import pprint as pp
-import intervaltree
 
 from scout.build.genes.exon import build_exon
 from pymongo.errors import (DuplicateKeyError, BulkWriteError)
 
+from scout.constants import INDEXES
 from scout.exceptions import IntegrityError
+from scout.utils.coding_intervals import CodingIntervals
+from scout.utils.prefix_index import PrefixIndex
+
+from .bulk_writer import BulkWriter
 
 LOG = logging.getLogger(__name__)
 
+# Exons of a build are loaded into this collection and then swapped with the exon collection
+EXON_STAGING_COLLECTION = 'exon_staging'
+
 class GeneHandler(object):
 
     def load_hgnc_gene(self, gene_obj):
         """Add a gene object with transcripts to the database
 
+        Call `update_genes_version` when all genes are loaded.
+
         Arguments:
             gene_obj(dict)
 
@@ -24,6 +33,18 @@ class GeneHandler(object):
         #LOG.debug("Gene saved")
         return res
 
+    def update_genes_version(self, builds=None):
+        """Invalidate the cached genes and the stored coding intervals after genes are loaded
+
+        Args:
+            builds(iterable(str)): The builds of the loaded genes, all builds if None
+        """
+        if builds is None:
+            self.coding_interval_collection.delete_many({})
+        else:
+            self.coding_interval_collection.delete_many({'build': {'$in': list(builds)}})
+        self.update_reference_version('genes')
+
     def load_hgnc_bulk(self, gene_objs):
         """Load a bulk of hgnc gene objects
         
@@ -41,12 +62,16 @@ class GeneHandler(object):
             result = self.hgnc_collection.insert_many(gene_objs)
         except (DuplicateKeyError, BulkWriteError) as err:
             raise IntegrityError(err)
+        finally:
+            self.update_genes_version(set(gene_obj.get('build') for gene_obj in gene_objs))
 
         return result
     
     def load_hgnc_transcript(self, transcript_obj):
         """Add a transcript object to the database
 
+        Call `update_reference_version('genes')` when all transcripts are loaded.
+
         Arguments:
             transcript_obj(dict)
 
@@ -66,6 +91,8 @@ class GeneHandler(object):
             result = self.transcript_collection.insert_many(transcript_objs)
         except (DuplicateKeyError, BulkWriteError) as err:
             raise IntegrityError(err)
+        finally:
+            self.update_reference_version('genes')
         
         return result
 
@@ -79,23 +106,56 @@ class GeneHandler(object):
         res = self.exon_collection.insert_one(exon_obj)
         return res
 
-    def load_exon_bulk(self, exon_objs):
+    def load_exon_bulk(self, exon_objs, collection=None):
         """Load a bulk of exon objects to the database
 
         Arguments:
             exon_objs(iterable(scout.models.hgnc_exon))
+            collection(pymongo.Collection): Defaults to the exon collection
 
+        Returns:
+            nr_inserted(int)
         """
-        try:
-            result = self.exon_collection.insert_many(transcript_objs)
-        except (DuplicateKeyError, BulkWriteError) as err:
-            raise IntegrityError(err)
-        
-        return result
+        with BulkWriter(collection or self.exon_collection) as writer:
+            writer.add_many(exon_objs)
+        return writer.nr_inserted
+
+    def exon_staging_collection(self, build):
+        """Return a new staging collection to load the exons of a build into
+
+        The staging collection starts with the exons of the other builds, so that it
+        can replace the exon collection when the build is loaded, see `swap_exon_staging`.
+
+        Args:
+            build(str)
+
+        Returns:
+            staging_collection(pymongo.Collection)
+        """
+        LOG.info("Copying exons of other builds than %s to %s", build, EXON_STAGING_COLLECTION)
+        self.db.drop_collection(EXON_STAGING_COLLECTION)
+        list(self.exon_collection.aggregate([
+            {'$match': {'build': {'$ne': build}}},
+            {'$out': EXON_STAGING_COLLECTION},
+        ]))
+        return self.db[EXON_STAGING_COLLECTION]
+
+    def swap_exon_staging(self):
+        """Replace the exon collection with the staging collection
+
+        The staging collection gets the exon indexes and is renamed in one operation,
+        so the exons are never missing while a build is reloaded.
+        """
+        staging_collection = self.db[EXON_STAGING_COLLECTION]
+        staging_collection.create_indexes(INDEXES['exon'])
+        LOG.info("Replacing the exon collection with %s", EXON_STAGING_COLLECTION)
+        staging_collection.rename(self.exon_collection.name, dropTarget=True)
 
     def hgnc_gene(self, hgnc_identifier, build='37'):
         """Fetch a hgnc gene
 
+            The gene is served from the reference cache, the caller gets a copy.
+
             Args:
                 hgnc_identifier(int)
 
@@ -104,6 +164,14 @@ class GeneHandler(object):
         """
         if not build in ['37', '38']:
             build = '37'
+        return self.cached(
+            'genes', ('hgnc_gene', build, hgnc_identifier),
+            lambda: self._fetch_hgnc_gene(hgnc_identifier, build),
+            copy=True
+        )
+
+    def _fetch_hgnc_gene(self, hgnc_identifier, build):
+        """Fetch a hgnc gene with its transcripts from the database"""
         query = {}
         try:
             # If the identifier is a integer we search for hgnc_id
@@ -129,6 +197,40 @@ class GeneHandler(object):
         
         return gene_obj
 
+    def hgnc_symbols(self, hgnc_ids, build='37'):
+        """Fetch the hgnc symbols for many genes with one query
+
+            Args:
+                hgnc_ids(iterable(int))
+                build(str)
+
+            Returns:
+                symbols(dict): {<hgnc_id>: <hgnc_symbol>}
+        """
+        query = {'hgnc_id': {'$in': list(hgnc_ids)}, 'build': build}
+        projection = {'hgnc_id': 1, 'hgnc_symbol': 1, '_id': 0}
+        return {
+            gene_obj['hgnc_id']: gene_obj['hgnc_symbol']
+            for gene_obj in self.hgnc_collection.find(query, projection)
+        }
+
+    def hgnc_genes_by_id(self, hgnc_ids, build='37', projection=None):
+        """Fetch many genes by hgnc id with one query
+
+            Args:
+                hgnc_ids(iterable(int))
+                build(str)
+                projection(dict): The fields to return
+
+            Returns:
+                genes(dict): {<hgnc_id>: <gene_obj>}
+        """
+        query = {'hgnc_id': {'$in': list(hgnc_ids)}, 'build': build}
+        return {
+            gene_obj['hgnc_id']: gene_obj
+            for gene_obj in self.hgnc_collection.find(query, projection)
+        }
+
     def hgnc_id(self, hgnc_symbol, build='37'):
         """Query the genes with a hgnc symbol and return the hgnc id
 
@@ -182,6 +284,40 @@ class GeneHandler(object):
 
         return self.hgnc_collection.find({'build': build, 'aliases': hgnc_symbol})
 
+    def genes_by_prefix(self, query, build='37', limit=10):
+        """Return the genes with a symbol, alias or hgnc id that starts with a query
+
+            Used for autocompletion. The genes are searched in an in memory
+            prefix index that is served from the reference cache. Genes where
+            the query is a full symbol or alias come first, then genes where
+            the query starts the hgnc symbol and last genes matched on an alias.
+
+            Args:
+                query(str)
+                build(str): The build in which to search
+                limit(int): Max number of genes to return
+
+            Returns:
+                genes(list(dict)): Genes with hgnc_id, hgnc_symbol and aliases
+        """
+        prefix_index = self.cached('genes', ('gene_prefix_index', build),
+                                   lambda: self._build_gene_prefix_index(build))
+        return prefix_index.search(query, limit=limit)
+
+    def _build_gene_prefix_index(self, build='37'):
+        """Build the prefix index of the genes in a build"""
+        LOG.info("Building gene prefix index for build %s", build)
+        projection = {'_id': 0, 'hgnc_id': 1, 'hgnc_symbol': 1, 'aliases': 1}
+        entries = []
+        for gene_obj in self.hgnc_collection.find({'build': build}, projection):
+            gene_obj['aliases'] = gene_obj.get('aliases') or []
+            # Genes are found on their aliases after the genes found on their symbol
+            keys = [(alias, 1) for alias in gene_obj['aliases']]
+            keys.append((gene_obj['hgnc_symbol'], 0))
+            keys.append((str(gene_obj['hgnc_id']), 0))
+            entries.append((gene_obj, keys))
+        return PrefixIndex(entries)
+
     def all_genes(self, build='37'):
         """Fetch all hgnc genes
 
@@ -211,9 +347,12 @@ class GeneHandler(object):
         if build:
             LOG.info("Dropping the hgnc_gene collection, build %s", build)
             self.hgnc_collection.delete_many({'build': build})
+            self.coding_interval_collection.delete_many({'build': build})
         else:
             LOG.info("Dropping the hgnc_gene collection")
             self.hgnc_collection.drop()
+            self.coding_interval_collection.drop()
+        self.update_reference_version('genes')
 
     def drop_transcripts(self, build=None):
         """Delete the transcripts collection"""
@@ -223,6 +362,7 @@ class GeneHandler(object):
         else:
             LOG.info("Dropping the transcripts collection")
             self.transcript_collection.drop()
+        self.update_reference_version('genes')
 
     def drop_exons(self, build=None):
         """Delete the exons collection"""
@@ -257,6 +397,9 @@ class GeneHandler(object):
         The result will have ONE entry for each gene in the database.
         (For a specific build)
 
+        If no genes are given the result is served from the reference cache,
+        it is shared so it should not be modified.
+
         Args:
             build(str):
             genes(iterable(scout.models.HgncGene)):
@@ -265,6 +408,13 @@ class GeneHandler(object):
             hgnc_dict(dict): {<hgnc_id(int)>: <gene(dict)>}
 
         """
+        if not genes:
+            return self.cached('genes', ('hgncid_to_gene', build),
+                               lambda: self._hgncid_to_gene(build))
+        return self._hgncid_to_gene(build, genes)
+
+    def _hgncid_to_gene(self, build='37', genes=None):
+        """Build the dictionary with hgnc_id as key and gene_obj as value"""
         hgnc_dict = {}
         LOG.info("Building hgncid_to_gene")
         if not genes:
@@ -387,7 +537,7 @@ class GeneHandler(object):
         nr = []
         xm = []
         for tx in transcripts:
-            enst_id = tx['transcript_id']
+            enst_id = tx['ensembl_transcript_id']
             # Should we not check if it is longest?
             if not longest:
                 longest = enst_id
@@ -533,54 +683,50 @@ class GeneHandler(object):
                 gene['hgnc_id'] = ','.join([str(hgnc_id) for hgnc_id in id_info['ids']])
 
     def get_coding_intervals(self, build='37', genes=None):
-        """Return a dictionary with chromosomes as keys and interval trees as values
+        """Return the coding regions of a genome build
 
         Each interval represents a coding region of overlapping genes.
+        If no genes are given the regions are read from the coding_interval
+        collection and served from the reference cache. If the regions of the
+        build has not been stored yet they are built and stored.
 
         Args:
             build(str): The genome build
             genes(iterable(scout.models.HgncGene)):
 
         Returns:
-            intervals(dict): A dictionary with chromosomes as keys and overlapping genomic intervals as values
+            intervals(CodingIntervals): Coding regions per chromosome
         """
-        intervals = {}
-        if not genes:
-            genes = self.all_genes(build=build)
-        LOG.info("Building interval trees...")
-        for i,hgnc_obj in enumerate(genes):
-            chrom = hgnc_obj['chromosome']
-            start = max((hgnc_obj['start'] - 5000), 1)
-            end = hgnc_obj['end'] + 5000
-
-            # If this is the first time a chromosome is seen we create a new
-            # interval tree with current interval
-            if chrom not in intervals:
-                intervals[chrom] = intervaltree.IntervalTree()
-                intervals[chrom].addi(start, end, i)
-                continue
+        if genes:
+            return CodingIntervals.from_genes(genes)
+        return self.cached('genes', ('coding_intervals', build),
+                           lambda: self._fetch_coding_intervals(build))
 
-            res = intervals[chrom].search(start, end)
+    def _fetch_coding_intervals(self, build='37'):
+        """Fetch the stored coding regions of a build, build them if they do not exist"""
+        documents = list(self.coding_interval_collection.find({'build': build}))
+        if documents:
+            return CodingIntervals.from_documents(documents)
+        return self.update_coding_intervals(build)
 
-            # If the interval did not overlap any other intervals we insert it and continue
-            if not res:
-                intervals[chrom].addi(start, end, i)
-                continue
-
-            # Loop over the overlapping intervals
-            for interval in res:
-                # Update the positions to new max and mins
-                if interval.begin < start:
-                    start = interval.begin
+    def update_coding_intervals(self, build='37'):
+        """Build the coding regions from the genes of a build and store them
 
-                if interval.end > end:
-                    end = interval.end
-
-                # Delete the old interval
-                intervals[chrom].remove(interval)
+        Args:
+            build(str): The genome build
 
-            # Add the new interval consisting och the overlapping ones
-            intervals[chrom].addi(start, end, i)
+        Returns:
+            intervals(CodingIntervals)
+        """
+        projection = {'chromosome': 1, 'start': 1, 'end': 1, '_id': 0}
+        genes = self.hgnc_collection.find({'build': build}, projection)
+        intervals = CodingIntervals.from_genes(genes)
+
+        LOG.info("Storing %s coding intervals for build %s", len(intervals), build)
+        self.coding_interval_collection.delete_many({'build': build})
+        documents = intervals.to_documents(build)
+        if documents:
+            self.coding_interval_collection.insert_many(documents)
 
         return intervals
 
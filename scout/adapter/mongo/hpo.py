@@ -7,6 +7,7 @@ from pymongo.errors import (DuplicateKeyError, BulkWriteError)
 from pymongo import (ASCENDING)
 
 from scout.exceptions import IntegrityError
+from scout.utils.prefix_index import PrefixIndex
 
 LOG = logging.getLogger(__name__)
 
@@ -16,6 +17,8 @@ class HpoHandler(object):
     def load_hpo_term(self, hpo_obj):
         """Add a hpo object
 
+        Call `update_reference_version('hpo')` when all terms are loaded.
+
         Arguments:
             hpo_obj(dict)
 
@@ -43,6 +46,7 @@ class HpoHandler(object):
             result = self.hpo_term_collection.insert_many(hpo_bulk)
         except (DuplicateKeyError, BulkWriteError) as err:
             raise IntegrityError(err)
+        self.update_reference_version('hpo')
         return result
 
     def hpo_term(self, hpo_id):
@@ -103,6 +107,39 @@ class HpoHandler(object):
         LOG.info("Found {0} terms with search word {1}".format(res.count(), search_term))
         return res
 
+    def hpo_terms_by_prefix(self, query, limit=10):
+        """Return the hpo terms with an id or description words that start with a query
+
+        Used for autocompletion. The terms are searched in an in memory prefix
+        index that is served from the reference cache. Terms where the query
+        is the full id or description come first, then terms by hpo number.
+
+        Args:
+            query(str): Start of a hpo id or of one or more words of a description
+            limit(int): Max number of terms to return
+
+        Returns:
+            hpo_terms(list(dict)): Terms with _id, hpo_id, description and hpo_number
+        """
+        prefix_index = self.cached('hpo', ('hpo_prefix_index',), self._build_hpo_prefix_index)
+        return prefix_index.search(query, limit=limit)
+
+    def _build_hpo_prefix_index(self):
+        """Build the prefix index of all hpo terms"""
+        LOG.info("Building hpo prefix index")
+        projection = {'hpo_id': 1, 'description': 1, 'hpo_number': 1}
+        entries = []
+        for term in self.hpo_term_collection.find(projection=projection):
+            rank = term.get('hpo_number') or 0
+            description = term.get('description') or ''
+            keys = [(word.strip('(),;:'), rank) for word in description.split()]
+            keys.append((description, rank))
+            # Terms are found on the id with or without the HP: prefix
+            keys.append((term['_id'], rank))
+            keys.append((term['_id'].split(':')[-1], rank))
+            entries.append((term, keys))
+        return PrefixIndex(entries)
+
     def disease_term(self, disease_identifier):
         """Return a disease term
 
@@ -128,12 +165,23 @@ class HpoHandler(object):
 
             If no gene, return all disease terms
 
+        The terms for a gene are served from the reference cache, the caller
+        gets a copy.
+
         Args:
             hgnc_id(int)
 
         Returns:
             iterable(dict): A list with all disease terms that match
         """
+        if hgnc_id:
+            return self.cached('diseases', ('disease_terms', hgnc_id),
+                               lambda: self._fetch_disease_terms(hgnc_id),
+                               copy=True)
+        return self._fetch_disease_terms()
+
+    def _fetch_disease_terms(self, hgnc_id=None):
+        """Fetch the disease terms that overlaps a gene from the database"""
         query = {}
         if hgnc_id:
             LOG.debug("Fetching all diseases for gene %s", hgnc_id)
@@ -146,6 +194,8 @@ class HpoHandler(object):
     def load_disease_term(self, disease_obj):
         """Load a disease term into the database
 
+        Call `update_reference_version('diseases')` when all terms are loaded.
+
         Args:
             disease_obj(dict)
         """
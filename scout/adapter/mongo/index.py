@@ -1,7 +1,11 @@
 # -*- coding: utf-8 -*-
 import logging
 
-from scout.constants import INDEXES
+import pymongo
+
+from scout.constants import (INDEXES, ADVISE_FILTERS)
+
+from .variant import SORT_KEYS
 
 LOG = logging.getLogger(__name__)
 
@@ -71,6 +75,73 @@ class IndexHandler(object):
         if nr_updated == 0:
             LOG.info("All indexes in place")
     
+    def explain_query(self, mongo_query, sorting=None, limit=50, collection_name='variant'):
+        """Explain how the database runs a query
+
+        Args:
+            mongo_query(dict)
+            sorting(list(tuple)): The sort order, as in `pymongo.Cursor.sort`
+            limit(int): Nr of documents fetched, use the size of a page
+            collection_name(str)
+
+        Returns:
+            summary(dict): See `explain_summary`
+        """
+        cursor = self.db[collection_name].find(mongo_query)
+        if sorting:
+            cursor = cursor.sort(sorting)
+        return explain_summary(cursor.limit(limit).explain())
+
+    def advise_indexes(self, case_obj, filters=None, max_examined_ratio=10, create=False):
+        """Explain the variant queries of representative filters and propose indexes
+
+        A query is flagged if it scans the whole collection, sorts in memory or examines
+        more than max_examined_ratio documents per returned document. For flagged queries
+        a compound index is proposed: the equality fields, then the sort field and then
+        one range field. Proposals already covered by an existing index are skipped.
+
+        Args:
+            case_obj(dict): The case to run the queries on
+            filters(list(tuple)): (name, category, query), defaults to ADVISE_FILTERS
+            max_examined_ratio(int)
+            create(bool): If the proposed indexes should be created
+
+        Returns:
+            advice(list(dict)): One summary per filter with 'name', 'category', 'flagged'
+                                and 'proposal', the keys of the proposed index or None
+        """
+        filters = filters or ADVISE_FILTERS
+        sorting = SORT_KEYS['variant_rank']
+        existing_keys = [
+            index_info['key'] for index_info in
+            self.variant_collection.index_information().values()
+        ]
+        advice = []
+        for name, category, query in filters:
+            mongo_query = self.build_query(case_obj['_id'], query=dict(query), category=category)
+            summary = self.explain_query(mongo_query, sorting=sorting)
+            summary['name'] = name
+            summary['category'] = category
+
+            examined = summary['docs_examined'] or 0
+            returned = summary['returned'] or 0
+            summary['flagged'] = (summary['collscan'] or summary['blocking_sort'] or
+                                  examined > max(returned, 1) * max_examined_ratio)
+            summary['proposal'] = None
+            if summary['flagged']:
+                keys = propose_index(mongo_query, sorting)
+                if keys and not index_covers(existing_keys, keys):
+                    summary['proposal'] = keys
+                    existing_keys.append(keys)
+                    if create:
+                        index_name = advised_index_name(keys)
+                        LOG.info("Creating index %s on variant collection", index_name)
+                        self.variant_collection.create_index(keys, name=index_name,
+                                                             background=True)
+            advice.append(summary)
+
+        return advice
+
     def drop_indexes(self):
         """Delete all indexes for the database"""
         LOG.warning("Dropping all indexe")
@@ -78,3 +149,113 @@ class IndexHandler(object):
             LOG.warning("Dropping all indexes for collection name %s", collection_name)
             self.db[collection_name].drop_indexes()
 
+
+def explain_summary(explanation):
+    """Summarize the output of explain
+
+    Args:
+        explanation(dict): The result of `pymongo.Cursor.explain`
+
+    Returns:
+        summary(dict): With the stages and indexes of the winning plan, if the whole
+                       collection is scanned or the result is sorted in memory and the
+                       number of keys and documents examined
+    """
+    stages = []
+    indexes = []
+    plan_stages(explanation.get('queryPlanner', {}).get('winningPlan', {}), stages, indexes)
+    stats = explanation.get('executionStats', {})
+    return {
+        'stages': stages,
+        'indexes': indexes,
+        'collscan': 'COLLSCAN' in stages,
+        'blocking_sort': 'SORT' in stages,
+        'keys_examined': stats.get('totalKeysExamined'),
+        'docs_examined': stats.get('totalDocsExamined'),
+        'returned': stats.get('nReturned'),
+        'time_ms': stats.get('executionTimeMillis'),
+    }
+
+
+def plan_stages(plan, stages, indexes):
+    """Collect the stages and index names of a query plan, outermost stage first"""
+    if not plan:
+        return
+    stages.append(plan['stage'])
+    if plan.get('indexName'):
+        indexes.append(plan['indexName'])
+    plan_stages(plan.get('inputStage'), stages, indexes)
+    for input_stage in plan.get('inputStages', []):
+        plan_stages(input_stage, stages, indexes)
+
+
+def propose_index(mongo_query, sorting=None):
+    """Propose a compound index for a query
+
+    Follows the equality, sort, range rule. Conditions inside $or can not use the index
+    and only one range field is used since range fields are often arrays.
+
+    Args:
+        mongo_query(dict)
+        sorting(list(tuple))
+
+    Returns:
+        keys(list(tuple)): [(<field>, <direction>), ...]
+    """
+    equality = []
+    ranges = []
+    for field, condition in query_conditions(mongo_query):
+        if not isinstance(condition, dict):
+            if field not in equality and not hasattr(condition, 'pattern'):
+                equality.append(field)
+        elif set(condition) & set(['$lt', '$lte', '$gt', '$gte', '$in']):
+            if field not in ranges:
+                ranges.append(field)
+
+    keys = [(field, pymongo.ASCENDING) for field in equality]
+    for field, direction in sorting or []:
+        if field not in equality:
+            keys.append((field, direction))
+    for field in ranges:
+        if field not in equality and field not in dict(keys):
+            keys.append((field, pymongo.ASCENDING))
+            break
+
+    return keys
+
+
+def query_conditions(mongo_query):
+    """Yield the (field, condition) pairs that all documents have to match
+
+    Top level conditions and conditions in $and are used, $or is skipped.
+    """
+    for field, condition in mongo_query.items():
+        if field == '$and':
+            for sub_query in condition:
+                for pair in query_conditions(sub_query):
+                    yield pair
+        elif not field.startswith('$'):
+            yield field, condition
+
+
+def index_covers(existing_keys, keys):
+    """Check if an existing index starts with the proposed keys
+
+    Args:
+        existing_keys(list(list(tuple))): The keys of the existing indexes
+        keys(list(tuple))
+
+    Returns:
+        bool
+    """
+    keys = [tuple(key) for key in keys]
+    for index_keys in existing_keys:
+        index_keys = [tuple(key) for key in index_keys]
+        if index_keys[:len(keys)] == keys:
+            return True
+    return False
+
+
+def advised_index_name(keys):
+    """Name an advised index after its fields, like the indexes in scout/constants/indexes.py"""
+    return '_'.join(field.replace('_', '').replace('.', '') for field, _ in keys)
@@ -169,6 +169,7 @@ class PanelHandler(object):
             display_name, panel_version
         ))
         result = self.panel_collection.insert_one(panel_obj)
+        self.update_reference_version('panels')
         LOG.debug("Panel saved")
         return result.inserted_id
 
@@ -196,6 +197,7 @@ class PanelHandler(object):
             res(pymongo.DeleteResult)
         """
         res = self.panel_collection.delete_one({'_id': panel_obj['_id']})
+        self.update_reference_version('panels')
         LOG.warning("Deleting panel %s, version %s" % (panel_obj['panel_name'], panel_obj['version']))
         return res
 
@@ -204,6 +206,8 @@ class PanelHandler(object):
 
         If no panel is sent return all panels
 
+        The panel is served from the reference cache, the caller gets a copy.
+
         Args:
             panel_id (str): unique id for the panel
             version (str): version of the panel. If 'None' latest version will be returned
@@ -211,6 +215,12 @@ class PanelHandler(object):
         Returns:
             gene_panel: gene panel object
         """
+        return self.cached('panels', ('gene_panel', panel_id, version),
+                           lambda: self._fetch_gene_panel(panel_id, version),
+                           copy=True)
+
+    def _fetch_gene_panel(self, panel_id, version=None):
+        """Fetch a gene panel from the database"""
         query = {'panel_name': panel_id}
         if version:
             LOG.info("Fetch gene panel {0}, version {1} from database".format(
@@ -265,19 +275,35 @@ class PanelHandler(object):
     def gene_to_panels(self, case_obj):
         """Fetch all gene panels and group them by gene
 
+            The result is served from the reference cache, it is shared so it
+            should not be modified.
+
             Args:
                 case_obj(scout.models.Case)
             Returns:
                 gene_dict(dict): A dictionary with gene as keys and a set of
                                  panel names as value
         """
+        panels = tuple(sorted(
+            (panel_info['panel_name'], panel_info['version'])
+            for panel_info in case_obj.get('panels', [])
+        ))
+        return self.cached('panels', ('gene_to_panels', panels),
+                           lambda: self._gene_to_panels(panels))
+
+    def _gene_to_panels(self, panels):
+        """Group the genes of some panels by gene
+
+            Args:
+                panels(iterable(tuple)): (panel_name, version) for each panel
+            Returns:
+                gene_dict(dict)
+        """
         LOG.info("Building gene to panels")
         gene_dict = {}
 
-        for panel_info in case_obj.get('panels', []):
-            panel_name = panel_info['panel_name']
-            panel_version = panel_info['version']
-            panel_obj = self.gene_panel(panel_name, version=panel_version)
+        for panel_name, panel_version in panels:
+            panel_obj = self._fetch_gene_panel(panel_name, version=panel_version)
             if not panel_obj:
                 ## Raise exception here???
                 LOG.warning("Panel: {0}, version {1} does not exist in database".format(panel_name, panel_version))
@@ -327,6 +353,7 @@ class PanelHandler(object):
             panel_obj,
             return_document=pymongo.ReturnDocument.AFTER
         )
+        self.update_reference_version('panels')
 
         return updated_panel
 
@@ -369,6 +396,7 @@ class PanelHandler(object):
             },
             return_document=pymongo.ReturnDocument.AFTER
         )
+        self.update_reference_version('panels')
 
         return updated_panel
 
@@ -452,6 +480,7 @@ class PanelHandler(object):
 
             # insert the new panel
             inserted_id = self.panel_collection.insert_one(new_panel).inserted_id
+        self.update_reference_version('panels')
 
         return inserted_id
 
@@ -8,7 +8,8 @@ from scout.constants import (SPIDEX_HUMAN, CLINSIG_MAP)
 
 class QueryHandler(object):
 
-    def build_variant_query(self, query=None, category='snv', variant_type=['clinical']):
+    def build_variant_query(self, query=None, category='snv', variant_type=['clinical'],
+                            institute_ids=None):
         """Build a mongo query across multiple cases.
         Translate query options from a form into a complete mongo query dictionary.
 
@@ -20,11 +21,13 @@ class QueryHandler(object):
             rank_score
             variant_type
             category
+            institute
 
         Args:
             query(dict): A query dictionary for the database, from a query form.
             category(str): 'snv', 'sv', 'str' or 'cancer'
             variant_type(str): 'clinical' or 'research'
+            institute_ids(list(str)): Only return variants from these institutes
 
         Returns:
             mongo_query : A dictionary in the mongo query format.
@@ -42,6 +45,9 @@ class QueryHandler(object):
 
         mongo_variant_query['category'] = category
 
+        if institute_ids is not None:
+            mongo_variant_query['institute'] = {'$in': list(institute_ids)}
+
         rank_score = query.get('rank_score') or 15
 
         mongo_variant_query['rank_score'] = {'$gte': rank_score}
@@ -82,6 +82,18 @@ class UserHandler(object):
         user_obj = self.user_collection.find_one({'_id': email})
 
         return user_obj
+
+    def users_by_email(self, emails):
+        """Fetch many users from the database with one query.
+
+            Args:
+                emails(iterable(str))
+
+            Returns:
+                users(dict): {<email>: <user_obj>}
+        """
+        query = {'_id': {'$in': list(emails)}}
+        return {user_obj['_id']: user_obj for user_obj in self.user_collection.find(query)}
     
     def delete_user(self, email):
         """Delete a user from the database
@@ -28,9 +28,76 @@ from pymongo.errors import (DuplicateKeyError, BulkWriteError)
 from scout.exceptions import IntegrityError
 
 from .variant_loader import VariantLoader
+from .causative import (CAUSATIVE_PROJECTION, causative_simple_id)
 
 LOG = logging.getLogger(__name__)
 
+# Field and order for each sort key. All keys are sorted on _id as well to get a stable
+# order, variant_rank is unique within a case, category and variant type only when the
+# ranks of a load are complete.
+SORT_KEYS = {
+    'variant_rank': [('variant_rank', pymongo.ASCENDING), ('_id', pymongo.ASCENDING)],
+    'rank_score': [('rank_score', pymongo.DESCENDING), ('_id', pymongo.ASCENDING)],
+    'position': [('position', pymongo.ASCENDING), ('_id', pymongo.ASCENDING)],
+}
+
+# The fields to fetch for the different uses of variants, None fetches the whole document.
+# Methods that take a projection accept the name of a profile or the fields.
+VARIANT_PROJECTIONS = {
+    # Variant pages and everything else that shows all information
+    'detail': None,
+    # Rows in the snv, sv and str variant lists
+    'list': {'genes.transcripts': 0, 'samples': 0},
+    # Rows in the cancer variant list, the transcripts are shown if there is no canonical one
+    'cancer_list': {'samples': 0},
+    # Variants in the overlapping column of the variant lists
+    'overlapping': {
+        'case_id': 1,
+        'category': 1,
+        'chromosome': 1,
+        'cytoband_start': 1,
+        'sub_category': 1,
+        'length': 1,
+        'rank_score': 1,
+        'hgnc_ids': 1,
+    },
+    # Variants that the information of compounds is copied from
+    'compound': {
+        'rank_score': 1,
+        'genes.hgnc_id': 1,
+        'genes.hgnc_symbol': 1,
+        'genes.region_annotation': 1,
+        'genes.functional_annotation': 1,
+    },
+    # Rows of the exported variant lists
+    'export': {
+        'rank_score': 1,
+        'chromosome': 1,
+        'position': 1,
+        'reference': 1,
+        'alternative': 1,
+        'genes.hgnc_id': 1,
+        'genes.transcripts.is_canonical': 1,
+        'genes.transcripts.coding_sequence_name': 1,
+        'samples.sample_id': 1,
+        'samples.allele_depths': 1,
+        'samples.genotype_quality': 1,
+    },
+    # Rows of the mitochondrial report
+    'mt_report': {
+        'position': 1,
+        'reference': 1,
+        'alternative': 1,
+        'genes.hgnc_symbol': 1,
+        'genes.transcripts.is_canonical': 1,
+        'genes.transcripts.protein_sequence_name': 1,
+        'samples.sample_id': 1,
+        'samples.allele_depths': 1,
+    },
+    # Checking if sanger validation is ordered and evaluated
+    'sanger': {'case_id': 1, 'sanger_ordered': 1, 'validation': 1},
+}
+
 
 class VariantHandler(VariantLoader):
 
@@ -157,11 +224,16 @@ class VariantHandler(VariantLoader):
         return variant_obj
 
     def variants(self, case_id, query=None, variant_ids=None, category='snv',
-                 nr_of_variants=10, skip=0, sort_key='variant_rank'):
+                 nr_of_variants=10, skip=0, sort_key='variant_rank', after=None,
+                 projection=None):
         """Returns variants specified in question for a specific case.
 
         If skip not equal to 0 skip the first n variants.
 
+        To page through many variants use `after` instead of skip. Only the variants
+        after the last variant of the previous page are returned, using the index on the
+        sort key, so every page costs the same as the first one.
+
         Arguments:
             case_id(str): A string that represents the case
             query(dict): A dictionary with querys for the database
@@ -170,6 +242,9 @@ class VariantHandler(VariantLoader):
             nr_of_variants(int): if -1 return all variants
             skip(int): How many variants to skip
             sort_key: ['variant_rank', 'rank_score', 'position']
+            after(tuple): Key of the last variant on the previous page, see `page_key`
+            projection(str or dict): A profile in VARIANT_PROJECTIONS or the fields to return,
+                                     all fields if None
 
         Yields:
             result(Iterable[Variant])
@@ -188,28 +263,26 @@ class VariantHandler(VariantLoader):
         mongo_query = self.build_query(case_id, query=query,
                                        variant_ids=variant_ids,
                                        category=category)
-        sorting = []
-        if sort_key == 'variant_rank':
-            sorting = [('variant_rank', pymongo.ASCENDING)]
-        if sort_key == 'rank_score':
-            sorting = [('rank_score', pymongo.DESCENDING)]
-        if sort_key == 'position':
-            sorting = [('position', pymongo.ASCENDING)]
+        sorting = SORT_KEYS.get(sort_key, [])
+        if after:
+            mongo_query = {'$and': [mongo_query, seek_query(sort_key, after)]}
 
         result = self.variant_collection.find(
             mongo_query,
+            variant_projection(projection),
             skip=skip,
             limit=nr_of_variants
         ).sort(sorting)
 
         return result
 
-    def sanger_variants(self, institute_id=None, case_id=None):
+    def sanger_variants(self, institute_id=None, case_id=None, projection=None):
         """Return all variants with sanger information
 
         Args:
             institute_id(str)
             case_id(str)
+            projection(str or dict): A profile in VARIANT_PROJECTIONS or the fields to return
 
         Returns:
             res(pymongo.Cursor): A Cursor with all variants with sanger activity
@@ -220,15 +293,19 @@ class VariantHandler(VariantLoader):
         if case_id:
             query['case_id'] = case_id
 
-        return self.variant_collection.find(query)
+        return self.variant_collection.find(query, variant_projection(projection))
 
-    def variant(self, document_id, gene_panels=None, case_id=None):
+    def variant(self, document_id, gene_panels=None, case_id=None, projection=None):
         """Returns the specified variant.
 
+           If a projection is given the variant is returned as it is fetched,
+           without the gene information.
+
            Arguments:
                document_id : A md5 key that represents the variant or "variant_id"
                gene_panels(List[GenePanel])
                case_id (str): case id (will search with "variant_id")
+               projection(str or dict): A profile in VARIANT_PROJECTIONS or the fields to return
 
            Returns:
                variant_object(Variant): A odm variant object
@@ -242,6 +319,10 @@ class VariantHandler(VariantLoader):
             # search with a unique id
             query['_id'] = document_id
 
+        projection = variant_projection(projection)
+        if projection is not None:
+            return self.variant_collection.find_one(query, projection)
+
         variant_obj = self.variant_collection.find_one(query)
         if variant_obj:
             variant_obj = self.add_gene_info(variant_obj, gene_panels)
@@ -253,7 +334,7 @@ class VariantHandler(VariantLoader):
 
     def gene_variants(self, query=None,
                    category='snv', variant_type=['clinical'],
-                   nr_of_variants=50, skip=0):
+                   nr_of_variants=50, skip=0, institute_ids=None):
         """Return all variants seen in a given gene.
 
         If skip not equal to 0 skip the first n variants.
@@ -264,10 +345,12 @@ class VariantHandler(VariantLoader):
             category(str): 'sv', 'str', 'snv' or 'cancer'
             nr_of_variants(int): if -1 return all variants
             skip(int): How many variants to skip
+            institute_ids(list(str)): Only return variants from these institutes
         """
 
         mongo_variant_query = self.build_variant_query(query=query,
-                                   category=category, variant_type=variant_type)
+                                   category=category, variant_type=variant_type,
+                                   institute_ids=institute_ids)
 
         sorting = [('rank_score', pymongo.DESCENDING)]
 
@@ -333,12 +416,7 @@ class VariantHandler(VariantLoader):
 
         elif institute_id:
 
-            query = self.case_collection.aggregate([
-                {'$match': {'collaborators': institute_id, 'causatives': {'$exists': True}}},
-                {'$unwind': '$causatives'},
-                {'$group': {'_id': '$causatives'}}
-            ])
-            causatives = [item['_id'] for item in query]
+            causatives = [item['_id'] for item in self.institute_causatives(institute_id)]
 
         return causatives
 
@@ -358,23 +436,18 @@ class VariantHandler(VariantLoader):
                 causatives(iterable(Variant))
         """
         institute_id = case_obj['owner'] if case_obj else institute_obj['_id']
-        institute_causative_variant_ids = self.get_causatives(institute_id)
-        if len(institute_causative_variant_ids) == 0:
-            return []
-
+        # exclude variants that are marked causative in "case_obj"
+        case_causative_ids = set()
         if case_obj:
-            # exclude variants that are marked causative in "case_obj"
             case_causative_ids = set(case_obj.get('causatives', []))
-            institute_causative_variant_ids = list(
-                set(institute_causative_variant_ids).difference(case_causative_ids)
-            )
 
-        # convert from unique ids to general "variant_id"
-        query = self.variant_collection.find(
-            {'_id': {'$in': institute_causative_variant_ids}},
-            {'variant_id': 1}
-        )
-        positional_variant_ids = [item['variant_id'] for item in query]
+        # the index holds the general "variant_id" of the causatives
+        positional_variant_ids = list(set(
+            item['variant_id'] for item in self.institute_causatives(institute_id)
+            if item['_id'] not in case_causative_ids
+        ))
+        if len(positional_variant_ids) == 0:
+            return []
 
         filters = {'variant_id': {'$in': positional_variant_ids}}
         if case_obj:
@@ -395,19 +468,21 @@ class VariantHandler(VariantLoader):
             other_variant(dict)
         """
         # variant id without "*_[variant_type]"
-        variant_id = variant_obj['display_name'].rsplit('_', 1)[0]
+        simple_id = causative_simple_id(variant_obj)
 
-        institute_causatives = self.get_causatives(variant_obj['institute'])
-        for causative_id in institute_causatives:
-            other_variant = self.variant(causative_id)
-            if not other_variant:
-                continue
-            not_same_case = other_variant['case_id'] != case_obj['_id']
-            same_variant = other_variant['display_name'].startswith(variant_id)
-            if not_same_case and same_variant:
-                yield other_variant
+        causative_ids = [
+            item['_id'] for item in self.institute_causatives(
+                variant_obj['institute'], simple_id=simple_id, exclude_case=case_obj['_id'])
+        ]
+        if not causative_ids:
+            return
+
+        # Only return the causatives that are still in the database
+        for other_variant in self.variant_collection.find(
+                {'_id': {'$in': causative_ids}}, CAUSATIVE_PROJECTION):
+            yield other_variant
 
-    def delete_variants(self, case_id, variant_type, category=None):
+    def delete_variants(self, case_id, variant_type, category=None, keep_generation=None):
         """Delete variants of one type for a case
 
             This is used when a case is reanalyzed
@@ -416,6 +491,10 @@ class VariantHandler(VariantLoader):
                 case_id(str): The case id
                 variant_type(str): 'research' or 'clinical'
                 category(str): 'snv', 'sv' or 'cancer'
+                keep_generation(str): Only delete variants from other loads than this
+
+            Returns:
+                nr_deleted(int)
         """
         category = category or ''
         LOG.info("Deleting old {0} {1} variants for case {2}".format(
@@ -423,10 +502,15 @@ class VariantHandler(VariantLoader):
         query = {'case_id': case_id, 'variant_type': variant_type}
         if category:
             query['category'] = category
+        if keep_generation:
+            query['load_generation'] = {'$ne': keep_generation}
         result = self.variant_collection.delete_many(query)
         LOG.info("{0} variants deleted".format(result.deleted_count))
+        if result.deleted_count:
+            self.update_variant_counts(case_id)
+        return result.deleted_count
 
-    def overlapping(self, variant_obj):
+    def overlapping(self, variant_obj, projection=None):
         """Return overlapping variants.
 
         Look at the genes that a variant overlaps to.
@@ -437,6 +521,7 @@ class VariantHandler(VariantLoader):
 
         Args:
             variant_obj(dict)
+            projection(str or dict): A profile in VARIANT_PROJECTIONS or the fields to return
 
         Returns:
             variants(iterable(dict))
@@ -454,10 +539,69 @@ class VariantHandler(VariantLoader):
 
         sort_key = [('rank_score', pymongo.DESCENDING)]
         # We collect the 30 most severe overlapping variants
-        variants = self.variant_collection.find(query).sort(sort_key).limit(30)
+        variants = self.variant_collection.find(
+            query, variant_projection(projection)).sort(sort_key).limit(30)
 
         return variants
 
+    def overlapping_variants(self, variant_objs, limit=30, projection='overlapping'):
+        """Return the overlapping variants for a list of variants from one case
+
+        Does the same as `overlapping` for all variants. Variants with the same genes, like
+        the variants of a gene on a page, share one query, and each query returns at most
+        limit variants.
+
+        Args:
+            variant_objs(list(dict))
+            limit(int): Max number of overlapping variants per variant
+            projection(str or dict): A profile in VARIANT_PROJECTIONS or the fields to return
+
+        Returns:
+            overlapping(dict): {<variant _id>: [<overlapping variant>, ...]}
+        """
+        overlapping = {variant_obj['_id']: [] for variant_obj in variant_objs}
+
+        variants_by_genes = {}
+        for variant_obj in variant_objs:
+            if not variant_obj.get('hgnc_ids'):
+                continue
+            #This is the category of the variants that we want to collect
+            category = 'snv' if variant_obj['category'] == 'sv' else 'sv'
+            key = (category, frozenset(variant_obj['hgnc_ids']))
+            variants_by_genes.setdefault(key, []).append(variant_obj)
+
+        sort_key = [('rank_score', pymongo.DESCENDING)]
+        for (category, hgnc_ids), gene_variants in variants_by_genes.items():
+            query = {
+                '$and': [
+                    {'case_id': gene_variants[0]['case_id']},
+                    {'category': category},
+                    {'hgnc_ids' : { '$in' : list(hgnc_ids)}}
+                ]
+            }
+            other_variants = list(self.variant_collection.find(
+                query, variant_projection(projection)).sort(sort_key).limit(limit))
+            for variant_obj in gene_variants:
+                overlapping[variant_obj['_id']] = list(other_variants)
+
+        return overlapping
+
+    def variants_by_id(self, variant_ids, projection=None):
+        """Fetch many variants by their document ids with one query
+
+        Args:
+            variant_ids(iterable(str))
+            projection(str or dict): A profile in VARIANT_PROJECTIONS or the fields to return
+
+        Returns:
+            variants(dict): {<variant _id>: <variant>}
+        """
+        query = {'_id': {'$in': list(variant_ids)}}
+        return {
+            variant_obj['_id']: variant_obj
+            for variant_obj in self.variant_collection.find(query, variant_projection(projection))
+        }
+
     def evaluated_variants(self, case_id):
         """Returns variants that has been evaluated
 
@@ -614,3 +758,60 @@ class VariantHandler(VariantLoader):
 
         result = self.variant_collection.find(query)
         return result
+
+
+def page_key(variant_obj, sort_key='variant_rank'):
+    """Return the key used to fetch the variants after a variant
+
+    Args:
+        variant_obj(scout.models.Variant)
+        sort_key(str): ['variant_rank', 'rank_score', 'position']
+
+    Returns:
+        key(tuple): (<value of the sort field>, <_id>)
+    """
+    field = SORT_KEYS[sort_key][0][0]
+    return (variant_obj.get(field), variant_obj['_id'])
+
+
+def seek_query(sort_key, after):
+    """Build a query for the variants that comes after a key in sort order
+
+    Args:
+        sort_key(str): ['variant_rank', 'rank_score', 'position']
+        after(tuple): (<value of the sort field>, <_id>)
+
+    Returns:
+        query(dict)
+    """
+    value, variant_id = after
+    field, order = SORT_KEYS[sort_key][0]
+    same_value = {field: value, '_id': {'$gt': variant_id}}
+    if value is None:
+        # Missing values sort first in ascending and last in descending order
+        if order == pymongo.DESCENDING:
+            return same_value
+        return {'$or': [{field: {'$ne': None}}, same_value]}
+
+    operator = '$gt' if order == pymongo.ASCENDING else '$lt'
+    return {'$or': [
+        {field: {operator: value}},
+        same_value,
+    ]}
+
+
+def variant_projection(projection):
+    """Return the fields to fetch for a projection profile
+
+    Args:
+        projection(str or dict): A profile in VARIANT_PROJECTIONS, fields or None
+
+    Returns:
+        projection(dict): The fields to fetch, None for all fields
+    """
+    if projection is None or isinstance(projection, dict):
+        return projection
+    try:
+        return VARIANT_PROJECTIONS[projection]
+    except KeyError:
+        raise ValueError("Unknown variant projection: {0}".format(projection))
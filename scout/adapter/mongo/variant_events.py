@@ -287,6 +287,7 @@ class VariantEventHandler(object):
             },
             return_document=pymongo.ReturnDocument.AFTER
         )
+        self.update_causative_index(updated_case)
 
         LOG.info("Creating case event for marking {0}" \
                     " causative".format(variant['display_name']))
@@ -353,6 +354,7 @@ class VariantEventHandler(object):
                 },
                 return_document=pymongo.ReturnDocument.AFTER
             )
+        self.update_causative_index(updated_case)
 
         LOG.info("Creating events for unmarking variant {0} " \
                     "causative".format(display_name))
@@ -1,34 +1,68 @@
 # -*- coding: utf-8 -*-
 # stdlib modules
 import logging
+import multiprocessing
+import os
 import re
 import pathlib
 import tempfile
 
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from datetime import (datetime, timedelta)
+from itertools import (groupby, islice)
 from pprint import pprint as pp
 
 # Third party modules
+import numpy as np
 import pymongo
+from bson import ObjectId
 from pymongo.errors import (DuplicateKeyError, BulkWriteError)
 
 from cyvcf2 import VCF
-from intervaltree import IntervalTree
 
 # Local modules
 from scout.parse.variant.headers import (parse_rank_results_header,
                                          parse_vep_header)
-from scout.parse.variant.rank_score import parse_rank_score
+from scout.parse.variant.rank_score import parse_rank_scores
 
 from scout.parse.variant import parse_variant
 from scout.build import build_variant
 
+from .bulk_writer import VariantBulkWriter
+
 from scout.exceptions import IntegrityError
 
-from scout.constants import (CHROMOSOMES, FILE_TYPE_MAP)
+from scout.constants import (CHR_PATTERN, CHROMOSOMES, FILE_TYPE_MAP, INDEXES)
 
 LOG = logging.getLogger(__name__)
 
+# The fields of a variant that are used when updating compounds
+COMPOUND_PROJECTION = {
+    'chromosome': 1,
+    'position': 1,
+    'end': 1,
+    'rank_score': 1,
+    'compounds': 1,
+    'genes.hgnc_id': 1,
+    'genes.hgnc_symbol': 1,
+    'genes.region_annotation': 1,
+    'genes.functional_annotation': 1,
+}
+
+# Max number of compound updates in one bulk write
+COMPOUND_BULK_SIZE = 10000
+
+# Nr of bases that a worker parses at a time in a parallel load, the built variants of a
+# window are held in memory until they are sent back
+REGION_WINDOW_SIZE = 5000000
+
+# A shadow load writes and ranks the new variants here, they are not seen by any query
+# until they are copied to the variant collection
+VARIANT_STAGING_COLLECTION = 'variant_staging'
+
+# Max number of variants in one bulk when copying staged variants
+STAGING_BULK_SIZE = 5000
+
 
 class VariantLoader(object):
 
@@ -54,54 +88,95 @@ class VariantLoader(object):
         )
         return new_variant
 
-    def update_variant_rank(self, case_obj, variant_type='clinical', category='snv'):
+    def update_variant_fields(self, variant_id, fields):
+        """Set some fields of one variant document in the database.
+
+        Use this instead of update_variant when the variant was fetched with a projection,
+        since replacing the document would remove the fields that were not fetched.
+
+        Args:
+            variant_id(str): The _id of the variant
+            fields(dict): {<field, dotted for nested fields>: <value>}
+
+        Returns:
+            nr_updated(int)
+        """
+        if not fields:
+            return 0
+        LOG.debug('Updating fields %s of variant %s', ', '.join(fields), variant_id)
+        result = self.variant_collection.update_one({'_id': variant_id}, {'$set': fields})
+        return result.modified_count
+
+    def update_variant_rank(self, case_obj, variant_type='clinical', category='snv',
+                            generation=None):
         """Updates the manual rank for all variants in a case
 
         Add a variant rank based on the rank score
         Whenever variants are added or removed from a case we need to update the variant rank
 
+        Only the variants whose rank changes are updated. Variants with the same rank score
+        keep their previous order, so reloading a region does not rewrite the whole case.
+
         Args:
             case_obj(Case)
             variant_type(str)
+            generation(str): Rank the staged variants from this load instead
+
+        Returns:
+            nr_updated(int)
         """
-        # Get all variants sorted by rank score
-        variants = self.variant_collection.find({
+        collection = self._load_collection(generation)
+        query = {
             'case_id': case_obj['_id'],
             'category': category,
             'variant_type': variant_type,
-        }).sort('rank_score', pymongo.DESCENDING)
+        }
+        if generation:
+            query['load_generation'] = generation
+        # Get all variants sorted by rank score
+        variants = collection.find(
+            query,
+            {'rank_score': 1, 'variant_rank': 1}
+        ).sort('rank_score', pymongo.DESCENDING)
 
         LOG.info("Updating variant_rank for all variants")
 
         requests = []
+        nr_updated = 0
 
-        for index, var_obj in enumerate(variants):
-            if len(requests) > 5000:
-                try:
-                    self.variant_collection.bulk_write(requests, ordered=False)
-                    requests = []
-                except BulkWriteError as err:
-                    LOG.warning("Updating variant rank failed")
-                    raise err
+        for index, var_obj in enumerate(ranked_variants(variants)):
+            variant_rank = index + 1
+            if var_obj.get('variant_rank') == variant_rank:
+                continue
 
-            operation = pymongo.UpdateOne(
+            requests.append(pymongo.UpdateOne(
                 {'_id': var_obj['_id']},
                 {
                     '$set': {
-                        'variant_rank': index + 1,
+                        'variant_rank': variant_rank,
                     }
-                })
-            requests.append(operation)
+                }))
+            nr_updated += 1
+
+            if len(requests) >= 5000:
+                self._update_variant_ranks(requests, collection)
+                requests = []
 
         #Update the final bulk
+        if requests:
+            self._update_variant_ranks(requests, collection)
+
+        LOG.info("Variant rank updated for %s variants", nr_updated)
+        return nr_updated
+
+    def _update_variant_ranks(self, requests, collection):
+        """Write a bulk of variant rank updates"""
         try:
-            self.variant_collection.bulk_write(requests, ordered=False)
+            collection.bulk_write(requests, ordered=False)
         except BulkWriteError as err:
             LOG.warning("Updating variant rank failed")
             raise err
 
-        LOG.info("Updating variant_rank done")
-
     def update_variant_compounds(self, variant, variant_objs = None):
         """Update compounds for a variant.
 
@@ -110,6 +185,7 @@ class VariantLoader(object):
         Args:
             variant(scout.models.Variant)
             variant_objs(dict): A dictionary with _ids as keys and variant objs as values.
+                                If None the compounds are fetched from the database.
 
         Returns:
             compound_objs(list(dict)): A dictionary with updated compound objects.
@@ -120,7 +196,7 @@ class VariantLoader(object):
             not_loaded = True
             gene_objs = []
             # Check if the compound variant exists
-            if variant_objs:
+            if variant_objs is not None:
                 variant_obj = variant_objs.get(compound['variant'])
             else:
                 variant_obj = self.variant_collection.find_one({'_id': compound['variant']})
@@ -195,13 +271,23 @@ class VariantLoader(object):
             LOG.warning("Updating compounds failed")
             raise err
 
-    def update_case_compounds(self, case_obj, build='37'):
+    def update_case_compounds(self, case_obj, build='37', threads=None):
         """Update the compounds for a case
 
-        Loop over all coding intervals to get coordinates for all potential compound positions.
-        Update all variants within a gene with a bulk operation.
-        """
+        Every combination of chromosome, variant type and category is updated
+        in a separate job, the jobs are run in a pool of threads. A job fetches
+        the fields needed for compounds of the variants on the chromosome in order
+        of position, groups them by coding region and updates the compounds of
+        each region. The updates are written with large unordered bulk operations.
 
+        Args:
+            case_obj(dict)
+            build(str)
+            threads(int): Number of threads, defaults to the number of CPUs
+
+        Returns:
+            nr_updated(int): Number of variants with updated compounds
+        """
         case_id = case_obj['_id']
         # Possible categories 'snv', 'sv', 'str', 'cancer':
         categories = set()
@@ -214,78 +300,90 @@ class VariantLoader(object):
                 variant_types.add(FILE_TYPE_MAP[file_type]['variant_type'])
 
         coding_intervals = self.get_coding_intervals(build=build)
-        # Loop over all intervals
-        for chrom in CHROMOSOMES:
-            intervals = coding_intervals.get(chrom, IntervalTree())
-            for var_type in variant_types:
-                for category in categories:
-                    LOG.info("Updating compounds on chromosome:{0}, type:{1}, category:{2} for case:{3}".format(
-                             chrom, var_type, category, case_id))
-
-                    # Fetch all variants from a chromosome
-                    query  = {
-                        'variant_type': var_type,
-                        'chrom': chrom,
-                    }
+        jobs = [
+            (chrom, var_type, category)
+            for chrom in CHROMOSOMES for var_type in variant_types for category in categories
+        ]
+        threads = threads or os.cpu_count() or 1
+        LOG.info("Updating compounds for case %s in %s jobs with %s threads",
+                 case_id, len(jobs), threads)
 
-                    # Get all variants from the database of the specific type
-                    variant_objs = self.variants(
-                        case_id=case_id,
-                        query=query,
-                        category=category,
-                        nr_of_variants=-1,
-                        sort_key='position'
-                    )
+        def update_job(job):
+            chrom, var_type, category = job
+            return self._update_chromosome_compounds(
+                case_id, chrom, var_type, category, coding_intervals)
 
-                    # Initiate a bulk
-                    bulk = {}
-                    current_region = None
-                    special = False
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            nr_updated = sum(executor.map(update_job, jobs))
 
-                    # Loop over the variants and check if they are in a coding region
-                    for var_obj in variant_objs:
-                        var_id = var_obj['_id']
-                        var_chrom = var_obj['chromosome']
-                        var_start = var_obj['position']
-                        var_end = var_obj['end'] + 1
+        LOG.info("All compounds updated, %s variants with compounds", nr_updated)
+        return nr_updated
 
-                        update_bulk = True
-                        new_region = None
+    def _update_chromosome_compounds(self, case_id, chrom, variant_type, category,
+                                     coding_intervals, bulk_size=COMPOUND_BULK_SIZE):
+        """Update the compounds of the variants of a case on one chromosome
 
-                        # Check if the variant is in a coding region
-                        genomic_regions = coding_intervals.get(var_chrom, IntervalTree()).search(var_start, var_end)
-
-
-                        # If the variant is in a coding region
-                        if genomic_regions:
-                            # We know there is data here so get the interval id
-                            new_region = genomic_regions.pop().data
+        Args:
+            case_id(str)
+            chrom(str)
+            variant_type(str)
+            category(str)
+            coding_intervals(CodingIntervals)
+            bulk_size(int): Max number of updates in one bulk write
 
-                        if new_region and (new_region == current_region):
-                            # If the variant is in the same region as previous
-                            # we add it to the same bulk
-                            update_bulk = False
+        Returns:
+            nr_updated(int)
+        """
+        LOG.debug("Updating compounds on chromosome:%s, type:%s, category:%s for case:%s",
+                  chrom, variant_type, category, case_id)
+        query = {
+            'case_id': case_id,
+            'category': category,
+            'variant_type': variant_type,
+            'chromosome': chrom,
+        }
+        # Each thread gets its own projection, the driver may add _id to it
+        variant_objs = self.variant_collection.find(
+            query, dict(COMPOUND_PROJECTION)).sort('position', pymongo.ASCENDING)
 
-                        current_region = new_region
+        def variant_region(var_obj):
+            return coding_intervals.region(
+                var_obj['chromosome'], var_obj['position'], var_obj['end'] + 1)
 
-                        # If the variant is not in a current region we update the compounds
-                        # from the previous region, if any. Otherwise continue
-                        if update_bulk and bulk:
-                            self.update_compounds(bulk)
-                            self.update_mongo_compound_variants(bulk)
-                            bulk = {}
+        requests = []
+        nr_updated = 0
+        for region, region_variants in groupby(variant_objs, key=variant_region):
+            if not region:
+                continue
+            bulk = {var_obj['_id']: var_obj for var_obj in region_variants}
+            self.update_compounds(bulk)
+            for var_obj in bulk.values():
+                if not var_obj.get('compounds'):
+                    continue
+                requests.append(pymongo.UpdateOne(
+                    {'_id': var_obj['_id']}, {'$set': {'compounds': var_obj['compounds']}}))
 
-                        if new_region:
-                            bulk[var_id] = var_obj
+            if len(requests) >= bulk_size:
+                nr_updated += self._write_compound_requests(requests)
+                requests = []
 
-                    if not bulk:
-                        continue
+        nr_updated += self._write_compound_requests(requests)
+        return nr_updated
 
-                    self.update_compounds(bulk)
-                    self.update_mongo_compound_variants(bulk)
+    def _write_compound_requests(self, requests):
+        """Write compound updates with an unordered bulk operation
 
-        LOG.info("All compounds updated")
-        return
+        Returns:
+            nr_requests(int)
+        """
+        if not requests:
+            return 0
+        try:
+            self.variant_collection.bulk_write(requests, ordered=False)
+        except BulkWriteError as err:
+            LOG.warning("Updating compounds failed")
+            raise err
+        return len(requests)
 
     def load_variant(self, variant_obj):
         """Load a variant object
@@ -328,169 +426,174 @@ class VariantLoader(object):
             variant = self.variant_collection.find_one({'_id': variant_obj['_id']})
         return result
 
-    def load_variant_bulk(self, variants):
+    def load_variant_bulk(self, variants, write_concern=None):
         """Load a bulk of variants
 
+        Variants that already exist get their compounds updated.
+
         Args:
             variants(iterable(scout.models.Variant))
+            write_concern(dict): See VariantBulkWriter
 
         Returns:
-            object_ids
+            nr_inserted(int): Nr of new variants
         """
-        if not len(variants) > 0:
-            return
-
         LOG.debug("Loading variant bulk")
-        try:
-            result = self.variant_collection.insert_many(variants)
-        except (DuplicateKeyError, BulkWriteError) as err:
-            # If the bulk write is wrong there are probably some variants already existing
-            # In the database. So insert each variant
-            for var_obj in variants:
-                try:
-                    self.upsert_variant(var_obj)
-                except IntegrityError as err:
-                    pass
+        with VariantBulkWriter(self.variant_collection, write_concern=write_concern) as writer:
+            writer.add_many(variants)
+        return writer.nr_inserted
+
+    def _insert_variant_bulk(self, bulk, coding, stats, writer):
+        """Insert a bulk of variants, update the compounds first if the bulk is from a coding region
 
-        return
+        Args:
+            bulk(dict): A dictionary with _ids as keys and variant objs as values
+            coding(bool): If the variants are in a coding region
+            stats(dict): Load statistics, see `new_load_stats`
+            writer(VariantBulkWriter)
+
+        Returns:
+            nr_inserted(int)
+        """
+        if coding:
+            self.update_compounds(bulk)
+
+        # The variants are written in the background, this is the time spent waiting for the writer
+        start_insert = datetime.now()
+        writer.add_many(bulk.values())
+        stats['insert_time'] += datetime.now() - start_insert
+        stats['inserted'] += len(bulk)
+
+        return len(bulk)
+
+    def _close_writer(self, writer, stats):
+        """Wait for the writer to insert the last variants and add its statistics"""
+        start_insert = datetime.now()
+        writer.close()
+        stats['insert_time'] += datetime.now() - start_insert
+        stats['nr_bulks'] += writer.nr_bulks
 
     def _load_variants(self, variants, variant_type, case_obj, individual_positions, rank_threshold,
                        institute_id, build=None, rank_results_header=None, vep_header=None,
-                       category='snv', sample_info = None):
+                       category='snv', sample_info = None, write_concern=None,
+                       generation=None):
         """Perform the loading of variants
 
         This is the function that loops over the variants, parse them and build the variant
-        objects so they are ready to be inserted into the database.
+        objects so they are ready to be inserted into the database. The variants are inserted
+        by a VariantBulkWriter while the next variants are parsed.
 
         """
         build = build or '37'
-        genes = [gene_obj for gene_obj in self.all_genes(build=build)]
+        # The gene information is shared with other loads through the reference cache
         gene_to_panels = self.gene_to_panels(case_obj)
-        hgncid_to_gene = self.hgncid_to_gene(genes=genes)
-        genomic_intervals = self.get_coding_intervals(genes=genes)
+        hgncid_to_gene = self.hgncid_to_gene(build=build)
+        genomic_intervals = self.get_coding_intervals(build=build)
 
         LOG.info("Start inserting {0} {1} variants into database".format(variant_type, category))
         start_insertion = datetime.now()
-        start_five_thousand = datetime.now()
-        # These are the number of parsed varaints
-        nr_variants = 0
-        # These are the number of variants that meet the criteria and gets inserted
-        nr_inserted = 0
-        # This is to keep track of blocks of inserted variants
-        inserted = 1
-
-        nr_bulks = 0
+        stats = new_load_stats()
+
+        variant_objs = parse_variants(
+            variants=variants,
+            case_obj=case_obj,
+            variant_type=variant_type,
+            individual_positions=individual_positions,
+            rank_threshold=rank_threshold,
+            institute_id=institute_id,
+            gene_to_panels=gene_to_panels,
+            hgncid_to_gene=hgncid_to_gene,
+            rank_results_header=rank_results_header,
+            vep_header=vep_header,
+            category=category,
+            sample_info=sample_info,
+            stats=stats,
+        )
 
         # We want to load batches of variants to reduce the number of network round trips
-        bulk = {}
-        current_region = None
-
-        for nr_variants, variant in enumerate(variants):
-            # All MT variants are loaded
-            mt_variant = 'MT' in variant.CHROM
-            rank_score = parse_rank_score(variant.INFO.get('RankScore'), case_obj['_id'])
-
-            # Check if the variant should be loaded at all
-            # if rank score is None means there are no rank scores annotated, all variants will be loaded
-            # Otherwise we load all variants above a rank score treshold
-            # Except for MT variants where we load all variants
-            if (rank_score is None) or (rank_score > rank_threshold) or mt_variant:
-                nr_inserted += 1
-                # Parse the vcf variant
-                parsed_variant = parse_variant(
-                    variant=variant,
-                    case=case_obj,
-                    variant_type=variant_type,
-                    rank_results_header=rank_results_header,
-                    vep_header=vep_header,
-                    individual_positions=individual_positions,
-                    category=category,
-                )
+        writer = VariantBulkWriter(self._load_collection(generation), generation=generation,
+                                   write_concern=write_concern)
+        with writer:
+            for coding, bulk in variant_bulks(variant_objs, genomic_intervals):
+                self._insert_variant_bulk(bulk, coding, stats, writer)
+            self._close_writer(writer, stats)
 
-                # Build the variant object
-                variant_obj = build_variant(
-                    variant=parsed_variant,
-                    institute_id=institute_id,
-                    gene_to_panels=gene_to_panels,
-                    hgncid_to_gene=hgncid_to_gene,
-                    sample_info=sample_info
-                )
+        LOG.info("All variants inserted, time to insert variants: {0}".format(
+            datetime.now() - start_insertion))
+        log_load_stats(stats)
 
-                # Check if the variant is in a genomic region
-                var_chrom = variant_obj['chromosome']
-                var_start = variant_obj['position']
-                # We need to make sure that the interval has a length > 0
-                var_end = variant_obj['end'] + 1
-                var_id = variant_obj['_id']
-                # If the bulk should be loaded or not
-                load = True
-                new_region = None
+        return stats['inserted']
 
-                genomic_regions = genomic_intervals.get(var_chrom, IntervalTree()).search(var_start, var_end)
+    def _load_variants_parallel(self, variant_file, regions, processes, variant_type, case_obj,
+                                individual_positions, rank_threshold, institute_id, build=None,
+                                rank_results_header=None, vep_header=None, category='snv',
+                                sample_info=None, write_concern=None, generation=None,
+                                window_size=REGION_WINDOW_SIZE):
+        """Perform the loading of variants with a pool of worker processes
 
-                # If the variant is in a coding region
-                if genomic_regions:
-                    # We know there is data here so get the interval id
-                    new_region = genomic_regions.pop().data
-                    # If the variant is in the same region as previous
-                    # we add it to the same bulk
-                    if new_region == current_region:
-                        load = False
+        The regions, usually one per chromosome, are split into windows of about window_size
+        bases that are parsed and built in separate processes. The windows are split between
+        coding regions, so the workers can group the variants into bulks on their own. The
+        bulks of a window are sent back and inserted by this process, so only a few windows
+        are held in memory at a time.
 
-                # This is the case where the variant is intergenic
-                else:
-                    # If the previous variant was also intergenic we add the variant to the bulk
-                    if not current_region:
-                        load = False
-                    # We need to have a max size of the bulk
-                    if len(bulk) > 10000:
-                        load = True
-                # Load the variant object
-                if load:
-                    # If the variant bulk contains coding variants we want to update the compounds
-                    if current_region:
-                        self.update_compounds(bulk)
-                    try:
-                        # Load the variants
-                        self.load_variant_bulk(list(bulk.values()))
-                        nr_bulks += 1
-                    except IntegrityError as error:
-                        pass
-                    bulk = {}
-
-                current_region = new_region
-                bulk[var_id] = variant_obj
-
-                if (nr_variants != 0 and nr_variants % 5000 == 0):
-                    LOG.info("%s variants parsed", str(nr_variants))
-                    LOG.info("Time to parse variants: %s",
-                                (datetime.now() - start_five_thousand))
-                    start_five_thousand = datetime.now()
-
-                if (nr_inserted != 0 and (nr_inserted * inserted) % (1000 * inserted) == 0):
-                    LOG.info("%s variants inserted", nr_inserted)
-                    inserted += 1
-        # If the variants are in a coding region we update the compounds
-        if current_region:
-            self.update_compounds(bulk)
+        Args:
+            variant_file(str): Path to a bgzipped and indexed VCF
+            regions(list(str)): The chromosomes to split the file by
+            processes(int): Number of worker processes
+            window_size(int): Nr of bases in a window, see `region_windows`
+
+        Returns:
+            nr_inserted(int)
+        """
+        build = build or '37'
+        coding_intervals = self.get_coding_intervals(build=build)
+        windows = [window for chrom in regions
+                   for window in region_windows(chrom, coding_intervals, window_size)]
+
+        worker_info = {
+            'variant_file': variant_file,
+            'case_obj': case_obj,
+            'variant_type': variant_type,
+            'category': category,
+            'individual_positions': individual_positions,
+            'rank_threshold': rank_threshold,
+            'institute_id': institute_id,
+            'rank_results_header': rank_results_header,
+            'vep_header': vep_header,
+            'sample_info': sample_info,
+            'gene_to_panels': self.gene_to_panels(case_obj),
+            'hgncid_to_gene': self.hgncid_to_gene(build=build),
+            'coding_intervals': coding_intervals,
+        }
+
+        LOG.info("Start inserting {0} {1} variants into database using {2} processes".format(
+            variant_type, category, processes))
+        start_insertion = datetime.now()
+        stats = new_load_stats()
+
+        writer = VariantBulkWriter(self._load_collection(generation), generation=generation,
+                                   write_concern=write_concern)
+        with multiprocessing.Pool(processes, initializer=_init_load_worker,
+                                  initargs=(worker_info,)) as pool, writer:
+            for region, bulks, region_stats in pool.imap_unordered(_load_region, windows):
+                LOG.info("Region %s parsed, %s variants passed the rank threshold",
+                         region, region_stats['built'])
+                merge_load_stats(stats, region_stats)
+                for coding, bulk in bulks:
+                    self._insert_variant_bulk(bulk, coding, stats, writer)
+            self._close_writer(writer, stats)
 
-        # Load the final variant bulk
-        self.load_variant_bulk(list(bulk.values()))
-        nr_bulks += 1
         LOG.info("All variants inserted, time to insert variants: {0}".format(
             datetime.now() - start_insertion))
+        log_load_stats(stats)
 
-        if nr_variants:
-            nr_variants += 1
-        LOG.info("Nr variants parsed: %s", nr_variants)
-        LOG.info("Nr variants inserted: %s", nr_inserted)
-        LOG.debug("Nr bulks inserted: %s", nr_bulks)
-
-        return nr_inserted
+        return stats['inserted']
 
     def load_variants(self, case_obj, variant_type='clinical', category='snv',
                       rank_threshold=None, chrom=None, start=None, end=None,
-                      gene_obj=None, build='37'):
+                      gene_obj=None, build='37', processes=None, write_concern=None,
+                      generation=None):
         """Load variants for a case into scout.
 
         Load the variants for a specific analysis type and category into scout.
@@ -498,6 +601,9 @@ class VariantLoader(object):
         If region or gene is specified, load all variants from that region
         disregarding variant rank(if not specified)
 
+        If processes is more than 1 and no region is specified the file is split by chromosome
+        and parsed in parallel. This requires an indexed VCF.
+
         Args:
             case_obj(dict): A case from the scout database
             variant_type(str): 'clinical' or 'research'. Default: 'clinical'
@@ -507,6 +613,12 @@ class VariantLoader(object):
             start(int): Specify the start position
             end(int): Specify the end position
             gene_obj(dict): A gene object from the database
+            build(str): The genome build
+            processes(int): Number of processes to parse the variants with
+            write_concern(dict): Write concern of the inserts, e.g. {'w': 1, 'j': False}.
+                                 The write concern of the database is used if None
+            generation(str): Shadow load the variants under this load generation, they are
+                             written to the staging collection, see `load_variant_files`
 
         Returns:
             nr_inserted(int)
@@ -582,28 +694,517 @@ class VariantLoader(object):
         else:
             rank_threshold = rank_threshold or 0
 
-        variants = vcf_obj(region)
+        parallel = bool(processes and processes > 1 and not region)
+        if parallel and not is_indexed(variant_file):
+            LOG.warning("Variant file %s is not indexed, loading variants in one process",
+                        variant_file)
+            parallel = False
 
         try:
-            nr_inserted = self._load_variants(
-                variants=variants,
-                variant_type=variant_type,
-                case_obj=case_obj,
-                individual_positions=individual_positions,
-                rank_threshold=rank_threshold,
-                institute_id=institute_id,
-                build=build,
-                rank_results_header=rank_results_header,
-                vep_header=vep_header,
-                category=category,
-                sample_info = sample_info
-            )
+            if parallel:
+                nr_inserted = self._load_variants_parallel(
+                    variant_file=variant_file,
+                    regions=list(vcf_obj.seqnames),
+                    processes=processes,
+                    variant_type=variant_type,
+                    case_obj=case_obj,
+                    individual_positions=individual_positions,
+                    rank_threshold=rank_threshold,
+                    institute_id=institute_id,
+                    build=build,
+                    rank_results_header=rank_results_header,
+                    vep_header=vep_header,
+                    category=category,
+                    sample_info=sample_info,
+                    write_concern=write_concern,
+                    generation=generation
+                )
+            else:
+                nr_inserted = self._load_variants(
+                    variants=vcf_obj(region),
+                    variant_type=variant_type,
+                    case_obj=case_obj,
+                    individual_positions=individual_positions,
+                    rank_threshold=rank_threshold,
+                    institute_id=institute_id,
+                    build=build,
+                    rank_results_header=rank_results_header,
+                    vep_header=vep_header,
+                    category=category,
+                    sample_info = sample_info,
+                    write_concern=write_concern,
+                    generation=generation
+                )
         except Exception as error:
             LOG.exception('unexpected error')
+            if generation:
+                LOG.warning("Deleting staged variants, the loaded variants are kept")
+                self.delete_staged_variants(generation, case_obj['_id'], variant_type,
+                                            category)
+                raise error
             LOG.warning("Deleting inserted variants")
-            self.delete_variants(case_obj['_id'], variant_type)
+            # Only this category, the other files of the case may be loading at the same time
+            self.delete_variants(case_obj['_id'], variant_type, category)
             raise error
 
-        self.update_variant_rank(case_obj, variant_type, category=category)
+        self.update_variant_rank(case_obj, variant_type, category=category,
+                                 generation=generation)
+        if not generation:
+            self.update_variant_counts(case_obj['_id'])
 
         return nr_inserted
+
+    def load_variant_files(self, jobs, workers=1, build='37', shadow=False):
+        """Load several variant files, in parallel threads if workers is more than 1
+
+        The files are independent, so the load time approaches that of the largest file.
+        The gene and coding interval maps are fetched once and shared by the jobs through
+        the reference cache.
+
+        In a shadow load the variants are not deleted first. The new variants are tagged
+        with a load generation and are loaded and ranked in the staging collection, where
+        no query sees them, so the cases keep their variants during the load. When all
+        files are loaded the staged variants are published, see `publish_variant_generation`.
+        If a file fails all staged variants of the load are deleted and the cases keep the
+        variants they had.
+
+        Args:
+            jobs(list(dict)): One per file, {
+                'case_obj': <case_obj>,
+                'variant_type': 'clinical' or 'research',
+                'category': 'snv', 'sv', 'cancer' or 'str',
+                'rank_threshold': <float>,
+                'delete': <bool, if the variants should be deleted first>,
+            }
+            workers(int): Number of files to load at the same time
+            build(str)
+            shadow(bool): Replace the variants of the jobs with a shadow load
+
+        Returns:
+            nr_inserted(list(int)): Nr of variants inserted for each job
+        """
+        if not jobs:
+            return []
+        generation = str(ObjectId()) if shadow else None
+        if generation:
+            self._load_collection(generation).create_indexes(INDEXES[VARIANT_STAGING_COLLECTION])
+        self.hgncid_to_gene(build=build)
+        self.get_coding_intervals(build=build)
+
+        def load_job(job):
+            case_obj = job['case_obj']
+            variant_type, category = job['variant_type'], job['category']
+            start = datetime.now()
+            if job.get('delete') and not generation:
+                self.delete_variants(case_id=case_obj['_id'], variant_type=variant_type,
+                                     category=category)
+            LOG.info("Load %s %s variants for case %s", variant_type, category, case_obj['_id'])
+            nr_inserted = self.load_variants(
+                case_obj=case_obj,
+                variant_type=variant_type,
+                category=category,
+                rank_threshold=job.get('rank_threshold'),
+                build=build,
+                generation=generation,
+            )
+            LOG.info("Loaded %s %s %s variants for case %s in %s", nr_inserted, variant_type,
+                     category, case_obj['_id'], datetime.now() - start)
+            return nr_inserted
+
+        start = datetime.now()
+        workers = min(workers or 1, len(jobs))
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(load_job, job) for job in jobs]
+                try:
+                    results = [future.result() for future in futures]
+                except Exception:
+                    # The files that have not started are not loaded
+                    for future in futures:
+                        future.cancel()
+                    raise
+        except Exception as error:
+            if generation:
+                LOG.warning("Deleting the staged variants of load %s, the cases keep their "
+                            "variants", generation)
+                self.delete_staged_variants(generation)
+            raise error
+        LOG.info("Loaded %s variant files with %s workers in %s", len(jobs), workers,
+                 datetime.now() - start)
+
+        if generation:
+            self.publish_variant_generation(jobs, generation)
+        return results
+
+    def _load_collection(self, generation=None):
+        """Return the collection to load variants into, the staging collection in a shadow load"""
+        if generation:
+            return self.db[VARIANT_STAGING_COLLECTION]
+        return self.variant_collection
+
+    def delete_staged_variants(self, generation, case_id=None, variant_type=None,
+                               category=None):
+        """Delete the variants of a shadow load from the staging collection
+
+        Args:
+            generation(str)
+            case_id(str): Only the variants of this case
+            variant_type(str)
+            category(str)
+
+        Returns:
+            nr_deleted(int)
+        """
+        query = {'load_generation': generation}
+        for field, value in [('case_id', case_id), ('variant_type', variant_type),
+                             ('category', category)]:
+            if value:
+                query[field] = value
+        result = self._load_collection(generation).delete_many(query)
+        LOG.info("%s staged variants deleted", result.deleted_count)
+        return result.deleted_count
+
+    def publish_variant_generation(self, jobs, generation):
+        """Replace the variants of the jobs with the staged variants of a shadow load
+
+        The staged variants are ranked and have their compounds. They are copied in bulks
+        over the variants with the same _id, then the variants of previous loads are deleted.
+        The copy is not atomic, the variants of both loads can be seen while it runs.
+
+        Args:
+            jobs(list(dict)): The jobs of the load, see `load_variant_files`
+            generation(str)
+
+        Returns:
+            nr_published(int)
+        """
+        staging_collection = self._load_collection(generation)
+        nr_published = 0
+        for job in jobs:
+            case_id = job['case_obj']['_id']
+            variant_type, category = job['variant_type'], job['category']
+            LOG.info("Publishing %s %s variants of case %s", variant_type, category, case_id)
+            staged_variants = staging_collection.find({
+                'load_generation': generation,
+                'case_id': case_id,
+                'variant_type': variant_type,
+                'category': category,
+            })
+            requests = []
+            for variant_obj in staged_variants:
+                requests.append(pymongo.ReplaceOne({'_id': variant_obj['_id']}, variant_obj,
+                                                   upsert=True))
+                if len(requests) >= STAGING_BULK_SIZE:
+                    self.variant_collection.bulk_write(requests, ordered=False)
+                    nr_published += len(requests)
+                    requests = []
+            if requests:
+                self.variant_collection.bulk_write(requests, ordered=False)
+                nr_published += len(requests)
+
+            self.delete_variants(case_id, variant_type, category, keep_generation=generation)
+
+        self.delete_staged_variants(generation)
+        for case_id in set(job['case_obj']['_id'] for job in jobs):
+            self.update_variant_counts(case_id)
+        return nr_published
+
+
+def is_indexed(variant_file):
+    """Check if there is a tabix or csi index for a VCF"""
+    return any(os.path.exists(variant_file + suffix) for suffix in ('.tbi', '.csi'))
+
+
+def new_load_stats():
+    """Return a dictionary to collect statistics from a variant load
+
+    Returns:
+        stats(dict)
+    """
+    return {
+        'read': 0,
+        'parsed': 0,
+        'built': 0,
+        'inserted': 0,
+        'nr_bulks': 0,
+        'parse_time': timedelta(),
+        'build_time': timedelta(),
+        'insert_time': timedelta(),
+    }
+
+
+def merge_load_stats(stats, other_stats):
+    """Add the statistics from other_stats to stats"""
+    for key in stats:
+        stats[key] += other_stats.get(key, type(stats[key])())
+
+
+def log_load_stats(stats):
+    """Log the number of variants and the throughput of each stage of a variant load
+
+    Parse and build times are summed over all processes, insert time is wall time.
+    """
+    LOG.info("Nr variants parsed: %s", stats['read'])
+    LOG.info("Nr variants inserted: %s", stats['inserted'])
+    LOG.debug("Nr bulks inserted: %s", stats['nr_bulks'])
+
+    stages = [
+        ('parse', stats['parsed'], stats['parse_time']),
+        ('build', stats['built'], stats['build_time']),
+        ('insert', stats['inserted'], stats['insert_time']),
+    ]
+    for stage, nr_variants, time_spent in stages:
+        seconds = time_spent.total_seconds()
+        rate = nr_variants / seconds if seconds else 0
+        LOG.info("Time to %s variants: %s (%.1f variants/s)", stage, time_spent, rate)
+
+
+def parse_variants(variants, case_obj, variant_type, individual_positions, rank_threshold,
+                   institute_id, gene_to_panels, hgncid_to_gene, rank_results_header=None,
+                   vep_header=None, category='snv', sample_info=None, stats=None):
+    """Parse the vcf variants and build the variant objects that should be loaded
+
+    Variants with a rank score below rank_threshold are skipped, except for MT variants and
+    variants without rank score.
+
+    Args:
+        variants(iterable(cyvcf2.Variant))
+        case_obj(dict)
+        variant_type(str): 'clinical' or 'research'
+        individual_positions(dict)
+        rank_threshold(float)
+        institute_id(str)
+        gene_to_panels(dict)
+        hgncid_to_gene(dict)
+        rank_results_header(list)
+        vep_header(list)
+        category(str): 'snv', 'sv', 'str' or 'cancer'
+        sample_info(dict)
+        stats(dict): Load statistics, see `new_load_stats`
+
+    Yields:
+        variant_obj(scout.models.Variant)
+    """
+    if stats is None:
+        stats = new_load_stats()
+
+    for variant in rank_filter(variants, case_obj['_id'], rank_threshold, stats):
+        start_parse = datetime.now()
+        # Parse the vcf variant
+        parsed_variant = parse_variant(
+            variant=variant,
+            case=case_obj,
+            variant_type=variant_type,
+            rank_results_header=rank_results_header,
+            vep_header=vep_header,
+            individual_positions=individual_positions,
+            category=category,
+        )
+        start_build = datetime.now()
+        stats['parse_time'] += start_build - start_parse
+        stats['parsed'] += 1
+
+        # Build the variant object
+        variant_obj = build_variant(
+            variant=parsed_variant,
+            institute_id=institute_id,
+            gene_to_panels=gene_to_panels,
+            hgncid_to_gene=hgncid_to_gene,
+            sample_info=sample_info
+        )
+        stats['build_time'] += datetime.now() - start_build
+        stats['built'] += 1
+
+        yield variant_obj
+
+
+def rank_filter(variants, case_id, rank_threshold, stats=None, chunk_size=5000):
+    """Skip the variants with a rank score below a threshold
+
+    The rank scores are read for a chunk of records at a time and compared in one
+    numpy operation, so that only the records that pass are parsed further.
+    Variants without rank score and MT variants always pass.
+
+    Args:
+        variants(iterable(cyvcf2.Variant))
+        case_id(str)
+        rank_threshold(float)
+        stats(dict): Load statistics, see `new_load_stats`
+        chunk_size(int)
+
+    Yields:
+        variant(cyvcf2.Variant)
+    """
+    if stats is None:
+        stats = new_load_stats()
+    variants = iter(variants)
+    start_chunk = datetime.now()
+
+    while True:
+        chunk = list(islice(variants, chunk_size))
+        if not chunk:
+            break
+        stats['read'] += len(chunk)
+
+        rank_scores = parse_rank_scores(
+            [variant.INFO.get('RankScore') for variant in chunk], case_id)
+        mt_variants = np.array(['MT' in variant.CHROM for variant in chunk])
+        # nan means there are no rank scores annotated
+        passed = np.isnan(rank_scores) | (rank_scores > rank_threshold) | mt_variants
+
+        for index in np.flatnonzero(passed):
+            yield chunk[index]
+
+        LOG.info("%s variants read", stats['read'])
+        LOG.info("Time to parse variants: %s", datetime.now() - start_chunk)
+        start_chunk = datetime.now()
+
+
+def ranked_variants(variants):
+    """Order variants sorted on rank score by their final rank
+
+    Variants with the same rank score are ordered by their previous rank, variants
+    without a previous rank are put last, so ties keep the order between updates.
+
+    Args:
+        variants(iterable(dict)): Variants sorted by rank score, descending
+
+    Yields:
+        variant(dict)
+    """
+    for _, tied_variants in groupby(variants, key=lambda var_obj: var_obj.get('rank_score')):
+        tied_variants = sorted(tied_variants, key=lambda var_obj: (
+            var_obj.get('variant_rank') is None, var_obj.get('variant_rank') or 0, var_obj['_id']))
+        for var_obj in tied_variants:
+            yield var_obj
+
+
+def variant_bulks(variant_objs, coding_intervals, max_bulk_size=10000):
+    """Group variant objects in bulks that should be inserted together
+
+    Variants in the same coding region are put in the same bulk since they are potential
+    compounds. Consecutive intergenic variants are put in the same bulk up to max_bulk_size.
+    The variants has to be sorted by position.
+
+    Args:
+        variant_objs(iterable(scout.models.Variant))
+        coding_intervals(CodingIntervals): Coding regions, see `get_coding_intervals`
+        max_bulk_size(int)
+
+    Yields:
+        coding(bool), bulk(dict): If the bulk is in a coding region and the bulk
+                                  with _ids as keys and variant objs as values
+    """
+    bulk = {}
+    current_region = None
+
+    for variant_obj in variant_objs:
+        # Check if the variant is in a genomic region
+        var_chrom = variant_obj['chromosome']
+        var_start = variant_obj['position']
+        # We need to make sure that the interval has a length > 0
+        var_end = variant_obj['end'] + 1
+        var_id = variant_obj['_id']
+        # If the bulk should be loaded or not
+        load = True
+
+        new_region = coding_intervals.region(var_chrom, var_start, var_end)
+
+        # If the variant is in a coding region
+        if new_region:
+            # If the variant is in the same region as previous
+            # we add it to the same bulk
+            if new_region == current_region:
+                load = False
+
+        # This is the case where the variant is intergenic
+        else:
+            # If the previous variant was also intergenic we add the variant to the bulk
+            if not current_region:
+                load = False
+            # We need to have a max size of the bulk
+            if len(bulk) > max_bulk_size:
+                load = True
+
+        if load and bulk:
+            # If the variant bulk contains coding variants we want to update the compounds
+            yield bool(current_region), bulk
+            bulk = {}
+
+        current_region = new_region
+        bulk[var_id] = variant_obj
+
+    if bulk:
+        yield bool(current_region), bulk
+
+
+# Information shared by all worker processes in a parallel load, set by _init_load_worker
+_WORKER_INFO = {}
+
+
+def _init_load_worker(worker_info):
+    """Store the information needed to parse variants in a worker process"""
+    _WORKER_INFO.update(worker_info)
+
+
+def region_windows(chrom, coding_intervals, window_size=REGION_WINDOW_SIZE):
+    """Split a chromosome of a VCF into windows that are parsed one at a time
+
+    A new window is started at the first coding region after window_size bases, so the
+    variants of a coding region end up in the same window. The last window is open ended.
+
+    Args:
+        chrom(str): The chromosome as named in the VCF
+        coding_intervals(CodingIntervals)
+        window_size(int)
+
+    Returns:
+        windows(list(tuple)): [(<chrom>, <start>, <end or None>), ...], 1-based and inclusive
+    """
+    windows = []
+    start = 1
+    chrom_match = CHR_PATTERN.match(chrom)
+    for region_start, _ in coding_intervals.intervals(chrom_match.group(2)):
+        if region_start - start >= window_size:
+            windows.append((chrom, start, region_start - 1))
+            start = region_start
+    windows.append((chrom, start, None))
+    return windows
+
+
+def _load_region(window):
+    """Parse and build all variants from a window of a VCF in a worker process
+
+    Args:
+        window(tuple): (<chrom>, <start>, <end or None>), see `region_windows`
+
+    Returns:
+        region(str), bulks(list(tuple)), stats(dict)
+    """
+    info = _WORKER_INFO
+    stats = new_load_stats()
+    vcf_obj = VCF(info['variant_file'])
+
+    chrom, start, end = window
+    region = "{0}:{1}-{2}".format(chrom, start, end or '')
+    # Variants that start in the previous window overlap this one, they are loaded there
+    variants = (variant for variant in vcf_obj(region) if variant.POS >= start)
+
+    variant_objs = parse_variants(
+        variants=variants,
+        case_obj=info['case_obj'],
+        variant_type=info['variant_type'],
+        individual_positions=info['individual_positions'],
+        rank_threshold=info['rank_threshold'],
+        institute_id=info['institute_id'],
+        gene_to_panels=info['gene_to_panels'],
+        hgncid_to_gene=info['hgncid_to_gene'],
+        rank_results_header=info['rank_results_header'],
+        vep_header=info['vep_header'],
+        category=info['category'],
+        sample_info=info['sample_info'],
+        stats=stats,
+    )
+    bulks = list(variant_bulks(variant_objs, info['coding_intervals']))
+
+    return region, bulks, stats
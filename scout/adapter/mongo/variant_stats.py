@@ -0,0 +1,126 @@
+"""
+variant_stats.py
+
+Number of variants of cases by variant type and category.
+
+The variants of cases are counted with one aggregation that is grouped on the
+fields of the caseid_category_varianttype_rankscore index, so the counts can be
+read from the index without fetching the variant documents. The counts of a
+case are stored on the case document as `variant_counts` when variants are
+loaded or deleted. Cases without stored counts are counted once and get their
+counts stored.
+"""
+import logging
+
+import pymongo
+
+LOG = logging.getLogger(__name__)
+
+
+class VariantStatsHandler(object):
+    """Methods to count the variants of cases"""
+
+    def count_case_variants(self, case_ids):
+        """Count the variants of cases in the database
+
+        Args:
+            case_ids(iterable(str))
+
+        Returns:
+            counts(dict): {<case_id>: {<variant_type>: {<category>: <nr_variants>}}}, cases
+                          without variants are included with empty counts
+        """
+        case_ids = list(case_ids)
+        counts = {case_id: {} for case_id in case_ids}
+        if not case_ids:
+            return counts
+
+        pipeline = [
+            {'$match': {'case_id': {'$in': case_ids}}},
+            {'$group': {
+                '_id': {
+                    'case_id': '$case_id',
+                    'category': {'$ifNull': ['$category', None]},
+                    'variant_type': {'$ifNull': ['$variant_type', None]},
+                },
+                'count': {'$sum': 1},
+            }},
+        ]
+        for group in self.variant_collection.aggregate(pipeline):
+            key = group['_id']
+            # The counts are stored with the types and categories as keys
+            if key['variant_type'] is None or key['category'] is None:
+                continue
+            case_counts = counts[key['case_id']].setdefault(key['variant_type'], {})
+            case_counts[key['category']] = group['count']
+        return counts
+
+    def update_variant_counts(self, case_id):
+        """Count the variants of a case and store the counts on the case
+
+        Args:
+            case_id(str)
+
+        Returns:
+            variant_counts(dict): {<variant_type>: {<category>: <nr_variants>}}
+        """
+        variant_counts = self.count_case_variants([case_id])[case_id]
+        LOG.debug("Storing variant counts of case %s", case_id)
+        case_obj = self.case_collection.find_one_and_update(
+            {'_id': case_id},
+            {'$set': {'variant_counts': variant_counts}},
+            projection={'owner': 1, 'collaborators': 1}
+        )
+        # The dashboards show the variants of the cases
+        self.expire_case_dashboard_stats(case_obj)
+        return variant_counts
+
+    def case_variant_counts(self, case_objs, use_stored=True):
+        """Return the variant counts of cases
+
+        Stored counts are used when present, the other cases are counted with one aggregation
+        and the counts are stored on them.
+
+        Args:
+            case_objs(iterable(dict))
+            use_stored(bool): Count all cases in the database and store the new counts
+
+        Returns:
+            counts(dict): {<case_id>: {<variant_type>: {<category>: <nr_variants>}}}
+        """
+        counts = {}
+        missing = []
+        for case_obj in case_objs:
+            if use_stored and case_obj.get('variant_counts') is not None:
+                counts[case_obj['_id']] = case_obj['variant_counts']
+            else:
+                missing.append(case_obj['_id'])
+
+        if missing:
+            LOG.debug("Counting the variants of %s cases", len(missing))
+            missing_counts = self.count_case_variants(missing)
+            self.case_collection.bulk_write([
+                pymongo.UpdateOne({'_id': case_id}, {'$set': {'variant_counts': variant_counts}})
+                for case_id, variant_counts in missing_counts.items()
+            ])
+            counts.update(missing_counts)
+        return counts
+
+
+def nr_variants(variant_counts, variant_type=None, category=None):
+    """Return the nr of variants from the counts of a case
+
+    Args:
+        variant_counts(dict): {<variant_type>: {<category>: <nr_variants>}}
+        variant_type(str): 'clinical' or 'research', None means all
+        category(str): 'snv', 'sv', 'cancer' or 'str', None means all
+
+    Returns:
+        nr_variants(int)
+    """
+    return sum(
+        nr for type_name, categories in variant_counts.items()
+        if variant_type in (None, type_name)
+        for category_name, nr in categories.items()
+        if category in (None, category_name)
+    )
@@ -8,29 +8,13 @@ import click
 import coloredlogs
 import yaml
 
-# Adapter stuff
-from scout.adapter.mongo import MongoAdapter
-from scout.adapter.client import get_connection
+from importlib import import_module
+
 from pymongo.errors import (ConnectionFailure, OperationFailure)
 
 # General, logging
 from scout import __version__
 
-# Commands
-from scout.commands.load import load as load_command
-from scout.commands.export import export
-from scout.commands.wipe_database import wipe
-from scout.commands.setup import setup as setup_command
-from scout.commands.convert import convert
-from scout.commands.query import query as query_command
-from scout.commands.view import view as view_command
-from scout.commands.delete import delete
-from scout.commands.serve import serve
-from scout.commands.update import update as update_command
-from scout.commands.index_command import index as index_command
-
-from scout.adapter.utils import check_connection
-
 try:
     from scoutconfig import *
 except ImportError:
@@ -39,8 +23,47 @@ except ImportError:
 LOG_LEVELS = ['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL']
 LOG = logging.getLogger(__name__)
 
-
-@click.group()
+# The commands are imported when they are invoked, so that a command does not
+# pay for the imports of the others, e.g. the web server for `scout serve`.
+COMMANDS = {
+    'load': 'scout.commands.load:load',
+    'wipe': 'scout.commands.wipe_database:wipe',
+    'setup': 'scout.commands.setup:setup',
+    'export': 'scout.commands.export:export',
+    'convert': 'scout.commands.convert:convert',
+    'query': 'scout.commands.query:query',
+    'view': 'scout.commands.view:view',
+    'delete': 'scout.commands.delete:delete',
+    'serve': 'scout.commands.serve:serve',
+    'update': 'scout.commands.update:update',
+    'index': 'scout.commands.index_command:index',
+}
+
+
+class LazyGroup(click.Group):
+    """A click group that imports its commands when they are used
+
+    Args:
+        lazy_commands(dict): {<command name>: <module>:<attribute>}
+    """
+
+    def __init__(self, *args, lazy_commands=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lazy_commands = lazy_commands or {}
+
+    def list_commands(self, ctx):
+        return sorted(set(super().list_commands(ctx)) | set(self.lazy_commands))
+
+    def get_command(self, ctx, cmd_name):
+        command = super().get_command(ctx, cmd_name)
+        if command is None and cmd_name in self.lazy_commands:
+            module_name, attribute = self.lazy_commands[cmd_name].split(':')
+            command = getattr(import_module(module_name), attribute)
+            self.add_command(command, cmd_name)
+        return command
+
+
+@click.group(cls=LazyGroup, lazy_commands=COMMANDS)
 @click.option('--loglevel', default='INFO', type=click.Choice(LOG_LEVELS),
               help="Set the level of log output.", show_default=True)
 @click.option('-db', '--mongodb', help='Name of mongo database [scout]')
@@ -87,6 +110,10 @@ def cli(context, mongodb, username, password, authdb, host, port, loglevel, conf
         LOG.debug("Setting host to %s", mongo_config['host'])
         LOG.debug("Setting port to %s", mongo_config['port'])
 
+        # The adapter is only needed by commands that use the database
+        from scout.adapter.client import get_connection
+        from scout.adapter.mongo import MongoAdapter
+
         try:
             client = get_connection(**mongo_config)
         except ConnectionFailure:
@@ -110,15 +137,3 @@ def cli(context, mongodb, username, password, authdb, host, port, loglevel, conf
 
     context.obj = mongo_config
 
-
-cli.add_command(load_command)
-cli.add_command(wipe)
-cli.add_command(setup_command)
-cli.add_command(export)
-cli.add_command(convert)
-cli.add_command(query_command)
-cli.add_command(view_command)
-cli.add_command(delete)
-cli.add_command(serve)
-cli.add_command(update_command)
-cli.add_command(index_command)
@@ -48,7 +48,8 @@ def mt_report(context, case_id, test, outpath=None):
         context.abort()
 
     samples = case_obj.get('individuals')
-    mt_variants = list(adapter.variants(case_id=case_id, query=query, nr_of_variants= -1, sort_key='position'))
+    mt_variants = list(adapter.variants(case_id=case_id, query=query, nr_of_variants= -1,
+                                        sort_key='position', projection='mt_report'))
     if not mt_variants:
         LOG.warning('There are no MT variants associated to case {} in database!'.format(case_id))
         context.abort()
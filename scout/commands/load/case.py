@@ -59,9 +59,19 @@ LOG = logging.getLogger(__name__)
     type=click.Path(exists=True),
     help='path to a ped_check.csv file'
 )
+@click.option('--workers',
+    default=1,
+    show_default=True,
+    help='Number of variant files to load at the same time'
+)
+@click.option('--shadow/--no-shadow',
+    default=True,
+    show_default=True,
+    help='Keep the variants of an updated case until the new variants are loaded'
+)
 @click.pass_context
 def case(context, vcf, vcf_sv, vcf_cancer, vcf_str, owner, ped, update, config,
-         no_variants, peddy_ped, peddy_sex, peddy_check):
+         no_variants, peddy_ped, peddy_sex, peddy_check, workers, shadow):
     """Load a case into the database.
 
     A case can be loaded without specifying vcf files and/or bam files
@@ -96,7 +106,7 @@ def case(context, vcf, vcf_sv, vcf_cancer, vcf_str, owner, ped, update, config,
     LOG.info("Use family %s" % config_data['family'])
     
     try:
-        case_obj = adapter.load_case(config_data, update)
+        case_obj = adapter.load_case(config_data, update, workers=workers, shadow=shadow)
     except Exception as err:
         LOG.error("Something went wrong during loading")
         LOG.warning(err)
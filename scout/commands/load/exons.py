@@ -19,8 +19,12 @@ LOG = logging.getLogger(__name__)
     default='37',
     show_default=True,
 )
+@click.option('--staging/--no-staging', default=True, show_default=True,
+    help='Load into a staging collection that replaces the exons when loaded, '
+         'so the old exons are available during the load',
+)
 @click.pass_context
-def exons(context, build):
+def exons(context, build, staging):
     """Load exons into the scout database"""
     
     adapter = context.obj['adapter']
@@ -29,14 +33,14 @@ def exons(context, build):
     # Test if there are any exons loaded
     
     nr_exons = adapter.exons(build=build).count()
-    if nr_exons:
+    if nr_exons and not staging:
         LOG.warning("Dropping all exons ")
         adapter.drop_exons(build=build)
         LOG.info("Exons dropped")
     
     # Load the exons
     ensembl_exons = fetch_ensembl_exons(build=build)
-    load_exons(adapter, ensembl_exons, build)
+    load_exons(adapter, ensembl_exons, build, staging=staging)
 
     adapter.update_indexes()
     
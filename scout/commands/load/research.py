@@ -10,8 +10,12 @@ LOG = logging.getLogger(__name__)
 @click.option('-c', '--case-id', help='family or case id')
 @click.option('-i', '--institute', help='institute id of related cases')
 @click.option('-f', '--force', is_flag=True, help='upload without request')
+@click.option('--workers', default=1, show_default=True,
+              help='Number of variant files to load at the same time')
+@click.option('--shadow/--no-shadow', default=True, show_default=True,
+              help='Keep the research variants of the cases until the new ones are loaded')
 @click.pass_context
-def research(context, case_id, institute, force):
+def research(context, case_id, institute, force, workers, shadow):
     """Upload research variants to cases
 
         If a case is specified, all variants found for that case will be
@@ -45,57 +49,39 @@ def research(context, case_id, institute, force):
         case_objs = adapter.cases(research_requested=True)
 
     default_threshold = 8
+    research_files = [
+        ('vcf_snv_research', 'snv'),
+        ('vcf_sv_research', 'sv'),
+        ('vcf_cancer_research', 'cancer'),
+    ]
     files = False
+    jobs = []
+    research_cases = []
     for case_obj in case_objs:
         if force or case_obj['research_requested']:
-            # Test to upload research snvs
-            if case_obj['vcf_files'].get('vcf_snv_research'):
+            for file_name, category in research_files:
+                # Test to upload the research variants of the category
+                if not case_obj['vcf_files'].get(file_name):
+                    continue
                 files = True
-                adapter.delete_variants(case_id=case_obj['_id'],
-                                        variant_type='research',
-                                        category='snv')
-
-                LOG.info("Load research SNV for: %s", case_obj['_id'])
-                adapter.load_variants(
-                    case_obj=case_obj,
-                    variant_type='research',
-                    category='snv',
-                    rank_threshold=default_threshold,
-                    )
-
-            # Test to upload research svs
-            if case_obj['vcf_files'].get('vcf_sv_research'):
-                files = True
-                adapter.delete_variants(case_id=case_obj['_id'],
-                                        variant_type='research',
-                                        category='sv')
-                LOG.info("Load research SV for: %s", case_obj['_id'])
-                adapter.load_variants(
-                    case_obj=case_obj,
-                    variant_type='research',
-                    category='sv',
-                    rank_threshold=default_threshold,
-                    )
-
-            # Test to upload research cancer variants
-            if case_obj['vcf_files'].get('vcf_cancer_research'):
-                files = True
-                adapter.delete_variants(case_id=case_obj['_id'],
-                                        variant_type='research',
-                                        category='cancer')
-
-                LOG.info("Load research cancer for: %s", case_obj['_id'])
-                adapter.load_variants(
-                    case_obj=case_obj,
-                    variant_type='research',
-                    category='cancer',
-                    rank_threshold=default_threshold,
-                    )
+                jobs.append({
+                    'case_obj': case_obj,
+                    'variant_type': 'research',
+                    'category': category,
+                    'rank_threshold': default_threshold,
+                    'delete': True,
+                })
             if not files:
                 LOG.warning("No research files found for case %s", case_id)
                 context.abort()
-            case_obj['is_research'] = True
-            case_obj['research_requested'] = False
-            adapter.update_case(case_obj)
+            research_cases.append(case_obj)
         else:
             LOG.warn("research not requested, use '--force'")
+
+    # The files of all cases are loaded together
+    adapter.load_variant_files(jobs, workers=workers, shadow=shadow)
+
+    for case_obj in research_cases:
+        case_obj['is_research'] = True
+        case_obj['research_requested'] = False
+        adapter.update_case(case_obj)
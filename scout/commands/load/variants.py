@@ -23,10 +23,17 @@ LOG = logging.getLogger(__name__)
 @click.option('--hgnc-symbol', help='If all variants from a gene, specify the gene symbol')
 @click.option('--rank-treshold', default=5, help='Specify the rank score treshold',
                 show_default=True)
+@click.option('--processes', default=1, show_default=True,
+                help='Parse the variants in parallel, one chromosome per process')
+@click.option('-w', '--write-concern',
+                help='Write concern of the inserts, nr of nodes or "majority". '
+                     'Defaults to the write concern of the database')
+@click.option('--journal/--no-journal', default=None,
+                help='If the inserts should wait for the journal')
 @click.pass_context
 def variants(context, case_id, institute, force, cancer, cancer_research, sv, 
              sv_research, snv, snv_research, str_clinical, chrom, start, end, hgnc_id, 
-             hgnc_symbol, rank_treshold):
+             hgnc_symbol, rank_treshold, processes, write_concern, journal):
     """Upload variants to a case
 
         Note that the files has to be linked with the case, 
@@ -44,6 +51,12 @@ def variants(context, case_id, institute, force, cancer, cancer_research, sv,
         LOG.info("No matching case found")
         context.abort()
 
+    write_options = {}
+    if write_concern:
+        write_options['w'] = int(write_concern) if write_concern.isdigit() else write_concern
+    if journal is not None:
+        write_options['j'] = journal
+
     files = [
         {'category': 'cancer', 'variant_type': 'clinical', 'upload': cancer},
         {'category': 'cancer', 'variant_type': 'research', 'upload': cancer_research},
@@ -95,7 +108,9 @@ def variants(context, case_id, institute, force, cancer, cancer_research, sv,
                     chrom=chrom, 
                     start=start, 
                     end=end,
-                    gene_obj=gene_obj
+                    gene_obj=gene_obj,
+                    processes=processes,
+                    write_concern=write_options or None
                 )
             except Exception as e:
                 LOG.warning(e)
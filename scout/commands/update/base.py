@@ -15,6 +15,8 @@ from .panel import panel as panel_command
 from .user import user as user_command
 from .institute import institute as institute_command
 from .phenotype_groups import groups as groups_command
+from .causatives import causatives as causatives_command
+from .search_keys import search_keys as search_keys_command
 
 LOG = logging.getLogger(__name__)
 
@@ -39,3 +41,5 @@ update.add_command(hpo_command)
 update.add_command(gene_command)
 update.add_command(disease_command)
 update.add_command(groups_command)
+update.add_command(causatives_command)
+update.add_command(search_keys_command)
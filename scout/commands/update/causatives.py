@@ -0,0 +1,16 @@
+import logging
+
+import click
+
+LOG = logging.getLogger(__name__)
+
+@click.command('causatives', short_help='Rebuild the causative index')
+@click.pass_context
+def causatives(context):
+    """
+    Rebuild the index of causative variants from the causatives of all cases
+    """
+    adapter = context.obj['adapter']
+    LOG.info("Running scout update causatives")
+    nr_causatives = adapter.rebuild_causative_index()
+    LOG.info("Indexed %s causatives", nr_causatives)
@@ -8,8 +8,10 @@ LOG = logging.getLogger(__name__)
 
 @click.command('compounds', short_help='Update compounds for a case')
 @click.argument('case_id')
+@click.option('--threads', type=int,
+              help='Number of chromosomes to update at the same time, defaults to the number of CPUs')
 @click.pass_context
-def compounds(context, case_id):
+def compounds(context, case_id, threads):
     """
     Update all compounds for a case
     """
@@ -23,7 +25,7 @@ def compounds(context, case_id):
         context.abort()
     
     try:
-        adapter.update_case_compounds(case_obj)
+        adapter.update_case_compounds(case_obj, threads=threads)
     except Exception as err:
         LOG.warning(err)
         context.abort()
@@ -42,6 +42,7 @@ def diseases(context, api_key):
     
     LOG.info("Dropping DiseaseTerms")
     adapter.disease_term_collection.drop()
+    adapter.update_reference_version('diseases')
     LOG.debug("DiseaseTerms dropped")
 
     load_disease_terms(
@@ -0,0 +1,16 @@
+import logging
+
+import click
+
+LOG = logging.getLogger(__name__)
+
+@click.command('search-keys', short_help='Update the case search keys')
+@click.pass_context
+def search_keys(context):
+    """
+    Update the keys that cases are found by in the case search, for all cases
+    """
+    adapter = context.obj['adapter']
+    LOG.info("Running scout update search-keys")
+    nr_cases = adapter.rebuild_case_search_keys()
+    LOG.info("Updated search keys for %s cases", nr_cases)
@@ -1,6 +1,8 @@
 import logging
 import click
 
+from scout.adapter.mongo.variant_stats import nr_variants as count_variants
+
 LOG = logging.getLogger(__name__)
 
 
@@ -22,8 +24,12 @@ LOG = logging.getLogger(__name__)
     default=0,
     help="Only show cases with more variants than treshold"
 )
+@click.option('--recount',
+    is_flag=True,
+    help="Count the variants in the database instead of using the counts stored on the cases"
+)
 @click.pass_context
-def cases(context, institute, display_name, case_id, nr_variants, variants_treshold):
+def cases(context, institute, display_name, case_id, nr_variants, variants_treshold, recount):
     """Display cases from the database"""
     LOG.info("Running scout view institutes")
     adapter = context.obj['adapter']
@@ -48,30 +54,25 @@ def cases(context, institute, display_name, case_id, nr_variants, variants_tresh
         LOG.info("Only show cases with more than %s variants", variants_treshold)
         nr_variants = True
     
+    variant_counts = {}
     if nr_variants:
         LOG.info("Displaying number of variants for each case")
         header.append('clinical')
         header.append('research')
-    
-    
+        variant_counts = adapter.case_variant_counts(models, use_stored=not recount)
+
     click.echo("#"+'\t'.join(header))
     for model in models:
         output_str = "{:<12}\t{:<12}\t{:<12}"
         output_values = [model['_id'],model['display_name'],model['owner']]
         if nr_variants:
             output_str += "\t{:<12}\t{:<12}"
-            nr_clinical = 0
-            nr_research = 0
-            variants = adapter.variant_collection.find({'case_id':model['_id']})
-            i = 0
-            for i, var in enumerate(variants, 1):
-                if var['variant_type'] == 'clinical':
-                    nr_clinical += 1
-                else:
-                    nr_research += 1
+            case_counts = variant_counts[model['_id']]
+            nr_clinical = count_variants(case_counts, 'clinical')
+            nr_research = count_variants(case_counts, 'research')
             output_values.extend([nr_clinical, nr_research])
-            
-            if variants_treshold and i < variants_treshold:
+
+            if variants_treshold and nr_clinical + nr_research < variants_treshold:
                 LOG.debug("Case %s had to few variants, skipping", model['_id'])
                 continue
             
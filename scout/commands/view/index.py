@@ -6,12 +6,27 @@ LOG = logging.getLogger(__name__)
 
 @click.command('index', short_help='Display all indexes')
 @click.option('-n', '--collection-name')
+@click.option('--advise',
+              is_flag=True,
+              help='Explain the variant queries of common filters and propose indexes'
+              )
+@click.option('--case-id',
+              help='Case to run the variant queries on, defaults to the first case'
+              )
+@click.option('--create',
+              is_flag=True,
+              help='Create the proposed indexes'
+              )
 @click.pass_context
-def index(context, collection_name):
+def index(context, collection_name, advise, case_id, create):
     """Show all indexes in the database"""
     LOG.info("Running scout view index")
     adapter = context.obj['adapter']
 
+    if advise:
+        advise_indexes(context, adapter, case_id, create)
+        return
+
     i = 0
     click.echo("collection\tindex")
     for collection_name in adapter.collections():
@@ -23,3 +38,40 @@ def index(context, collection_name):
         LOG.info("No indexes found")
 
 
+def advise_indexes(context, adapter, case_id, create):
+    """Print how the variant queries are run and the proposed indexes"""
+    if case_id:
+        case_obj = adapter.case(case_id=case_id)
+    else:
+        case_obj = adapter.case_collection.find_one()
+    if not case_obj:
+        LOG.warning("Could not find any case to run the queries on")
+        context.abort()
+
+    LOG.info("Explaining variant queries for case %s", case_obj['_id'])
+    advice = adapter.advise_indexes(case_obj, create=create)
+
+    click.echo("filter\tcategory\tplan\tindexes\tkeys_examined\tdocs_examined\t"
+               "returned\ttime_ms\tproposed_index")
+    for summary in advice:
+        proposal = '-'
+        if summary['proposal']:
+            proposal = ','.join(
+                "{0}:{1}".format(field, direction) for field, direction in summary['proposal']
+            )
+        click.echo("{0}\t{1}\t{2}\t{3}\t{4}\t{5}\t{6}\t{7}\t{8}".format(
+            summary['name'],
+            summary['category'],
+            '>'.join(summary['stages']),
+            ','.join(summary['indexes']) or '-',
+            summary['keys_examined'],
+            summary['docs_examined'],
+            summary['returned'],
+            summary['time_ms'],
+            proposal,
+        ))
+
+    nr_flagged = sum(1 for summary in advice if summary['flagged'])
+    LOG.info("%s of %s queries could use a better index", nr_flagged, len(advice))
+    if create:
+        LOG.info("Created %s indexes", sum(1 for summary in advice if summary['proposal']))
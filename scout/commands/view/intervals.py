@@ -21,11 +21,12 @@ def intervals(context, build):
     nr_intervals = 0
     longest = 0
     for chrom in CHROMOSOMES:
-        for iv in intervals[chrom]:
-            iv_len = iv.end - iv.begin
+        chrom_intervals = intervals.intervals(chrom)
+        for start, end in chrom_intervals:
+            iv_len = end - start
             if iv_len > longest:
                 longest = iv_len
-        int_nr = len(intervals.get(chrom, []))
+        int_nr = len(chrom_intervals)
         click.echo("{0}\t{1}".format(chrom, int_nr))
         nr_intervals += int_nr
 
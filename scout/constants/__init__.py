@@ -4,11 +4,10 @@ from collections import OrderedDict
 
 from intervaltree import (IntervalTree, Interval)
 
-from scout.parse.cytoband import parse_cytoband
+from scout.parse.cytoband import Cytobands
 from scout.resources import cytobands_path
-from scout.utils.handle import get_file_handle
 
-from .indexes import INDEXES
+from .indexes import (INDEXES, ADVISE_FILTERS)
 
 from .acmg import (ACMG_COMPLETE_MAP, ACMG_OPTIONS, ACMG_CRITERIA, ACMG_MAP, REV_ACMG_MAP)
 from .so_terms import (SO_TERMS, SO_TERM_KEYS, SEVERE_SO_TERMS)
@@ -24,8 +23,6 @@ from .file_types import FILE_TYPE_MAP
 from .clinvar import (CLINVAR_HEADER, CASEDATA_HEADER)
 from .variants_export import (EXPORT_HEADER, VCF_HEADER, MT_EXPORT_HEADER, VERIFIED_VARIANTS_HEADER)
 
-cytobands_handle = get_file_handle(cytobands_path)
-
 COLLECTIONS = [
     'hgnc_gene',
     'user',
@@ -42,7 +39,8 @@ COLLECTIONS = [
 
 BUILDS = ['37', '38']
 
-CYTOBANDS = parse_cytoband(cytobands_handle)
+# Interval trees per chromosome, the file is parsed when the first cytoband is looked up
+CYTOBANDS = Cytobands(cytobands_path)
 
 CHROMOSOMES = ('1', '2', '3', '4', '5', '6', '7', '8', '9', '10', '11', '12',
                '13', '14', '15', '16', '17', '18', '19', '20', '21', '22', 'X',
@@ -1,5 +1,7 @@
 from pymongo import (IndexModel, ASCENDING, DESCENDING, TEXT)
 
+from .so_terms import SEVERE_SO_TERMS
+
 INDEXES = {
     'hgnc_gene': [
         IndexModel([
@@ -32,8 +34,9 @@ INDEXES = {
         IndexModel([
             ('case_id', ASCENDING),
             ('category', ASCENDING),
-            ('variant_rank', ASCENDING)],
-            name="caseid_variantrank",
+            ('variant_rank', ASCENDING),
+            ('_id', ASCENDING)],
+            name="caseid_category_variantrank_id",
             background=True,
             ),
         IndexModel([
@@ -54,6 +57,17 @@ INDEXES = {
             partialFilterExpression={ 'rank_score': { '$gt': 5 } ,
                                      'category': 'snv' }
             ),
+        IndexModel([
+            ('hgnc_symbols', ASCENDING),
+            ('institute', ASCENDING),
+            ('rank_score', DESCENDING),
+            ('category', ASCENDING),
+            ('variant_type', ASCENDING)],
+            name="hgncsymbol_institute_rankscore_category_varianttype",
+            background=True,
+            partialFilterExpression={ 'rank_score': { '$gt': 5 } ,
+                                     'category': 'snv' }
+            ),
         IndexModel([
             ('case_id', ASCENDING),
             ('category', ASCENDING),
@@ -134,5 +148,55 @@ INDEXES = {
             ('synopsis', TEXT)],
             default_language='english',
             name="synopsis_text"),
+        IndexModel([
+            ('search_keys', ASCENDING)],
+            name="search_keys",
+            background=True,
+            ),
+    ],
+    'causative': [
+        IndexModel([
+            ('collaborators', ASCENDING),
+            ('simple_id', ASCENDING)],
+            name="collaborators_simpleid",
+            background=True,
+            ),
+        IndexModel([
+            ('case_id', ASCENDING)],
+            name="caseid",
+            background=True,
+            ),
+    ],
+    'variant_staging': [
+        IndexModel([
+            ('load_generation', ASCENDING),
+            ('case_id', ASCENDING),
+            ('category', ASCENDING),
+            ('variant_type', ASCENDING),
+            ('rank_score', DESCENDING)],
+            name="loadgeneration_caseid_category_varianttype_rankscore",
+            background=True,
+            ),
     ],
 }
+
+# Representative variant filters used by the index advisor, see `scout view index --advise`
+# (name, category, filter as sent by the variants forms)
+ADVISE_FILTERS = [
+    ('default', 'snv', {}),
+    ('clinical_filter', 'snv', {
+        'region_annotations': ['exonic', 'splicing'],
+        'functional_annotations': list(SEVERE_SO_TERMS),
+        'clinsig': [4, 5],
+        'clinsig_confident_always_returned': True,
+        'gnomad_frequency': '0.01',
+    }),
+    ('clinsig', 'snv', {'clinsig': [4, 5]}),
+    ('gnomad_frequency', 'snv', {'gnomad_frequency': '0.01'}),
+    ('not_in_gnomad', 'snv', {'gnomad_frequency': '-1'}),
+    ('cadd_score', 'snv', {'cadd_score': 20, 'cadd_inclusive': True}),
+    ('region', 'snv', {'chrom': '1', 'start': 1, 'end': 50000000}),
+    ('research', 'snv', {'variant_type': 'research'}),
+    ('sv_default', 'sv', {}),
+    ('sv_size', 'sv', {'size': 100, 'clingen_ngi': 10, 'swegen': 10}),
+]
@@ -1,6 +1,7 @@
 import logging
 
 from datetime import datetime
+from itertools import islice
 from pprint import pprint as pp
 
 from click import progressbar
@@ -8,22 +9,35 @@ from pandas import DataFrame
 
 from scout.parse.ensembl import (parse_ensembl_exons, parse_ensembl_exon_request)
 from scout.build.genes.exon import build_exon
+from scout.adapter.mongo.bulk_writer import BulkWriter
 
 LOG = logging.getLogger(__name__)
 
+# Nr of exons that are parsed and built before they are sent to the writer
+EXON_CHUNK_SIZE = 10000
 
-def load_exons(adapter, exon_lines, build='37', ensembl_genes=None):
+
+def load_exons(adapter, exon_lines, build='37', ensembl_genes=None, staging=False,
+               chunk_size=EXON_CHUNK_SIZE):
     """Load all the exons
     
     Transcript information is from ensembl.
     Check that the transcript that the exon belongs to exists in the database
 
+    The exons are parsed and built in chunks while the previous chunks are inserted
+    with unordered bulk writes in the background.
+
     Args:
         adapter(MongoAdapter)
         exon_lines(iterable): iterable with ensembl exon lines
         build(str)
         ensembl_transcripts(dict): Existing ensembl transcripts
-    
+        staging(bool): Load the exons into a staging collection that replaces the exon
+                       collection when all exons are loaded
+        chunk_size(int): Nr of exons to parse and build at a time
+
+    Returns:
+        nr_loaded(int)
     """
     # Fetch all genes with ensemblid as keys
     ensembl_genes = ensembl_genes or adapter.ensembl_genes(build)
@@ -34,32 +48,55 @@ def load_exons(adapter, exon_lines, build='37', ensembl_genes=None):
         nr_exons = exon_lines.shape[0]
     else:
         exons = parse_ensembl_exons(exon_lines)
-        nr_exons = 1000000
-    
+        nr_exons = None
+
+    collection = adapter.exon_staging_collection(build) if staging else adapter.exon_collection
+
     start_insertion = datetime.now()
-    loaded_exons = 0
+    nr_parsed = 0
     LOG.info("Loading exons...")
-    with progressbar(exons, label="Loading exons", length=nr_exons) as bar:
-        for exon in bar:
-            ensg_id = exon['gene']
-            enst_id = exon['transcript']
-            gene_obj = ensembl_genes.get(ensg_id)
-            
-            if not gene_obj:
-                continue
-            
-            hgnc_id = gene_obj['hgnc_id']
-
-            if not enst_id in hgnc_id_transcripts[hgnc_id]:
-                continue
-
-            exon['hgnc_id'] = hgnc_id
-
-            exon_obj = build_exon(exon, build)
-            adapter.load_exon(exon_obj)
-            loaded_exons += 1
-
-    LOG.info('Number of exons in build {0}: {1}'.format(build, nr_exons))
-    LOG.info('Number loaded: {0}'.format(loaded_exons))
+    with BulkWriter(collection) as writer, \
+            progressbar(exons, length=nr_exons, label="Loading exons") as bar:
+        exons = iter(bar)
+        while True:
+            chunk = list(islice(exons, chunk_size))
+            if not chunk:
+                break
+            writer.add_many(build_exons(chunk, ensembl_genes, hgnc_id_transcripts, build))
+            nr_parsed += len(chunk)
+
+    if staging:
+        adapter.swap_exon_staging()
+
+    LOG.info('Number of exons in build {0}: {1}'.format(build, nr_parsed))
+    LOG.info('Number loaded: {0}'.format(writer.nr_inserted))
     LOG.info('Time to load exons: {0}'.format(datetime.now() - start_insertion))
-    
\ No newline at end of file
+
+    return writer.nr_inserted
+
+
+def build_exons(exons, ensembl_genes, hgnc_id_transcripts, build='37'):
+    """Build the exons of genes and transcripts that exist in the database
+
+    Args:
+        exons(iterable(dict)): Parsed ensembl exons
+        ensembl_genes(dict): Map from ensembl_id -> HgncGene
+        hgnc_id_transcripts(dict): Map from hgnc_id -> set of ensembl transcript ids
+        build(str)
+
+    Returns:
+        exon_objs(list(scout.models.hgnc_map.Exon))
+    """
+    exon_objs = []
+    for exon in exons:
+        gene_obj = ensembl_genes.get(exon['gene'])
+        if not gene_obj:
+            continue
+
+        hgnc_id = gene_obj['hgnc_id']
+        if not exon['transcript'] in hgnc_id_transcripts.get(hgnc_id, ()):
+            continue
+
+        exon['hgnc_id'] = hgnc_id
+        exon_objs.append(build_exon(exon, build))
+    return exon_objs
@@ -123,6 +123,8 @@ def load_hgnc_genes(adapter, genes = None, ensembl_lines=None, hgnc_lines=None,
 
     LOG.info("Loading genes build %s", build)
     adapter.load_hgnc_bulk(gene_objects)
+    # Precompute the coding regions used when loading variants
+    adapter.update_coding_intervals(build)
 
     LOG.info("Loading done. %s genes loaded", len(gene_objects))
     LOG.info("Nr of genes without coordinates in build %s: %s", build,non_existing)
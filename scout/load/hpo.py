@@ -148,17 +148,21 @@ def load_disease_terms(adapter, genemap_lines, genes=None, hpo_disease_lines=Non
     nr_diseases = None
 
     LOG.info("Loading the hpo disease...")
-    for nr_diseases, disease_number in enumerate(disease_terms):
-        disease_info = disease_terms[disease_number]
-        disease_id = "OMIM:{0}".format(disease_number)
-        
-        if disease_id in hpo_diseases:
-            hpo_terms = hpo_diseases[disease_id]['hpo_terms']
-            if hpo_terms:
-                disease_info['hpo_terms'] = hpo_terms
-        disease_obj = build_disease_term(disease_info, genes)
-
-        adapter.load_disease_term(disease_obj)
+    try:
+        for nr_diseases, disease_number in enumerate(disease_terms):
+            disease_info = disease_terms[disease_number]
+            disease_id = "OMIM:{0}".format(disease_number)
+
+            if disease_id in hpo_diseases:
+                hpo_terms = hpo_diseases[disease_id]['hpo_terms']
+                if hpo_terms:
+                    disease_info['hpo_terms'] = hpo_terms
+            disease_obj = build_disease_term(disease_info, genes)
+
+            adapter.load_disease_term(disease_obj)
+    finally:
+        # The cached disease terms are invalidated once, also if the load failed
+        adapter.update_reference_version('diseases')
 
     LOG.info("Loading done. Nr of diseases loaded {0}".format(nr_diseases))
     LOG.info("Time to load diseases: {0}".format(datetime.now() - start_time))
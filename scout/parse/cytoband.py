@@ -1,5 +1,15 @@
 import logging
+import threading
+
+from bisect import bisect_right
+from collections.abc import Mapping
+
 import intervaltree
+import numpy as np
+
+from scout.utils.handle import get_file_handle
+
+LOG = logging.getLogger(__name__)
 
 
 def parse_cytoband(lines):
@@ -35,8 +45,122 @@ def parse_cytoband(lines):
     return cytobands 
 
 
+class CytobandIndex(object):
+    """Cytoband names per chromosome stored as sorted arrays
+
+    The bands of a chromosome do not overlap, so the band of a position is the
+    last band that starts at or before the position, if the position is before
+    the end of that band. Single positions are looked up with bisect on lists,
+    which is faster than numpy for one value, and chunks of positions with
+    numpy.
+
+    Args:
+        cytobands(dict): Interval trees per chromosome, as returned by parse_cytoband
+    """
+
+    def __init__(self, cytobands):
+        self.bands = {}
+        self.arrays = {}
+        for chrom, tree in cytobands.items():
+            intervals = sorted(tree)
+            starts = [interval.begin for interval in intervals]
+            ends = [interval.end for interval in intervals]
+            names = [interval.data for interval in intervals]
+            self.bands[chrom] = (starts, ends, names)
+            self.arrays[chrom] = (
+                np.array(starts, dtype=np.int64),
+                np.array(ends, dtype=np.int64),
+                np.array(names, dtype=object),
+            )
+
+    def cytoband(self, chrom, pos):
+        """Return the name of the cytoband of a position
+
+        Args:
+            chrom(str)
+            pos(int)
+
+        Returns:
+            name(str): Empty string if the position is not in a band
+        """
+        if chrom not in self.bands:
+            return ''
+        starts, ends, names = self.bands[chrom]
+        index = bisect_right(starts, pos) - 1
+        if index < 0 or pos >= ends[index]:
+            return ''
+        return names[index]
+
+    def cytoband_batch(self, chrom, positions):
+        """Return the names of the cytobands of positions on a chromosome
+
+        Args:
+            chrom(str)
+            positions(iterable(int))
+
+        Returns:
+            names(numpy.ndarray): Names of the bands, empty strings for positions not in a band
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        names = np.full(len(positions), '', dtype=object)
+        if chrom not in self.arrays:
+            return names
+        starts, ends, band_names = self.arrays[chrom]
+        indexes = np.searchsorted(starts, positions, side='right') - 1
+        inside = (indexes >= 0) & (positions < ends[indexes.clip(0)])
+        names[inside] = band_names[indexes[inside]]
+        return names
+
+
+class Cytobands(Mapping):
+    """Cytoband interval trees per chromosome, parsed from a file on first access
+
+    Parsing the file takes a noticeable part of the start up time, so it is
+    postponed until a cytoband is looked up. Use `index` to look up positions,
+    it is faster than querying the interval trees.
+
+    Args:
+        path(str): Path to a file with cytoband coordinates, may be gzipped
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._cytobands = None
+        self._index = None
+        self._lock = threading.Lock()
+
+    @property
+    def cytobands(self):
+        """Return the parsed cytobands, parse the file if needed"""
+        if self._cytobands is None:
+            with self._lock:
+                if self._cytobands is None:
+                    LOG.debug("Parsing cytobands from %s", self.path)
+                    with get_file_handle(self.path) as lines:
+                        self._cytobands = parse_cytoband(lines)
+        return self._cytobands
+
+    @property
+    def index(self):
+        """Return the cytobands as a CytobandIndex, build it if needed"""
+        if self._index is None:
+            cytobands = self.cytobands
+            with self._lock:
+                if self._index is None:
+                    self._index = CytobandIndex(cytobands)
+        return self._index
+
+    def __getitem__(self, chrom):
+        return self.cytobands[chrom]
+
+    def __iter__(self):
+        return iter(self.cytobands)
+
+    def __len__(self):
+        return len(self.cytobands)
+
+
 import click
-from scout.utils.handle import get_file_handle
 from scout.resources import cytobands_path
 
 @click.command()
@@ -10,13 +10,19 @@ def get_cytoband_coordinates(chrom, pos):
     Returns:
         coordinate(str)
     """
-    coordinate = ""
+    return CYTOBANDS.index.cytoband(chrom, pos)
 
-    if chrom in CYTOBANDS:
-        for interval in CYTOBANDS[chrom][pos]:
-            coordinate = interval.data
+def get_cytoband_coordinates_batch(chrom, positions):
+    """Get the cytoband coordinates for many positions on a chromosome
 
-    return coordinate
+    Args:
+        chrom(str)
+        positions(iterable(int))
+
+    Returns:
+        coordinates(numpy.ndarray): The cytoband coordinate of each position
+    """
+    return CYTOBANDS.index.cytoband_batch(chrom, positions)
 
 def get_sub_category(alt_len, ref_len, category, svtype=None):
     """Get the subcategory for a VCF variant
@@ -1,3 +1,5 @@
+import numpy as np
+
 
 
 def parse_rank_score(rank_score_entry, case_id):
@@ -17,3 +19,32 @@ def parse_rank_score(rank_score_entry, case_id):
             if case_id == splitted_info[0]:
                 rank_score = float(splitted_info[1])
     return rank_score
+
+
+def parse_rank_scores(rank_score_entries, case_id):
+    """Parse the rank scores of many variants at once
+
+        When the entries only hold scores for this case, which is the common
+        case, all scores are converted in one numpy call. Otherwise each entry
+        is parsed with parse_rank_score.
+
+        Args:
+            rank_score_entries(list(str)): The raw rank score entries, None if missing
+            case_id(str)
+
+        Returns:
+            rank_scores(numpy.ndarray): One float per entry, nan if the case has no score
+    """
+    entries = [entry or '' for entry in rank_score_entries]
+    if not entries:
+        return np.zeros(0)
+    joined = '\n' + '\n'.join(entries)
+    separator = '\n{0}:'.format(case_id)
+    nr_scored = len(entries) - entries.count('')
+
+    if ',' not in joined and joined.count(separator) == nr_scored:
+        scores = joined.replace(separator, '\n').split('\n')[1:]
+        return np.array([score or 'nan' for score in scores], dtype=float)
+
+    rank_scores = (parse_rank_score(entry, case_id) for entry in entries)
+    return np.array([np.nan if score is None else score for score in rank_scores], dtype=float)
@@ -1,5 +1,7 @@
-import pkg_resources
+import os
 
+# The resources are files in the scout package
+package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 ###### Files ######
 
@@ -11,4 +13,4 @@ cytobands_file = 'resources/cytoBand.txt.gz'
 
 # Cytoband path
 
-cytobands_path = pkg_resources.resource_filename('scout', cytobands_file)
+cytobands_path = os.path.join(package_dir, cytobands_file)
@@ -17,14 +17,14 @@ from scout.constants import (CASE_STATUSES, PHENOTYPE_GROUPS, COHORT_TAGS, SEX_M
                              CANCER_PHENOTYPE_MAP, VERBS_MAP, MT_EXPORT_HEADER)
 from scout.constants.variant_tags import MANUAL_RANK_OPTIONS, DISMISS_VARIANT_OPTIONS, GENETIC_MODELS
 from scout.export.variant import export_mt_variants
-from scout.server.utils import institute_and_case, user_institutes
+from scout.adapter.mongo.variant_stats import nr_variants
+from scout.server.utils import institute_and_case
 from scout.parse.clinvar import clinvar_submission_header, clinvar_submission_lines
 from scout.server.blueprints.variants.controllers import variant as variant_decorator
 from scout.server.blueprints.variants.controllers import sv_variant
 from scout.parse.matchmaker import hpo_terms, omim_terms, genomic_features, parse_matches
 from scout.utils.matchmaker import matchmaker_request
 from scout.server.blueprints.variants.controllers import get_predictions
-from scout.server.blueprints.genes.controllers import gene
 
 LOG = logging.getLogger(__name__)
 
@@ -51,15 +51,28 @@ def cases(store, case_query, limit=100):
     """
 
     case_groups = {status: [] for status in CASE_STATUSES}
-    for case_obj in case_query.limit(limit):
+    case_objs = list(case_query.limit(limit))
+
+    # Fetch the assignees, the clinvar submissions and the variant counts of all cases
+    # with one query each
+    users = store.users_by_email(set(user_email for case_obj in case_objs
+                                     for user_email in case_obj.get('assignees', [])))
+    clinvar_variants = store.cases_to_clinVars(case_obj['_id'] for case_obj in case_objs)
+    variant_counts = store.case_variant_counts(case_objs)
+
+    for case_obj in case_objs:
         analysis_types = set(ind['analysis_type'] for ind in case_obj['individuals'])
 
         case_obj['analysis_types'] = list(analysis_types)
-        case_obj['assignees'] = [store.user(user_email) for user_email in
+        case_obj['assignees'] = [users.get(user_email) for user_email in
                                  case_obj.get('assignees', [])]
         case_groups[case_obj['status']].append(case_obj)
         case_obj['is_rerun'] = len(case_obj.get('analyses', [])) > 0
-        case_obj['clinvar_variants'] = store.case_to_clinVars(case_obj['_id'])
+        case_obj['clinvar_variants'] = clinvar_variants[case_obj['_id']]
+        case_obj['nr_variants'] = {
+            variant_type: nr_variants(variant_counts[case_obj['_id']], variant_type)
+            for variant_type in ('clinical', 'research')
+        }
         case_obj['display_track'] = TRACKS[case_obj.get('track', 'rare')]
 
     data = {
@@ -343,7 +356,8 @@ def mt_excel_files(store, case_obj, temp_excel_dir):
     samples = case_obj.get('individuals')
 
     query = {'chrom':'MT'}
-    mt_variants = list(store.variants(case_id=case_obj['_id'], query=query, nr_of_variants= -1, sort_key='position'))
+    mt_variants = list(store.variants(case_id=case_obj['_id'], query=query, nr_of_variants= -1,
+                                      sort_key='position', projection='mt_report'))
 
     written_files = 0
     for sample in samples:
@@ -454,23 +468,41 @@ def vcf2cytosure(store, institute_id, case_name, individual_id):
     return (individual_obj['display_name'], individual_obj['vcf2cytosure'])
 
 def gene_variants(store, variants_query, page=1, per_page=50):
-    """Pre-process list of variants."""
-    variant_count = variants_query.count()
+    """Pre-process list of variants.
+
+    The query should only return variants from the institutes of the user. One extra
+    variant is fetched to know if there are more variants instead of counting them.
+    The cases and genes of the page are fetched with one query each.
+    """
     skip_count = per_page * max(page - 1, 0)
-    more_variants = True if variant_count > (skip_count + per_page) else False
-    variant_res = variants_query.skip(skip_count).limit(per_page)
+    variant_res = list(variants_query.skip(skip_count).limit(per_page + 1))
+    more_variants = len(variant_res) > per_page
+    variant_res = variant_res[:per_page]
+
+    case_ids = set(variant_obj['case_id'] for variant_obj in variant_res)
+    variant_cases = {
+        case_obj['_id']: case_obj for case_obj in
+        store.case_collection.find({'_id': {'$in': list(case_ids)}},
+                                   {'display_name': 1, 'genome_build': 1})
+    }
 
-    my_institutes = list(inst['_id'] for inst in user_institutes(store, current_user))
+    hgnc_ids = set(gene_obj['hgnc_id'] for variant_obj in variant_res
+                   for gene_obj in variant_obj.get('genes') or [] if gene_obj['hgnc_id'])
+    gene_projection = {'hgnc_id': 1, 'hgnc_symbol': 1, 'description': 1}
+    build_genes = {
+        build: store.hgnc_genes_by_id(hgnc_ids, build=build, projection=gene_projection)
+        for build in ['37', '38']
+    }
+    # The symbol of build 38 is used when a gene is in both builds
+    gene_symbol_map = {}
+    for build in ['37', '38']:
+        gene_symbol_map.update({hgnc_id: gene_obj['hgnc_symbol'] for hgnc_id, gene_obj in
+                             build_genes[build].items()})
 
     variants = []
     for variant_obj in variant_res:
-        # hide other institutes for now
-        if variant_obj['institute'] not in my_institutes:
-            LOG.warning("Institute {} not allowed.".format(variant_obj['institute']))
-            continue
-
         # Populate variant case_display_name
-        variant_case_obj = store.case(case_id=variant_obj['case_id'])
+        variant_case_obj = variant_cases.get(variant_obj['case_id'])
         if not variant_case_obj:
             # A variant with missing case was encountered
             continue
@@ -490,7 +522,7 @@ def gene_variants(store, variants_query, page=1, per_page=50):
                     continue
                 # Else we collect the gene object and check the id
                 if gene_obj.get('hgnc_symbol') is None or gene_obj.get('description') is None:
-                    hgnc_gene = store.hgnc_gene(gene_obj['hgnc_id'], build=genome_build)
+                    hgnc_gene = build_genes[genome_build].get(gene_obj['hgnc_id'])
                     if not hgnc_gene:
                         continue
                     gene_obj['hgnc_symbol'] = hgnc_gene['hgnc_symbol']
@@ -508,11 +540,12 @@ def gene_variants(store, variants_query, page=1, per_page=50):
 
             for gene_obj in variant_genes:
                 hgnc_id = gene_obj['hgnc_id']
-                gene_symbol = gene(store, hgnc_id)['symbol']
+                gene_symbol = gene_symbol_map.get(hgnc_id)
                 gene_ids.append(hgnc_id)
                 gene_symbols.append(gene_symbol)
 
                 hgvs_nucleotide = '-'
+                hgvs_protein = '-'
                 # gather HGVS info from gene transcripts
                 transcripts_list = gene_obj.get('transcripts')
                 for transcript_obj in transcripts_list:
@@ -587,7 +620,7 @@ def get_sanger_unevaluated(store, institute_id, user_id):
 
         for var_id in varid_list:
             # For each variant with sanger validation ordered
-            variant_obj = store.variant(document_id=var_id, case_id=case_id)
+            variant_obj = store.variant(document_id=var_id, case_id=case_id, projection='sanger')
 
             # Double check that Sanger was ordered (and not canceled) for the variant
             if variant_obj is None or variant_obj.get('sanger_ordered') is None or variant_obj.get('sanger_ordered') is False:
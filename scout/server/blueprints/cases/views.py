@@ -9,8 +9,6 @@ import pathlib
 
 import logging
 
-from operator import itemgetter
-
 from flask import (abort, Blueprint, current_app, redirect, render_template,
                    request, url_for, send_from_directory, jsonify, Response, flash, send_file)
 from flask_login import current_user
@@ -33,9 +31,11 @@ cases_bp = Blueprint('cases', __name__, template_folder='templates',
 @templated('cases/index.html')
 def index():
     """Display a list of all user institutes."""
-    institute_objs = user_institutes(store, current_user)
-    institutes_count = ((institute_obj, store.cases(collaborator=institute_obj['_id']).count())
-                        for institute_obj in institute_objs if institute_obj)
+    institute_objs = [institute_obj for institute_obj in user_institutes(store, current_user)
+                      if institute_obj]
+    nr_cases = store.nr_cases_by_institute(institute_obj['_id'] for institute_obj in institute_objs)
+    institutes_count = ((institute_obj, nr_cases[institute_obj['_id']])
+                        for institute_obj in institute_objs)
     return dict(institutes=institutes_count)
 
 
@@ -380,8 +380,10 @@ def gene_variants(institute_id):
 
         log.debug("query {}".format(form.data))
 
+        # Only show variants from the institutes of the user
+        institute_ids = [inst['_id'] for inst in user_institutes(store, current_user) if inst]
         variants_query = store.gene_variants(query=form.data, category='snv',
-                            variant_type=variant_type)
+                            variant_type=variant_type, institute_ids=institute_ids)
 
         data = controllers.gene_variants(store, variants_query, page)
 
@@ -618,11 +620,11 @@ def hpoterms():
     query = request.args.get('query')
     if query is None:
         return abort(500)
-    terms = sorted(store.hpo_terms(query=query), key=itemgetter('hpo_number'))
+    terms = store.hpo_terms_by_prefix(query, limit=7)
     json_terms = [
         {'name': '{} | {}'.format(term['_id'], term['description']),
          'id': term['_id']
-        } for term in terms[:7]]
+        } for term in terms]
 
     return jsonify(json_terms)
 
@@ -1,9 +1,11 @@
 import logging
 from flask_login import current_user
 
+from scout.adapter.mongo.variant_stats import nr_variants
+
 LOG = logging.getLogger(__name__)
 
-def get_dashboard_info(adapter, institute_id=None, slice_query=None):
+def get_dashboard_info(adapter, institute_id=None, slice_query=None, stats_max_age=None):
     """Returns cases with phenotype
 
         If phenotypes are provided search for only those
@@ -12,6 +14,8 @@ def get_dashboard_info(adapter, institute_id=None, slice_query=None):
         adapter(adapter.MongoAdapter)
         institute_id(str): an institute _id
         slice_query(str):  query to filter cases to obtain statistics for.
+        stats_max_age(int): If set, statistics without a slice query are stored and reused
+                            for this many seconds, or until an event is created
 
     Returns:
         data(dict): Dictionary with relevant information
@@ -23,6 +27,28 @@ def get_dashboard_info(adapter, institute_id=None, slice_query=None):
     if institute_id == 'None':
         institute_id = None
 
+    use_stats = stats_max_age is not None and not slice_query
+    if use_stats:
+        data = adapter.dashboard_stats(institute_id, max_age=stats_max_age)
+        if data:
+            return data
+
+    data = compute_dashboard_info(adapter, institute_id=institute_id, slice_query=slice_query)
+    if use_stats:
+        adapter.update_dashboard_stats(data, institute_id=institute_id)
+    return data
+
+def compute_dashboard_info(adapter, institute_id=None, slice_query=None):
+    """Compute the dashboard statistics in the database
+
+    Args:
+        adapter(adapter.MongoAdapter)
+        institute_id(str): an institute _id or None for all institutes
+        slice_query(str):  query to filter cases to obtain statistics for.
+
+    Returns:
+        data(dict): Dictionary with relevant information
+    """
     # If a slice_query is present then numbers in "General statistics" and "Case statistics" will
     # reflect the data available for the query
     general_sliced_info = get_general_case_info(adapter, institute_id=institute_id,
@@ -69,42 +95,14 @@ def get_dashboard_info(adapter, institute_id=None, slice_query=None):
 
     # Data from "Variant statistics tab" is not filtered by slice_query and numbers will
     # reflect verified variants in all available cases for an institute
-    general_info = get_general_case_info(adapter, institute_id=institute_id)
-    total_cases = general_info['total_cases']
     sliced_case_ids = general_sliced_info['case_ids']
-    verified_query = {
-        'verb' : 'validate',
-    }
-    if institute_id: # filter by institute if users wishes so
-        verified_query['institute'] =  institute_id
+    validation_info = get_validation_info(adapter, institute_id=institute_id)
+    var_valid_orders = validation_info['orders']
+    validated_tp = validation_info['true_positives']
+    validated_fp = validation_info['false_positives']
 
-    # Case level information
-    sliced_validation_cases = set()
-    sliced_validated_cases = set()
-
-    # Variant level information
-    validated_tp = set()
-    validated_fp = set()
-    var_valid_orders = 0 # use this counter to count 'True Positive', 'False positive' and 'Not validated' vars
-
-    validate_events = adapter.event_collection.find(verified_query)
-    for validate_event in list(validate_events):
-        case_id = validate_event.get('case')
-        var_obj = adapter.variant(case_id=case_id, document_id=validate_event['variant_id'])
-
-        if var_obj: # Don't take into account variants which have been removed from db
-            var_valid_orders += 1
-            if case_id in sliced_case_ids:
-                sliced_validation_cases.add(case_id) # add to the set. Can't add same id twice since it'a a set
-
-            validation = var_obj.get('validation')
-            if validation and validation in ['True positive', 'False positive']:
-                if case_id in sliced_case_ids:
-                    sliced_validated_cases.add(case_id)
-                if validation == 'True positive':
-                    validated_tp.add(var_obj['_id'])
-                elif validation == 'False positive':
-                    validated_fp.add(var_obj['_id'])
+    sliced_validation_cases = validation_info['validation_cases'] & sliced_case_ids
+    sliced_validated_cases = validation_info['validated_cases'] & sliced_case_ids
 
     n_validation_cases = len(sliced_validation_cases)
     n_validated_cases = len(sliced_validated_cases)
@@ -160,11 +158,42 @@ def get_dashboard_info(adapter, institute_id=None, slice_query=None):
     )
 
     data['variants'] = variants
+    data['loaded_variants'] = get_loaded_variants(adapter, institute_id=institute_id,
+                                                  slice_query=slice_query)
     return data
 
+def get_loaded_variants(adapter, institute_id=None, slice_query=None):
+    """Return the number of loaded variants of the cases by variant type
+
+    The counts stored on the cases are used, cases without stored counts are counted
+    with one aggregation.
+
+    Args:
+        adapter(adapter.MongoAdapter)
+        institute_id(str)
+        slice_query(str):   Query to filter cases to obtain statistics for.
+
+    Returns:
+        loaded_variants(list(dict)): [{'title': <str>, 'count': <int>}, ...]
+    """
+    query = adapter.cases(owner=institute_id, name_query=slice_query, yield_query=True)
+    case_objs = adapter.case_collection.find(query, {'_id': 1, 'variant_counts': 1})
+    variant_counts = adapter.case_variant_counts(case_objs)
+
+    return [
+        {
+            'title': '{} variants'.format(variant_type.capitalize()),
+            'count': sum(nr_variants(case_counts, variant_type)
+                         for case_counts in variant_counts.values()),
+        }
+        for variant_type in ('clinical', 'research')
+    ]
+
 def get_general_case_info(adapter, institute_id=None, slice_query=None):
     """Return general information about cases
 
+    The cases are counted in the database with one aggregation.
+
     Args:
         adapter(adapter.MongoAdapter)
         institute_id(str)
@@ -179,67 +208,126 @@ def get_general_case_info(adapter, institute_id=None, slice_query=None):
     # Potentially sensitive slice queries are assumed allowed if we have got this far
     name_query = slice_query
 
-    cases = adapter.cases(owner=institute_id, name_query=name_query)
-
-    phenotype_cases = 0
-    causative_cases = 0
-    pinned_cases = 0
-    cohort_cases = 0
+    query = adapter.cases(owner=institute_id, name_query=name_query, yield_query=True)
+
+    nr_individuals = {'$size': {'$ifNull': ['$individuals', []]}}
+    pipeline = [
+        {'$match': query},
+        {'$group': {
+            '_id': None,
+            'total_cases': {'$sum': 1},
+            'phenotype_cases': {'$sum': _count_if_set('phenotype_terms')},
+            'causative_cases': {'$sum': _count_if_set('causatives')},
+            'pinned_cases': {'$sum': _count_if_set('suspects')},
+            'cohort_cases': {'$sum': _count_if_set('cohorts')},
+            'single': {'$sum': {'$cond': [{'$eq': [nr_individuals, 1]}, 1, 0]}},
+            'duo': {'$sum': {'$cond': [{'$eq': [nr_individuals, 2]}, 1, 0]}},
+            'trio': {'$sum': {'$cond': [{'$eq': [nr_individuals, 3]}, 1, 0]}},
+            'many': {'$sum': {'$cond': [{'$gt': [nr_individuals, 3]}, 1, 0]}},
+        }},
+    ]
+    counts = next(adapter.case_collection.aggregate(pipeline), {})
 
     pedigree = {
         1: {
             'title': 'Single',
-            'count': 0
+            'count': counts.get('single', 0)
         },
         2: {
             'title': 'Duo',
-            'count': 0
+            'count': counts.get('duo', 0)
         },
         3: {
             'title': 'Trio',
-            'count': 0
+            'count': counts.get('trio', 0)
         },
         'many': {
             'title': 'Many',
-            'count': 0
+            'count': counts.get('many', 0)
         },
     }
 
     case_ids = set()
-
-    total_cases = 0
-    for total_cases,case in enumerate(cases,1):
-        # If only looking at one institute we need to save the case ids
-        if institute_id:
-            case_ids.add(case['_id'])
-        if case.get('phenotype_terms'):
-            phenotype_cases += 1
-        if case.get('causatives'):
-            causative_cases += 1
-        if case.get('suspects'):
-            pinned_cases += 1
-        if case.get('cohorts'):
-            cohort_cases += 1
-
-        nr_individuals = len(case.get('individuals',[]))
-        if nr_individuals == 0:
-            continue
-        if nr_individuals > 3:
-            pedigree['many']['count'] += 1
-        else:
-            pedigree[nr_individuals]['count'] += 1
-
-    general['total_cases'] = total_cases
-    general['phenotype_cases'] = phenotype_cases
-    general['causative_cases'] = causative_cases
-    general['pinned_cases'] = pinned_cases
-    general['cohort_cases'] = cohort_cases
+    # If only looking at one institute we need to save the case ids
+    if institute_id:
+        case_ids = set(case['_id'] for case in adapter.case_collection.find(query, {'_id': 1}))
+
+    general['total_cases'] = counts.get('total_cases', 0)
+    general['phenotype_cases'] = counts.get('phenotype_cases', 0)
+    general['causative_cases'] = counts.get('causative_cases', 0)
+    general['pinned_cases'] = counts.get('pinned_cases', 0)
+    general['cohort_cases'] = counts.get('cohort_cases', 0)
     general['pedigree'] = pedigree
     general['case_ids'] = case_ids
 
     return general
 
 
+def get_validation_info(adapter, institute_id=None):
+    """Return information about the variants that have been sent for validation
+
+    The validate events are grouped per variant in the database and the variants are
+    then fetched with one query, instead of one query per event.
+
+    Args:
+        adapter(adapter.MongoAdapter)
+        institute_id(str)
+
+    Returns:
+        validation_info(dict): with the nr of validation orders, the cases with validations
+                               and the true and false positive variants
+    """
+    verified_query = {
+        'verb' : 'validate',
+    }
+    if institute_id: # filter by institute if users wishes so
+        verified_query['institute'] =  institute_id
+
+    pipeline = [
+        {'$match': verified_query},
+        {'$group': {
+            '_id': {'case': '$case', 'variant_id': '$variant_id'},
+            'count': {'$sum': 1},
+        }},
+    ]
+    orders = list(adapter.event_collection.aggregate(pipeline))
+
+    variants = {}
+    if orders:
+        variant_query = {
+            'case_id': {'$in': list(set(order['_id']['case'] for order in orders))},
+            'variant_id': {'$in': list(set(order['_id']['variant_id'] for order in orders))},
+        }
+        projection = {'case_id': 1, 'variant_id': 1, 'validation': 1}
+        for var_obj in adapter.variant_collection.find(variant_query, projection):
+            variants.setdefault((var_obj['case_id'], var_obj['variant_id']), var_obj)
+
+    validation_info = {
+        'orders': 0, # counts 'True Positive', 'False positive' and 'Not validated' vars
+        'validation_cases': set(),
+        'validated_cases': set(),
+        'true_positives': set(),
+        'false_positives': set(),
+    }
+    for order in orders:
+        case_id = order['_id']['case']
+        var_obj = variants.get((case_id, order['_id']['variant_id']))
+        if not var_obj: # Don't take into account variants which have been removed from db
+            continue
+        validation_info['orders'] += order['count']
+        validation_info['validation_cases'].add(case_id)
+
+        validation = var_obj.get('validation')
+        if validation in ['True positive', 'False positive']:
+            validation_info['validated_cases'].add(case_id)
+            if validation == 'True positive':
+                validation_info['true_positives'].add(var_obj['_id'])
+            else:
+                validation_info['false_positives'].add(var_obj['_id'])
+
+    return validation_info
+
+
 def get_case_groups(adapter, total_cases, institute_id=None, slice_query=None):
     """Return the information about case groups
 
@@ -317,3 +405,8 @@ def get_analysis_types(adapter, total_cases, institute_id=None, slice_query=None
     analysis_types = [{'name': group['_id'], 'count': group['count']} for group in analysis_query]
 
     return analysis_types
+
+
+def _count_if_set(field):
+    """Return an aggregation expression that is 1 if a case has a non empty field"""
+    return {'$cond': [{'$gt': [{'$size': {'$ifNull': ['$' + field, []]}}, 0]}, 1, 0]}
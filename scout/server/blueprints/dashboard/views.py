@@ -56,7 +56,8 @@ def index():
 
     LOG.info("Fetch all cases with institute: %s", institute_id)
 
-    data = get_dashboard_info(store, institute_id, slice_query)
+    data = get_dashboard_info(store, institute_id, slice_query,
+                              stats_max_age=current_app.config.get('DASHBOARD_STATS_MAX_AGE'))
     data['institutes'] = institutes
     data['choice'] = institute_id
     total_cases = data['total_cases']
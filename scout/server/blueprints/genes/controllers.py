@@ -45,9 +45,9 @@ def gene(store, hgnc_id):
 
 
 
-def genes_to_json(store, query):
-    """Fetch matching genes and convert to JSON."""
-    gene_query = store.hgnc_genes(query, search=True)
+def genes_to_json(store, query, limit=20):
+    """Fetch genes that start with the query and convert to JSON."""
+    gene_query = store.genes_by_prefix(query, limit=limit)
     json_terms = [{'name': "{} | {} ({})".format(gene['hgnc_id'], gene['hgnc_symbol'],
                                                  ', '.join(gene['aliases'])),
                    'id': gene['hgnc_id']} for gene in gene_query]
@@ -3,6 +3,8 @@ import logging
 import os.path
 import urllib.parse
 
+from itertools import islice
+
 from pprint import pprint as pp
 
 from xlsxwriter import Workbook
@@ -19,56 +21,153 @@ from scout.constants import (
 from scout.constants.acmg import ACMG_CRITERIA
 from scout.constants.variants_export import EXPORT_HEADER, VERIFIED_VARIANTS_HEADER
 from scout.export.variant import export_verified_variants
+from scout.adapter.mongo.variant import page_key
 from scout.server.utils import institute_and_case
 from scout.server.links import (add_gene_links, ensembl, add_tx_links)
 from .forms import CancerFiltersForm
-from scout.server.blueprints.genes.controllers import gene
 
 LOG = logging.getLogger(__name__)
 
+# Nr of variants that are read at a time when exporting variants
+EXPORT_BATCH_SIZE = 1000
+
 
 class MissingVerificationRecipientError(Exception):
     pass
 
 
 def variants(store, institute_obj, case_obj, variants_query, page=1, per_page=50):
-    """Pre-process list of variants."""
-    variant_count = variants_query.count()
-    skip_count = per_page * max(page - 1, 0)
-    more_variants = True if variant_count > (skip_count + per_page) else False
-    variant_res = variants_query.skip(skip_count).limit(per_page)
+    """Pre-process list of variants.
+
+    The query should start after the previous page, see `parse_page_key`. One extra
+    variant is fetched to know if there are more variants instead of counting them.
+    """
+    variant_res, next_page_key = variants_page(variants_query, per_page)
 
     genome_build = case_obj.get('genome_build', '37')
     if genome_build not in ['37','38']:
         genome_build = '37'
 
+    page_info = variants_page_info(store, institute_obj, case_obj, variant_res,
+                                   genome_build=genome_build, overlapping=True)
+
     variants = []
     for variant_obj in variant_res:
-        overlapping_svs = [sv for sv in store.overlapping(variant_obj)]
+        overlapping_svs = page_info['overlapping'].get(variant_obj['_id'])
         variant_obj['overlapping'] = overlapping_svs or None
         variants.append(parse_variant(store, institute_obj, case_obj, variant_obj,
-                        update=True, genome_build=genome_build))
+                        update=True, genome_build=genome_build, page_info=page_info))
 
     return {
         'variants': variants,
-        'more_variants': more_variants,
+        'more_variants': bool(next_page_key),
+        'next_page_key': next_page_key,
     }
 
 def sv_variants(store, institute_obj, case_obj, variants_query, page=1, per_page=50):
     """Pre-process list of SV variants."""
-    skip_count = (per_page * max(page - 1, 0))
-    more_variants = True if variants_query.count() > (skip_count + per_page) else False
+    variant_res, next_page_key = variants_page(variants_query, per_page)
 
     genome_build = case_obj.get('genome_build', '37')
     if genome_build not in ['37','38']:
         genome_build = '37'
 
+    page_info = variants_page_info(store, institute_obj, case_obj, variant_res,
+                                   genome_build=genome_build)
+
     return {
-        'variants': (parse_variant(store, institute_obj, case_obj, variant, genome_build=genome_build) for variant in
-                     variants_query.skip(skip_count).limit(per_page)),
-        'more_variants': more_variants,
+        'variants': (parse_variant(store, institute_obj, case_obj, variant, genome_build=genome_build,
+                                   page_info=page_info) for variant in variant_res),
+        'more_variants': bool(next_page_key),
+        'next_page_key': next_page_key,
     }
 
+def variants_page(variants_query, per_page=50):
+    """Fetch one page of variants and the key of the next page
+
+    Args:
+        variants_query(pymongo.Cursor): Variants sorted by variant rank
+        per_page(int)
+
+    Returns:
+        variant_res(list(dict)), next_page_key(str): The key is None on the last page
+    """
+    variant_res = list(variants_query.limit(per_page + 1))
+    if len(variant_res) <= per_page:
+        return variant_res, None
+
+    variant_res = variant_res[:per_page]
+    return variant_res, '{0}:{1}'.format(*page_key(variant_res[-1]))
+
+def parse_page_key(key):
+    """Parse a page key from `variants_page`
+
+    Args:
+        key(str): '<variant_rank>:<_id>', the rank is 'None' for variants without a rank
+
+    Returns:
+        after(tuple): (<variant_rank>, <_id>) or None if the key is missing or invalid
+    """
+    if not key:
+        return None
+    value, _, variant_id = key.partition(':')
+    if value == 'None':
+        return (None, variant_id)
+    try:
+        return (int(value), variant_id)
+    except ValueError:
+        LOG.warning("Invalid page key %s", key)
+        return None
+
+def variants_page_info(store, institute_obj, case_obj, variant_objs, genome_build='37',
+                       overlapping=False):
+    """Fetch the information needed to display a page of variants.
+
+    Collects what parse_variant would otherwise fetch for each variant separately with
+    one query per kind of information.
+
+    Args:
+        store(scout.adapter.MongoAdapter)
+        institute_obj(scout.models.Institute)
+        case_obj(scout.models.Case)
+        variant_objs(list(scout.models.Variant))
+        genome_build(str)
+        overlapping(bool): If the overlapping variants should be collected
+
+    Returns:
+        page_info(dict): {
+            'comments': {<variant_id>: [<comment>, ...]},
+            'compounds': {<variant _id>: <compound variant>},
+            'hgnc_symbols': {<hgnc_id>: <hgnc_symbol>},
+            'overlapping': {<variant _id>: [<overlapping variant>, ...]},
+        }
+    """
+    compound_ids = set()
+    hgnc_ids = set()
+    for variant_obj in variant_objs:
+        compounds = variant_obj.get('compounds', [])
+        if compounds and 'not_loaded' not in compounds[0]:
+            compound_ids.update(compound['variant'] for compound in compounds)
+        for gene_obj in variant_obj.get('genes') or []:
+            if gene_obj['hgnc_id'] and gene_obj.get('hgnc_symbol') is None:
+                hgnc_ids.add(gene_obj['hgnc_id'])
+
+    page_info = {
+        'comments': store.variants_comments(institute_obj, case_obj,
+                        [variant_obj['variant_id'] for variant_obj in variant_objs]),
+        'compounds': {},
+        'hgnc_symbols': {},
+        'overlapping': {},
+    }
+    if compound_ids:
+        page_info['compounds'] = store.variants_by_id(compound_ids, projection='compound')
+    if hgnc_ids:
+        page_info['hgnc_symbols'] = store.hgnc_symbols(hgnc_ids, build=genome_build)
+    if overlapping:
+        page_info['overlapping'] = store.overlapping_variants(variant_objs)
+
+    return page_info
+
 def str_variants(store, institute_obj, case_obj, variants_query, page=1, per_page=50):
     """Pre-process list of STR variants."""
     # Nothing unique to STRs on this level. Inheritance?
@@ -203,12 +302,14 @@ def sv_variant(store, institute_id, case_name, variant_id=None, variant_obj=None
 
 
 def parse_variant(store, institute_obj, case_obj, variant_obj, update=False, genome_build='37',
-                  get_compounds = True):
+                  get_compounds = True, page_info=None):
     """Parse information about variants.
 
     - Adds information about compounds
     - Updates the information about compounds if necessary and 'update=True'
 
+    Only the changed fields are written back, so the variant may be fetched with a projection.
+
     Args:
         store(scout.adapter.MongoAdapter)
         institute_obj(scout.models.Institute)
@@ -216,44 +317,56 @@ def parse_variant(store, institute_obj, case_obj, variant_obj, update=False, gen
         variant_obj(scout.models.Variant)
         update(bool): If variant should be updated in database
         genome_build(str)
+        get_compounds(bool)
+        page_info(dict): Information prefetched by variants_page_info
 
     """
-    has_changed = False
+    updates = {}
     compounds = variant_obj.get('compounds', [])
     if compounds and get_compounds:
         # Check if we need to add compound information
         # If it is the first time the case is viewed we fill in some compound information
         if 'not_loaded' not in compounds[0]:
-            new_compounds = store.update_variant_compounds(variant_obj)
+            compound_objs = page_info['compounds'] if page_info else None
+            new_compounds = store.update_variant_compounds(variant_obj, compound_objs)
             variant_obj['compounds'] = new_compounds
-            has_changed = True
+            updates['compounds'] = new_compounds
 
         # sort compounds on combined rank score
         variant_obj['compounds'] = sorted(variant_obj['compounds'],
                                           key=lambda compound: -compound['combined_score'])
+        if 'compounds' in updates:
+            updates['compounds'] = variant_obj['compounds']
 
     # Update the hgnc symbols if they are incorrect
     variant_genes = variant_obj.get('genes')
     if variant_genes is not None:
-        for gene_obj in variant_genes:
+        for gene_index, gene_obj in enumerate(variant_genes):
             # If there is no hgnc id there is nothin we can do
             if not gene_obj['hgnc_id']:
                 continue
             # Else we collect the gene object and check the id
             if gene_obj.get('hgnc_symbol') is None:
-                hgnc_gene = store.hgnc_gene(gene_obj['hgnc_id'], build=genome_build)
-                if not hgnc_gene:
+                if page_info:
+                    hgnc_symbol = page_info['hgnc_symbols'].get(gene_obj['hgnc_id'])
+                else:
+                    hgnc_gene = store.hgnc_gene(gene_obj['hgnc_id'], build=genome_build)
+                    hgnc_symbol = hgnc_gene['hgnc_symbol'] if hgnc_gene else None
+                if not hgnc_symbol:
                     continue
-                has_changed = True
-                gene_obj['hgnc_symbol'] = hgnc_gene['hgnc_symbol']
+                gene_obj['hgnc_symbol'] = hgnc_symbol
+                updates['genes.{0}.hgnc_symbol'.format(gene_index)] = hgnc_symbol
 
     # We update the variant if some information was missing from loading
     # Or if symbold in reference genes have changed
-    if update and has_changed:
-        variant_obj = store.update_variant(variant_obj)
+    if update and updates:
+        store.update_variant_fields(variant_obj['_id'], updates)
 
-    variant_obj['comments'] = store.events(institute_obj, case=case_obj,
-                                           variant_id=variant_obj['variant_id'], comments=True)
+    if page_info:
+        variant_obj['comments'] = page_info['comments'].get(variant_obj['variant_id'], [])
+    else:
+        variant_obj['comments'] = store.events(institute_obj, case=case_obj,
+                                               variant_id=variant_obj['variant_id'], comments=True)
 
     if variant_genes:
         variant_obj.update(get_predictions(variant_genes))
@@ -277,76 +390,105 @@ def parse_variant(store, institute_obj, case_obj, variant_obj, update=False, gen
     return variant_obj
 
 
-def variant_export_lines(store, case_obj, variants_query):
-    """Get variants info to be exported to file, one list (line) per variant.
+def variant_export_lines(store, case_obj, variants_query, batch_size=EXPORT_BATCH_SIZE):
+    """Get variants info to be exported to file, one line per variant.
+
+        The variants are read in batches. The gene symbols of a batch are fetched with
+        one query and kept for the following batches, so memory use does not grow with
+        the number of variants exported.
 
         Args:
             store(scout.adapter.MongoAdapter)
             case_obj(scout.models.Case)
-            variants_query: a list of variant objects, each one is a dictionary
+            variants_query: an iterable of variant objects, each one is a dictionary
+            batch_size(int): Nr of variants to read before looking up gene symbols
 
-        Returns:
-            export_variants: a list of strings. Each string  of the list corresponding to the fields
-                             of a variant to be exported to file, separated by comma
+        Yields:
+            export_line(str): the fields of a variant to be exported to file, separated by comma
     """
+    gene_symbols = {}
+    variants_query = iter(variants_query)
+    while True:
+        variants_batch = list(islice(variants_query, batch_size))
+        if not variants_batch:
+            break
+
+        hgnc_ids = set(gene_obj['hgnc_id'] for variant in variants_batch
+                       for gene_obj in variant.get('genes') or [])
+        missing_ids = hgnc_ids.difference(gene_symbols)
+        if missing_ids:
+            for hgnc_id in missing_ids:
+                gene_symbols[hgnc_id] = None
+            # Symbols of build 38 are used when a gene is in both builds
+            for build in ('37', '38'):
+                gene_symbols.update(store.hgnc_symbols(missing_ids, build=build))
+
+        for variant in variants_batch:
+            yield variant_export_line(case_obj, variant, gene_symbols)
+
+
+def variant_export_line(case_obj, variant, gene_symbols):
+    """Get the fields of one variant to be exported to file, separated by comma
 
-    export_variants = []
-
-    for variant in variants_query:
-        variant_line = []
-        position = variant['position']
-        change = variant['reference']+'>'+variant['alternative']
-        variant_line.append(variant['rank_score'])
-        variant_line.append(variant['chromosome'])
-        variant_line.append(position)
-        variant_line.append(change)
-        variant_line.append('_'.join([str(position), change]))
-
-        # gather gene info:
-        gene_list = variant.get('genes') #this is a list of gene objects
-        gene_ids = []
-        gene_names = []
-        hgvs_c = []
-
-        # if variant is in genes
-        if len(gene_list) > 0:
-            for gene_obj in gene_list:
-                hgnc_id = gene_obj['hgnc_id']
-                gene_name = gene(store, hgnc_id)['symbol']
-
-                gene_ids.append(hgnc_id)
-                gene_names.append(gene_name)
-
-                hgvs_nucleotide = '-'
-                # gather HGVS info from gene transcripts
-                transcripts_list = gene_obj.get('transcripts')
-                for transcript_obj in transcripts_list:
-                    if transcript_obj.get('is_canonical') and transcript_obj.get('is_canonical') is True:
-                        hgvs_nucleotide = str(transcript_obj.get('coding_sequence_name'))
-                hgvs_c.append(hgvs_nucleotide)
-
-            variant_line.append(';'.join( str(x) for x in  gene_ids))
-            variant_line.append(';'.join( str(x) for x in  gene_names))
-            variant_line.append(';'.join( str(x) for x in  hgvs_c))
-        else:
-            while i < 4:
-                variant_line.append('-') # instead of gene ids
-                i = i+1
+        Args:
+            case_obj(scout.models.Case)
+            variant(dict)
+            gene_symbols(dict): {<hgnc_id>: <hgnc_symbol>}
 
-        variant_gts = variant['samples'] # list of coverage and gt calls for case samples
-        for individual in case_obj['individuals']:
-            for variant_gt in variant_gts:
-                if individual['individual_id'] == variant_gt['sample_id']:
-                    # gather coverage info
-                    variant_line.append(variant_gt['allele_depths'][0]) # AD reference
-                    variant_line.append(variant_gt['allele_depths'][1]) # AD alternate
-                    # gather genotype quality info
-                    variant_line.append(variant_gt['genotype_quality'])
+        Returns:
+            export_line(str)
+    """
+    variant_line = []
+    position = variant['position']
+    change = variant['reference']+'>'+variant['alternative']
+    variant_line.append(variant['rank_score'])
+    variant_line.append(variant['chromosome'])
+    variant_line.append(position)
+    variant_line.append(change)
+    variant_line.append('_'.join([str(position), change]))
+
+    # gather gene info:
+    gene_list = variant.get('genes') or [] #this is a list of gene objects
+    gene_ids = []
+    gene_names = []
+    hgvs_c = []
+
+    # if variant is in genes
+    if len(gene_list) > 0:
+        for gene_obj in gene_list:
+            hgnc_id = gene_obj['hgnc_id']
+            gene_name = gene_symbols.get(hgnc_id)
+
+            gene_ids.append(hgnc_id)
+            gene_names.append(gene_name)
+
+            hgvs_nucleotide = '-'
+            # gather HGVS info from gene transcripts
+            transcripts_list = gene_obj.get('transcripts') or []
+            for transcript_obj in transcripts_list:
+                if transcript_obj.get('is_canonical') and transcript_obj.get('is_canonical') is True:
+                    hgvs_nucleotide = str(transcript_obj.get('coding_sequence_name'))
+            hgvs_c.append(hgvs_nucleotide)
+
+        variant_line.append(';'.join( str(x) for x in  gene_ids))
+        variant_line.append(';'.join( str(x) for x in  gene_names))
+        variant_line.append(';'.join( str(x) for x in  hgvs_c))
+    else:
+        # instead of gene ids, gene names and HGVS
+        variant_line.extend(['-', '-', '-'])
 
-        variant_line = [str(i) for i in variant_line]
-        export_variants.append(",".join(variant_line))
+    variant_gts = variant['samples'] # list of coverage and gt calls for case samples
+    for individual in case_obj['individuals']:
+        for variant_gt in variant_gts:
+            if individual['individual_id'] == variant_gt['sample_id']:
+                # gather coverage info
+                variant_line.append(variant_gt['allele_depths'][0]) # AD reference
+                variant_line.append(variant_gt['allele_depths'][1]) # AD alternate
+                # gather genotype quality info
+                variant_line.append(variant_gt['genotype_quality'])
 
-    return export_variants
+    variant_line = [str(i) for i in variant_line]
+    return ",".join(variant_line)
 
 
 def variants_export_header(case_obj):
@@ -1059,12 +1201,15 @@ def cancer_variants(store, request_args, institute_id, case_name):
     """Fetch data related to cancer variants for a case."""
     institute_obj, case_obj = institute_and_case(store, institute_id, case_name)
     form = CancerFiltersForm(request_args)
-    variants_query = store.variants(case_obj['_id'], category='cancer', query=form.data).limit(50)
+    variants_query = store.variants(case_obj['_id'], category='cancer', query=form.data,
+                                    projection='cancer_list').limit(50)
+    variant_res = list(variants_query)
+    page_info = variants_page_info(store, institute_obj, case_obj, variant_res)
     data = dict(
         institute=institute_obj,
         case=case_obj,
-        variants=(parse_variant(store, institute_obj, case_obj, variant, update=True) for
-                  variant in variants_query),
+        variants=(parse_variant(store, institute_obj, case_obj, variant, update=True,
+                                page_info=page_info) for variant in variant_res),
         form=form,
         variant_type=request_args.get('variant_type', 'clinical'),
     )
@@ -136,18 +136,15 @@ def variants(institute_id, case_name):
                                case_obj['dynamic_gene_list']))
         form.hgnc_symbols.data = hpo_symbols
 
-    variants_query = store.variants(case_obj['_id'], query=form.data)
     data = {}
 
     if request.form.get('export'):
         document_header = controllers.variants_export_header(case_obj)
-        export_lines = []
-        if form.data['chrom'] == 'MT':
-            # Return all MT variants
-            export_lines = controllers.variant_export_lines(store, case_obj, variants_query)
-        else:
-            # Return max 500 variants
-            export_lines = controllers.variant_export_lines(store, case_obj, variants_query.limit(500))
+        # Stream all variants that match the filters, reading only the exported fields
+        variants_query = store.variants(case_obj['_id'], query=form.data, nr_of_variants=-1,
+                                        projection='export')
+        export_lines = controllers.variant_export_lines(
+            store, case_obj, variants_query.batch_size(controllers.EXPORT_BATCH_SIZE))
 
         def generate(header, lines):
             yield header + '\n'
@@ -161,6 +158,10 @@ def variants(institute_id, case_name):
         return Response(generate(",".join(document_header), export_lines), mimetype='text/csv',
                         headers=headers)
 
+    # Start after the last variant of the previous page
+    after = controllers.parse_page_key(request.args.get('after'))
+    variants_query = store.variants(case_obj['_id'], query=form.data, after=after,
+                                    projection='list')
     data = controllers.variants(store, institute_obj, case_obj, variants_query, page)
 
     return dict(institute=institute_obj, case=case_obj, form=form,
@@ -199,8 +200,9 @@ def str_variants(institute_id, case_name):
     query = form.data
     query['variant_type'] = variant_type
 
+    after = controllers.parse_page_key(request.args.get('after'))
     variants_query = store.variants(case_obj['_id'], category='str',
-        query=query)
+        query=query, after=after, projection='list')
     data = controllers.str_variants(store, institute_obj, case_obj,
         variants_query, page)
     return dict(institute=institute_obj, case=case_obj,
@@ -267,15 +269,16 @@ def sv_variants(institute_id, case_name):
                             case_name=case_obj['display_name'])
         store.update_status(institute_obj, case_obj, user_obj, 'active', case_link)
 
-    variants_query = store.variants(case_obj['_id'], category='sv',
-                                    query=form.data)
     data = {}
     # if variants should be exported
     if request.form.get('export'):
         document_header = controllers.variants_export_header(case_obj)
-        export_lines = []
-        # Return max 500 variants
-        export_lines = controllers.variant_export_lines(store, case_obj, variants_query.limit(500))
+        # Stream all variants that match the filters, reading only the exported fields
+        variants_query = store.variants(case_obj['_id'], category='sv', query=form.data,
+                                        nr_of_variants=-1,
+                                        projection='export')
+        export_lines = controllers.variant_export_lines(
+            store, case_obj, variants_query.batch_size(controllers.EXPORT_BATCH_SIZE))
 
         def generate(header, lines):
             yield header + '\n'
@@ -287,6 +290,10 @@ def sv_variants(institute_id, case_name):
         return Response(generate(",".join(document_header), export_lines), mimetype='text/csv', headers=headers) # return a csv with the exported variants
 
     else:
+        # Start after the last variant of the previous page
+        after = controllers.parse_page_key(request.args.get('after'))
+        variants_query = store.variants(case_obj['_id'], category='sv',
+                                        query=form.data, after=after, projection='list')
         data = controllers.sv_variants(store, institute_obj, case_obj,
                                        variants_query, page)
 
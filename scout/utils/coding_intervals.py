@@ -0,0 +1,126 @@
+"""
+coding_intervals.py
+
+Merged coding regions of a genome build, stored as sorted arrays.
+
+Genes are padded and overlapping genes are merged into one region. Since the
+regions on a chromosome never overlap both the starts and the ends are sorted,
+so the region of a variant is found with a binary search.
+"""
+import logging
+
+from array import array
+from bisect import bisect_right
+
+LOG = logging.getLogger(__name__)
+
+# Nr of bases added on each side of a gene
+GENE_PADDING = 5000
+
+
+class CodingIntervals(object):
+    """Merged coding regions per chromosome
+
+    Intervals are half open, [start, end).
+
+    Args:
+        regions(dict): {<chrom>: (starts(iterable(int)), ends(iterable(int)))}
+    """
+
+    def __init__(self, regions=None):
+        self.regions = {}
+        for chrom, (starts, ends) in (regions or {}).items():
+            self.regions[chrom] = (array('q', starts), array('q', ends))
+
+    @classmethod
+    def from_genes(cls, genes, padding=GENE_PADDING):
+        """Merge the genes into coding regions
+
+        Args:
+            genes(iterable(scout.models.HgncGene)): Genes with chromosome, start and end
+            padding(int): Nr of bases to add on each side of a gene
+
+        Returns:
+            coding_intervals(CodingIntervals)
+        """
+        LOG.info("Building coding intervals")
+        gene_intervals = {}
+        for gene_obj in genes:
+            start = max((gene_obj['start'] - padding), 1)
+            end = gene_obj['end'] + padding
+            gene_intervals.setdefault(gene_obj['chromosome'], []).append((start, end))
+
+        regions = {}
+        for chrom, intervals in gene_intervals.items():
+            starts = []
+            ends = []
+            for start, end in sorted(intervals):
+                # Merge the gene with the previous region if they overlap
+                if ends and start < ends[-1]:
+                    ends[-1] = max(ends[-1], end)
+                    continue
+                starts.append(start)
+                ends.append(end)
+            regions[chrom] = (starts, ends)
+
+        return cls(regions)
+
+    def region(self, chrom, start, end):
+        """Return the coding region that overlaps an interval
+
+        If the interval overlaps several regions the first one is returned.
+
+        Args:
+            chrom(str)
+            start(int)
+            end(int): Exclusive end of the interval
+
+        Returns:
+            region_id(tuple): (<chrom>, <region index>) or None if not in a coding region
+        """
+        if chrom not in self.regions:
+            return None
+        starts, ends = self.regions[chrom]
+        # The first region that ends after the start of the interval
+        index = bisect_right(ends, start)
+        if index < len(starts) and starts[index] < end:
+            return (chrom, index)
+        return None
+
+    def intervals(self, chrom):
+        """Return the coding regions of a chromosome
+
+        Args:
+            chrom(str)
+
+        Returns:
+            intervals(list(tuple)): [(<start>, <end>), ...]
+        """
+        starts, ends = self.regions.get(chrom, ([], []))
+        return list(zip(starts, ends))
+
+    def to_documents(self, build):
+        """Return the regions as one document per chromosome, to be stored in the database"""
+        return [
+            {
+                'build': build,
+                'chromosome': chrom,
+                'starts': list(starts),
+                'ends': list(ends),
+            }
+            for chrom, (starts, ends) in self.regions.items()
+        ]
+
+    @classmethod
+    def from_documents(cls, documents):
+        """Create the index from documents stored with `to_documents`"""
+        return cls({
+            document['chromosome']: (document['starts'], document['ends'])
+            for document in documents
+        })
+
+    def __contains__(self, chrom):
+        return chrom in self.regions
+
+    def __len__(self):
+        return sum(len(starts) for starts, _ in self.regions.values())
@@ -0,0 +1,118 @@
+"""
+prefix_index.py
+
+An in memory index for autocompletion, stored as a sorted array of keys.
+
+Every item is indexed on a few lowercase keys, such as the symbol and aliases
+of a gene or the words of a HPO description. All keys that start with a prefix
+are next to each other in the sorted array, so they are found with two binary
+searches instead of a regular expression scan of a collection.
+"""
+import logging
+
+from bisect import bisect_left
+
+LOG = logging.getLogger(__name__)
+
+# Sorts after any character that is used in a key
+_HIGHEST = '\uffff'
+
+# Results of queries up to this length are kept, since they match many keys
+SHORT_QUERY_LENGTH = 2
+
+
+class PrefixIndex(object):
+    """Items searched by the prefix of their keys
+
+    Args:
+        entries(iterable(tuple)): (<item>, <keys(iterable(tuple))>) where the keys are
+                                  (<key(str)>, <rank(int)>), items matched on a key with
+                                  a lower rank are returned first
+    """
+
+    def __init__(self, entries=None):
+        self.items = []
+        self.item_keys = []
+        index_entries = []
+        for item, keys in (entries or []):
+            item_index = len(self.items)
+            ranked_keys = {}
+            for key, rank in keys:
+                if not key:
+                    continue
+                key = normalize_key(key)
+                ranked_keys[key] = min(rank, ranked_keys.get(key, rank))
+            self.items.append(item)
+            self.item_keys.append(tuple(ranked_keys))
+            index_entries.extend((key, rank, item_index) for key, rank in ranked_keys.items())
+
+        index_entries.sort()
+        self.keys = [key for key, _, _ in index_entries]
+        self.key_ranks = [rank for _, rank, _ in index_entries]
+        self.key_items = [item_index for _, _, item_index in index_entries]
+        self._short_results = {}
+
+    def search(self, query, limit=10):
+        """Return the items with keys that start with the words of a query
+
+        Items that have a key equal to the query come first, then items are
+        ordered by rank and by the length of the matching key.
+
+        Args:
+            query(str): One or more words
+            limit(int): Max number of items to return
+
+        Returns:
+            items(list)
+        """
+        words = normalize_key(query).split()
+        if not words:
+            return []
+        query = ' '.join(words)
+        if len(query) <= SHORT_QUERY_LENGTH:
+            results = self._short_results.get((query, limit))
+            if results is None:
+                results = self._search(query, words, limit)
+                self._short_results[(query, limit)] = results
+            return list(results)
+        return self._search(query, words, limit)
+
+    def _search(self, query, words, limit):
+        """Return the ranked items matching the normalized query"""
+        # The longest word has the fewest keys starting with it
+        prefix = max(words, key=len)
+        start = bisect_left(self.keys, prefix)
+        end = bisect_left(self.keys, prefix + _HIGHEST, start)
+
+        best_matches = {}
+        for position in range(start, end):
+            item_index = self.key_items[position]
+            key = self.keys[position]
+            match = (key != query, self.key_ranks[position], len(key))
+            if item_index in best_matches and best_matches[item_index] <= match:
+                continue
+            best_matches[item_index] = match
+
+        if len(words) > 1:
+            best_matches = {
+                item_index: match for item_index, match in best_matches.items()
+                if self._match_words(item_index, words, query)
+            }
+
+        ranked = sorted(best_matches, key=lambda item_index: (best_matches[item_index], item_index))
+        return [self.items[item_index] for item_index in ranked[:limit]]
+
+    def _match_words(self, item_index, words, query):
+        """Check that every word of the query starts a key of an item"""
+        item_keys = self.item_keys[item_index]
+        if any(key.startswith(query) for key in item_keys):
+            return True
+        return all(any(key.startswith(word) for key in item_keys) for word in words)
+
+    def __len__(self):
+        return len(self.items)
+
+
+def normalize_key(key):
+    """Return a key in lowercase with single spaces"""
+    return ' '.join(str(key).lower().split())
@@ -3,7 +3,6 @@ import gzip
 import urllib.request
 from urllib.error import (HTTPError, URLError)
 
-import pybiomart
 from scout.constants import CHROMOSOMES
 
 LOG = logging.getLogger(__name__)
@@ -155,7 +154,7 @@ def fetch_ensembl_genes(build='37'):
     LOG.info("Fetching ensembl genes from %s", url)
     dataset_name = 'hsapiens_gene_ensembl'
     
-    dataset = pybiomart.Dataset(name=dataset_name, host=url)
+    dataset = biomart_dataset(dataset_name, url)
     
     attributes = [
         'chromosome_name',
@@ -197,7 +196,7 @@ def fetch_ensembl_transcripts(build='37', chromosomes=None):
     
     dataset_name = 'hsapiens_gene_ensembl'
     
-    dataset = pybiomart.Dataset(name=dataset_name, host=url)
+    dataset = biomart_dataset(dataset_name, url)
     
     attributes = [
         'chromosome_name',
@@ -236,7 +235,7 @@ def fetch_ensembl_exons(build='37'):
     
     dataset_name = 'hsapiens_gene_ensembl'
     
-    dataset = pybiomart.Dataset(name=dataset_name, host=url)
+    dataset = biomart_dataset(dataset_name, url)
     
     attributes = [
         'chromosome_name',
@@ -339,3 +338,12 @@ def fetch_hpo_files(hpogenes=False, hpoterms=False, phenotype_to_terms=False, hp
 
     return hpo_files
 
+
+def biomart_dataset(name, host):
+    """Return a biomart dataset
+
+    pybiomart is imported here since it is slow to import and only used when
+    fetching from ensembl.
+    """
+    import pybiomart
+    return pybiomart.Dataset(name=name, host=host)
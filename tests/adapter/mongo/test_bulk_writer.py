@@ -0,0 +1,58 @@
+from scout.adapter.mongo.bulk_writer import VariantBulkWriter
+
+
+def ordered_bulk_write(collection):
+    """mongomock does not support unordered bulk writes"""
+    bulk_write = collection.bulk_write
+    return lambda requests, ordered=True: bulk_write(requests)
+
+
+def test_bulk_writer_bounded_bulks(adapter):
+    ## GIVEN a writer that fits a few variants in a bulk
+    variant_objs = [{'_id': str(index), 'rank_score': index} for index in range(10)]
+    writer = VariantBulkWriter(adapter.variant_collection, max_bytes=100)
+
+    ## WHEN adding the variants
+    with writer:
+        writer.add_many(variant_objs)
+
+    ## THEN all variants should be inserted in several bulks
+    assert writer.nr_inserted == 10
+    assert writer.nr_bulks > 1
+    assert adapter.variant_collection.count_documents({}) == 10
+
+
+def test_bulk_writer_existing_variants(adapter, monkeypatch):
+    ## GIVEN a variant that is already loaded
+    adapter.variant_collection.insert_one({'_id': 'existing', 'compounds': []})
+    writer = VariantBulkWriter(adapter.variant_collection)
+    monkeypatch.setattr(writer.collection, 'bulk_write', ordered_bulk_write(writer.collection))
+
+    ## WHEN loading it again together with a new variant
+    compounds = [{'variant': 'new', 'combined_score': 10}]
+    with writer:
+        writer.add_many([{'_id': 'new'}, {'_id': 'existing', 'compounds': compounds}])
+
+    ## THEN the new variant should be inserted and the compounds of the existing one updated
+    assert writer.nr_inserted == 1
+    assert writer.nr_updated == 1
+    existing = adapter.variant_collection.find_one({'_id': 'existing'})
+    assert existing['compounds'] == compounds
+
+
+def test_bulk_writer_shadow_load(adapter, monkeypatch):
+    ## GIVEN a variant that is already staged
+    adapter.variant_collection.insert_one({'_id': 'existing', 'rank_score': 1})
+    writer = VariantBulkWriter(adapter.variant_collection, generation='new_load')
+    monkeypatch.setattr(writer.collection, 'bulk_write', ordered_bulk_write(writer.collection))
+
+    ## WHEN loading it again in a load generation
+    with writer:
+        writer.add_many([{'_id': 'new'}, {'_id': 'existing', 'rank_score': 2}])
+
+    ## THEN the staged variant should be replaced and all variants tagged with the generation
+    assert writer.nr_inserted == 1
+    assert writer.nr_updated == 1
+    existing = adapter.variant_collection.find_one({'_id': 'existing'})
+    assert existing['rank_score'] == 2
+    assert adapter.variant_collection.count_documents({'load_generation': 'new_load'}) == 2
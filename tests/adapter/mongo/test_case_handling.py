@@ -57,6 +57,50 @@ def test_get_cases(adapter, case_obj):
     # THEN we should get the correct case
     assert result.count() == 1
 
+def test_case_search_keys(adapter, case_obj, institute_obj, user_obj):
+    # GIVEN a case with a cohort that is assigned to a user
+    adapter.user_collection.insert_one(user_obj)
+    case_obj['cohorts'] = ['Pedigree-study']
+    adapter._add_case(case_obj)
+    assert list(adapter.cases(name_query='john')) == []
+    adapter.assign(institute_obj, case_obj, user_obj, 'link')
+
+    # WHEN searching for the prefix of a word of the user name, the cohort or an individual
+    # THEN the case should be found
+    for name_query in ['Doe', 'john@', 'study', 'pedigree-st', 'na1288']:
+        assert [case['_id'] for case in adapter.cases(name_query=name_query)] == [case_obj['_id']]
+
+    # WHEN searching for a part that is not a prefix
+    # THEN the case should not be found
+    assert list(adapter.cases(name_query='edigree')) == []
+
+    # WHEN the user is unassigned
+    adapter.unassign(institute_obj, case_obj, user_obj, 'link')
+    # THEN the case should not be found by the user
+    assert list(adapter.cases(name_query='john')) == []
+
+def test_cases_by_field_without_search_keys(adapter, case_obj):
+    # GIVEN a case from before the search keys with a cohort and an HPO term
+    case_obj['cohorts'] = ['pedigree']
+    case_obj['phenotype_terms'] = [{'phenotype_id': 'HP:0001250', 'feature': 'Seizures'}]
+    adapter.case_collection.insert_one(case_obj)
+
+    # WHEN searching on the cohort or the HPO term
+    # THEN the case should be found
+    for name_query in ['cohort:pedigree', 'HP:0001250']:
+        assert [case['_id'] for case in adapter.cases(name_query=name_query)] == [case_obj['_id']]
+
+def test_nr_cases_by_institute(adapter, case_obj):
+    # GIVEN a case owned by one institute and shared with another
+    case_obj['collaborators'] = [case_obj['owner'], 'cust002']
+    adapter.case_collection.insert_one(case_obj)
+    other_case = dict(case_obj, _id='other_case', collaborators=[case_obj['owner']])
+    adapter.case_collection.insert_one(other_case)
+    # WHEN counting the cases of the institutes
+    nr_cases = adapter.nr_cases_by_institute([case_obj['owner'], 'cust002', 'cust003'])
+    # THEN the cases should be counted for every collaborator
+    assert nr_cases == {case_obj['owner']: 2, 'cust002': 1, 'cust003': 0}
+
 def test_search_active_case(real_adapter, case_obj, institute_obj, user_obj):
     adapter = real_adapter
 
@@ -188,7 +232,7 @@ def test_get_cases_no_assignees(real_adapter, case_obj):
     adapter = real_adapter
     # GIVEN an empty database (no cases)
     assert adapter.cases().count() == 0
-    adapter.case_collection.insert_one(case_obj)
+    adapter._add_case(case_obj)
     # WHEN retreiving an existing case from the database
     result = adapter.cases(name_query='john')
     # THEN we should get the correct case
@@ -199,12 +243,12 @@ def test_get_cases_display_name(real_adapter, case_obj):
     adapter = real_adapter
     # GIVEN an empty database (no cases)
     assert adapter.cases().count() == 0
-    adapter.case_collection.insert_one(case_obj)
+    adapter._add_case(case_obj)
 
     other_case = case_obj
     other_case['_id'] = 'other_case'
     other_case['display_name'] = 'other_case'
-    adapter.case_collection.insert_one(other_case)
+    adapter._add_case(other_case)
 
     # WHEN retreiving cases by partial display name
     result = adapter.cases(name_query='643')
@@ -216,7 +260,7 @@ def test_get_cases_existing_individual(real_adapter, case_obj):
     adapter = real_adapter
     # GIVEN an empty database (no cases)
     assert adapter.cases().count() == 0
-    adapter.case_collection.insert_one(case_obj)
+    adapter._add_case(case_obj)
     # WHEN retreiving cases by partial individual name
     result = adapter.cases(name_query='NA1288')
     # THEN we should get the correct case
@@ -232,7 +276,7 @@ def test_get_cases_assignees(real_adapter, case_obj, user_obj):
 
     user_obj = adapter.user_collection.find_one()
     case_obj['assignees'] = [user_obj['email']]
-    adapter.case_collection.insert_one(case_obj)
+    adapter._add_case(case_obj)
 
     # WHEN retreiving cases by partial individual name
     result = adapter.cases(name_query='john')
@@ -249,7 +293,7 @@ def test_get_cases_non_existing_assignee(real_adapter, case_obj, user_obj):
 
     user_obj = adapter.user_collection.find_one()
     case_obj['assignees'] = [user_obj['email']]
-    adapter.case_collection.insert_one(case_obj)
+    adapter._add_case(case_obj)
 
     # WHEN retreiving cases by partial individual name
     result = adapter.cases(name_query='damien')
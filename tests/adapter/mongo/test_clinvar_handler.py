@@ -155,6 +155,11 @@ def test_add_remove_subm_objects(adapter, user_obj, institute_obj):
 
     # assert that a variant is present for case 'case1'
     assert adapter.case_to_clinVars('case1') == {variant_data[0]['local_id'] : variant_data[0]}
+    # assert that the variants of many cases can be fetched at once
+    assert adapter.cases_to_clinVars(['case1', 'case2']) == {
+        'case1': {variant_data[0]['local_id'] : variant_data[0]},
+        'case2': {},
+    }
 
     # Removal of clinvar objects from submission and from clinvar collection in database
     # remove case_data object
@@ -193,3 +193,30 @@ def test_global_and_specific_comments_two_cases_different_institutes(adapter, in
                               variant_id=other_variant['variant_id'], comments=True)
     
     assert comments.count() == 1
+
+def test_variants_comments(adapter, institute_obj, case_obj, user_obj, variant_obj):
+    # GIVEN a database with a variant that has a global and a specific comment
+    adapter.variant_collection.insert_one(variant_obj)
+    for level in ['global', 'specific']:
+        adapter.comment(
+            institute=institute_obj,
+            case=case_obj,
+            user=user_obj,
+            link='commentlink',
+            variant=variant_obj,
+            content=level,
+            comment_level=level
+        )
+
+    ## WHEN fetching the comments for the variant and a variant without comments
+    comments = adapter.variants_comments(institute_obj, case_obj,
+                                         [variant_obj['variant_id'], 'no_comments'])
+
+    ## THEN the same comments as from events should be returned for the commented variant
+    expected = adapter.events(institute_obj, case=case_obj,
+                              variant_id=variant_obj['variant_id'], comments=True)
+    assert [comment['_id'] for comment in comments[variant_obj['variant_id']]] == \
+        [comment['_id'] for comment in expected]
+    assert len(comments[variant_obj['variant_id']]) == 2
+    ## THEN the variant without comments should have an empty list
+    assert comments['no_comments'] == []
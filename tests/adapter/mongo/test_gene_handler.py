@@ -164,6 +164,44 @@ def test_get_genes_alias(adapter):
     for result in res:
         assert result['hgnc_id'] == 1
 
+def test_genes_by_prefix(adapter):
+    ##GIVEN a adapter with two genes where the symbol of one starts an alias of the other
+    adapter.load_hgnc_gene({
+        'hgnc_id': 1,
+        'hgnc_symbol': 'AAB',
+        'build': '37',
+        'aliases': ['AAB', 'ABC'],
+    })
+    adapter.load_hgnc_gene({
+        'hgnc_id': 2,
+        'hgnc_symbol': 'AA',
+        'build': '37',
+        'aliases': ['AA', 'AABX'],
+    })
+
+    ##WHEN searching for a prefix
+    res = adapter.genes_by_prefix('aa')
+
+    ##THEN the gene with the full symbol comes first and each gene is returned once
+    assert [gene['hgnc_id'] for gene in res] == [2, 1]
+    ##THEN genes are found on aliases after genes found on their symbol
+    assert [gene['hgnc_id'] for gene in adapter.genes_by_prefix('AAB')] == [1, 2]
+    assert [gene['hgnc_id'] for gene in adapter.genes_by_prefix('ab')] == [1]
+    assert adapter.genes_by_prefix('aa', limit=1)[0]['hgnc_id'] == 2
+    assert adapter.genes_by_prefix('aa', build='38') == []
+
+    ##WHEN a gene is added
+    adapter.load_hgnc_gene({
+        'hgnc_id': 3,
+        'hgnc_symbol': 'AAC',
+        'build': '37',
+        'aliases': ['AAC'],
+    })
+    adapter.update_genes_version(['37'])
+    ##THEN it is found since the index is rebuilt
+    assert [gene['hgnc_id'] for gene in adapter.genes_by_prefix('aac')] == [3]
+
+
 def test_get_genes_regex(real_adapter):
     adapter = real_adapter
     ##GIVEN a empty adapter
@@ -472,3 +510,45 @@ def test_insert_transcript(adapter):
     assert gene_res['transcripts'][0]['refseq_id'] == refseq_id
     
 
+
+
+def test_coding_intervals_stored(gene_database):
+    adapter = gene_database
+    ## GIVEN a database where genes have been loaded
+    assert adapter.coding_interval_collection.find({'build': '37'}).count() > 0
+
+    ## WHEN fetching the coding intervals
+    intervals = adapter.get_coding_intervals(build='37')
+
+    ## THEN they should match the intervals built from the genes
+    built = adapter.get_coding_intervals(genes=list(adapter.all_genes(build='37')))
+    assert intervals.regions.keys() == built.regions.keys()
+    for chrom in built.regions:
+        assert intervals.intervals(chrom) == built.intervals(chrom)
+
+    ## WHEN the genes are dropped
+    adapter.drop_genes(build='37')
+    ## THEN the stored intervals should be removed
+    assert adapter.coding_interval_collection.find({'build': '37'}).count() == 0
+    assert len(adapter.get_coding_intervals(build='37')) == 0
+
+
+def test_update_genes_version(adapter):
+    ## GIVEN a database with a gene and stored coding intervals
+    adapter.load_hgnc_gene({'hgnc_id': 1, 'hgnc_symbol': 'AAB', 'build': '37',
+                            'chromosome': '1', 'start': 100, 'end': 200})
+    adapter.update_genes_version(['37'])
+    assert len(adapter.get_coding_intervals(build='37')) == 1
+
+    ## WHEN more genes are loaded one at a time
+    adapter.load_hgnc_gene({'hgnc_id': 2, 'hgnc_symbol': 'AA', 'build': '37',
+                            'chromosome': '2', 'start': 100, 'end': 200})
+    ## THEN the stored intervals should be kept until the load is done
+    assert adapter.coding_interval_collection.find({'build': '37'}).count() > 0
+
+    ## WHEN the load is done
+    adapter.update_genes_version(['37'])
+
+    ## THEN the intervals should be built from all genes
+    assert adapter.coding_interval_collection.find({'build': '37'}).count() == 0
+    assert len(adapter.get_coding_intervals(build='37')) == 2
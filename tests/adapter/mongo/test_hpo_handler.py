@@ -307,3 +307,28 @@ def test_fetch_disease_term_by_hgnc_id_again(adapter):
     
     ## THEN assert the correct term was fetched
     assert len([term for term in res]) == 1
+
+def test_hpo_terms_by_prefix(adapter):
+    ## GIVEN a adapter loaded with three hpo terms
+    adapter.load_hpo_bulk([
+        dict(_id='HP:0000003', hpo_id='HP:0000003', hpo_number=3,
+             description='Abnormality of the heart', genes=[]),
+        dict(_id='HP:0000002', hpo_id='HP:0000002', hpo_number=2,
+             description='Heart murmur', genes=[]),
+        dict(_id='HP:0001250', hpo_id='HP:0001250', hpo_number=1250,
+             description='Seizures', genes=[]),
+    ])
+
+    ## WHEN searching for the start of a word in the description
+    res = adapter.hpo_terms_by_prefix('hea')
+    ## THEN the terms are returned in order of hpo number
+    assert [term['_id'] for term in res] == ['HP:0000002', 'HP:0000003']
+
+    ## THEN all words of the query have to match
+    assert [term['_id'] for term in adapter.hpo_terms_by_prefix('abn hea')] == ['HP:0000003']
+    ## THEN terms are found on their id, with or without prefix
+    assert [term['_id'] for term in adapter.hpo_terms_by_prefix('HP:00012')] == ['HP:0001250']
+    assert [term['_id'] for term in adapter.hpo_terms_by_prefix('0001250')] == ['HP:0001250']
+    ## THEN words from different terms do not match
+    assert adapter.hpo_terms_by_prefix('seizures murmur') == []
+    assert len(adapter.hpo_terms_by_prefix('hea', limit=1)) == 1
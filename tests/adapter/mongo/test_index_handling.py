@@ -4,7 +4,10 @@ test_index_handling.py
 Tests how the index part of the adapter behaves
 """
 
+from pymongo import ASCENDING
+
 from scout.constants import COLLECTIONS
+from scout.adapter.mongo.index import (explain_summary, propose_index, index_covers)
 
 # def test_collections(adapter):
 #     ## GIVEN a adapter just initialized
@@ -49,3 +52,58 @@ def test_load_indexes_twice(real_adapter):
         assert index_name
     ## THEN assert there where indexes created
     assert i > 0
+
+
+def test_explain_summary():
+    ## GIVEN the output of explain for a query that sorts in memory
+    explanation = {
+        'queryPlanner': {'winningPlan': {
+            'stage': 'SORT',
+            'inputStage': {
+                'stage': 'FETCH',
+                'inputStage': {'stage': 'IXSCAN', 'indexName': 'caseid_rankscore'},
+            },
+        }},
+        'executionStats': {'totalKeysExamined': 100, 'totalDocsExamined': 100,
+                           'nReturned': 50, 'executionTimeMillis': 3},
+    }
+    ## WHEN summarizing it
+    summary = explain_summary(explanation)
+    ## THEN the plan and stats should be found
+    assert summary['stages'] == ['SORT', 'FETCH', 'IXSCAN']
+    assert summary['indexes'] == ['caseid_rankscore']
+    assert summary['blocking_sort'] is True
+    assert summary['collscan'] is False
+    assert summary['docs_examined'] == 100
+
+
+def test_propose_index(adapter, case_obj):
+    ## GIVEN a query with a secondary filter
+    mongo_query = adapter.build_query(case_obj['_id'], query={'size': 100}, category='sv')
+    ## WHEN proposing an index
+    keys = propose_index(mongo_query, [('variant_rank', ASCENDING)])
+    ## THEN the equality fields should be followed by the sort and the range field
+    assert keys == [('case_id', ASCENDING), ('category', ASCENDING),
+                    ('variant_type', ASCENDING), ('variant_rank', ASCENDING),
+                    ('length', ASCENDING)]
+    ## THEN the proposal is covered by an index that starts with the same keys
+    assert index_covers([keys + [('_id', ASCENDING)]], keys)
+    assert not index_covers([keys[:3]], keys)
+
+
+def test_advise_indexes(adapter, case_obj, monkeypatch):
+    ## GIVEN queries that scans the whole collection
+    def explain_query(mongo_query, sorting=None, limit=50, collection_name='variant'):
+        return {'stages': ['COLLSCAN'], 'indexes': [], 'collscan': True, 'blocking_sort': False,
+                'keys_examined': 0, 'docs_examined': 1000, 'returned': 50, 'time_ms': 10}
+    monkeypatch.setattr(adapter, 'explain_query', explain_query)
+
+    ## WHEN asking for advice
+    advice = adapter.advise_indexes(case_obj, filters=[
+        ('default', 'snv', {}),
+        ('research', 'snv', {'variant_type': 'research'}),
+    ])
+    ## THEN the first query should get a proposal, the second is covered by the same index
+    assert all(summary['flagged'] for summary in advice)
+    assert advice[0]['proposal'][-2:] == [('variant_rank', ASCENDING), ('_id', ASCENDING)]
+    assert advice[1]['proposal'] is None
@@ -47,3 +47,17 @@ def test_load_case_empty_vcf(real_panel_database, scout_config, empty_sv_clinica
     
     ## THEN assert that the empty VCF was used
     assert existing_case['vcf_files']['vcf_sv'] == empty_sv_clinical_file
+
+
+def test_load_case_workers(real_panel_database, scout_config):
+    adapter = real_panel_database
+    ## GIVEN an empty database and a case with snv and sv files
+    assert scout_config['vcf_snv'] and scout_config['vcf_sv']
+
+    ## WHEN loading the case with the files in parallel
+    adapter.load_case(scout_config, workers=2)
+
+    ## THEN the variants of both files should be loaded
+    case_id = scout_config['family']
+    for category in ['snv', 'sv']:
+        assert adapter.variant_collection.find_one({'case_id': case_id, 'category': category})
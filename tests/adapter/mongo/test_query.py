@@ -17,6 +17,17 @@ def test_build_gene_variant_query(adapter):
     assert gene_variant_query['rank_score'] == {'$gte': 15} # default
     assert gene_variant_query['hgnc_symbols'] == {'$in': hgnc_symbols} # given
 
+def test_build_gene_variant_query_institutes(adapter):
+    # GIVEN a empty database
+
+    # WHEN building a query restricted to some institutes
+    institute_ids = ['cust000', 'cust001']
+    gene_variant_query = adapter.build_variant_query(query={'hgnc_symbols': ['POT1']},
+                                                     institute_ids=institute_ids)
+
+    # THEN the institutes should be part of the query
+    assert gene_variant_query['institute'] == {'$in': institute_ids}
+
 def test_build_query(adapter):
     case_id = 'cust000'
 
@@ -578,3 +589,16 @@ def test_get_overlapping_variant(populated_database, parsed_case):
     for variant in result:
         index += 1
     assert index == 2
+
+    # test function that collects the overlapping variants for many variants at once
+    variants = [snv_one, snv_two, sv_one, sv_two]
+    overlapping = populated_database.overlapping_variants(variants)
+    for variant in variants:
+        expected = [var['_id'] for var in populated_database.overlapping(variant)]
+        assert [var['_id'] for var in overlapping[variant['_id']]] == expected
+
+    # test that the overlapping variants are limited per variant
+    overlapping = populated_database.overlapping_variants(variants, limit=1)
+    for variant in variants:
+        expected = [var['_id'] for var in populated_database.overlapping(variant)][:1]
+        assert [var['_id'] for var in overlapping[variant['_id']]] == expected
@@ -0,0 +1,62 @@
+from scout.adapter import MongoAdapter
+from scout.adapter.mongo.cache import (ReferenceCache, REFERENCE_CACHE)
+from scout.models.hgnc_map import HgncGene
+
+
+def test_reference_cache_evicts_least_recently_used():
+    ## GIVEN a cache with room for two entries
+    cache = ReferenceCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    ## WHEN the first entry is used and a third entry is added
+    assert cache.get('a') == 1
+    cache.set('c', 3)
+
+    ## THEN the least recently used entry should be evicted
+    assert len(cache) == 2
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.get('b') is not 2
+
+
+def test_hgnc_gene_cached(adapter, parsed_gene):
+    ## GIVEN a database with a gene that has been fetched once
+    adapter.load_hgnc_gene(HgncGene(**parsed_gene))
+    hgnc_id = parsed_gene['hgnc_id']
+    gene_obj = adapter.hgnc_gene(hgnc_id)
+    assert gene_obj['hgnc_symbol'] == parsed_gene['hgnc_symbol']
+
+    ## WHEN the returned object is modified and the gene is updated behind the adapter
+    gene_obj['hgnc_symbol'] = 'modified'
+    adapter.hgnc_collection.update_one({'hgnc_id': hgnc_id}, {'$set': {'description': 'new'}})
+
+    ## THEN the gene should be served from the cache, without the modification
+    cached_obj = adapter.hgnc_gene(hgnc_id)
+    assert cached_obj['hgnc_symbol'] == parsed_gene['hgnc_symbol']
+    assert cached_obj['description'] != 'new'
+
+    ## WHEN genes are loaded
+    other_gene = dict(parsed_gene)
+    other_gene['hgnc_id'] = hgnc_id + 1
+    adapter.load_hgnc_bulk([HgncGene(**other_gene)])
+
+    ## THEN the cached gene should be invalidated
+    assert adapter.hgnc_gene(hgnc_id)['description'] == 'new'
+
+
+def test_gene_panel_invalidated_by_other_adapter(panel_database, panel_info, monkeypatch):
+    adapter = panel_database
+    ## GIVEN a panel that has been fetched by one adapter
+    panel_obj = adapter.gene_panel(panel_info['panel_name'])
+    assert adapter.gene_to_panels({'panels': [panel_obj]})
+
+    ## WHEN the panel is updated by another adapter, as in another process
+    monkeypatch.setattr(REFERENCE_CACHE, 'check_interval', 0)
+    other_adapter = MongoAdapter(adapter.db)
+    other_obj = other_adapter.gene_panel(panel_info['panel_name'])
+    other_obj['genes'] = []
+    other_adapter.update_panel(other_obj)
+
+    ## THEN the first adapter should see the new panel
+    assert adapter.gene_panel(panel_info['panel_name'])['genes'] == []
+    assert adapter.gene_to_panels({'panels': [panel_obj]}) == {}
@@ -26,4 +26,21 @@ def test_get_nonexisting_user(adapter):
     """docstring for test_get_nonexisting_user"""
     user_obj = adapter.user(email='john.doe@mail.com')
     assert user_obj == None
-    
\ No newline at end of file
+    
+
+
+def test_users_by_email(adapter):
+    ## GIVEN a database with two users
+    for name in ['clark', 'lois']:
+        adapter.add_user(build_user({
+            'email': name + '@mail.com',
+            'name': name,
+            'institutes': ['test-1'],
+        }))
+
+    ## WHEN fetching one existing and one non existing user
+    users = adapter.users_by_email(['clark@mail.com', 'john.doe@mail.com'])
+
+    ## THEN only the existing user should be returned
+    assert list(users) == ['clark@mail.com']
+    assert users['clark@mail.com']['name'] == 'clark'
@@ -80,6 +80,89 @@ def test_unmark_causative(adapter, institute_obj, case_obj, user_obj, variant_ob
     assert adapter.event_collection.find().count() == 4
 
 
+def test_other_causatives(adapter, institute_obj, case_obj, user_obj, variant_obj):
+    ## GIVEN a case and another case of the institute with the same variant
+    adapter.case_collection.insert_one(case_obj)
+    other_case = dict(case_obj, _id='other_case', display_name='other_case')
+    adapter.case_collection.insert_one(other_case)
+    adapter.variant_collection.insert_one(variant_obj)
+    other_variant = dict(variant_obj, _id='other_variant', case_id=other_case['_id'])
+    adapter.variant_collection.insert_one(other_variant)
+
+    ## WHEN the variant is marked causative in the other case
+    adapter.mark_causative(institute=institute_obj, case=other_case, user=user_obj,
+                           link='link', variant=other_variant)
+
+    ## THEN the causative should be found from the first case
+    causatives = list(adapter.other_causatives(case_obj, variant_obj))
+    assert [causative['_id'] for causative in causatives] == ['other_variant']
+    assert causatives[0]['case_id'] == other_case['_id']
+    assert [var['_id'] for var in adapter.check_causatives(case_obj=case_obj)] == [variant_obj['_id']]
+    assert adapter.get_causatives(institute_obj['_id']) == ['other_variant']
+
+    ## THEN the causative should not be found from its own case
+    assert list(adapter.other_causatives(other_case, other_variant)) == []
+
+    ## WHEN the variant is unmarked
+    adapter.unmark_causative(institute=institute_obj, case=other_case, user=user_obj,
+                             link='link', variant=other_variant)
+
+    ## THEN there should be no other causatives
+    assert list(adapter.other_causatives(case_obj, variant_obj)) == []
+    assert adapter.check_causatives(case_obj=case_obj) == []
+
+
+def test_rebuild_causative_index(adapter, case_obj, variant_obj):
+    ## GIVEN a case with a causative that is not in the causative index
+    case_obj['causatives'] = [variant_obj['_id']]
+    adapter.case_collection.insert_one(case_obj)
+    adapter.variant_collection.insert_one(variant_obj)
+
+    ## THEN the causative should be found from the cases
+    assert adapter.causative_collection.find_one() is None
+    assert adapter.get_causatives(case_obj['owner']) == [variant_obj['_id']]
+
+    ## WHEN rebuilding the index
+    assert adapter.rebuild_causative_index() == 1
+
+    ## THEN the causative should be indexed
+    assert adapter.causative_collection.find_one()['_id'] == variant_obj['_id']
+    assert adapter.get_causatives(case_obj['owner']) == [variant_obj['_id']]
+
+    ## WHEN the case is deleted
+    adapter.delete_case(case_id=case_obj['_id'])
+
+    ## THEN the causative should be removed from the index
+    assert adapter.get_causatives(case_obj['owner']) == []
+
+
+def test_other_causatives_not_indexed(adapter, institute_obj, case_obj, user_obj,
+                                      variant_obj):
+    ## GIVEN a database from before the causative index with a causative in another case
+    adapter.case_collection.insert_one(case_obj)
+    other_variant = dict(variant_obj, _id='other_variant', case_id='other_case')
+    adapter.variant_collection.insert_many([variant_obj, other_variant])
+    adapter.case_collection.insert_one(dict(case_obj, _id='other_case',
+                                            causatives=[other_variant['_id']]))
+
+    ## THEN the causative should be found from the cases
+    causatives = list(adapter.other_causatives(case_obj, variant_obj))
+    assert [causative['_id'] for causative in causatives] == ['other_variant']
+
+    ## WHEN a variant is marked causative in the first case
+    third_variant = dict(variant_obj, _id='third_variant', simple_id='1_1_A_C',
+                         variant_id='third')
+    adapter.variant_collection.insert_one(third_variant)
+    adapter.mark_causative(institute=institute_obj, case=case_obj, user=user_obj,
+                           link='link', variant=third_variant)
+
+    ## THEN the causatives of both cases should be indexed
+    assert set(item['_id'] for item in adapter.causative_collection.find()) == set(
+        ['other_variant', 'third_variant'])
+    causatives = list(adapter.other_causatives(case_obj, variant_obj))
+    assert [causative['_id'] for causative in causatives] == ['other_variant']
+
+
 def test_order_verification(adapter, institute_obj, case_obj, user_obj, variant_obj):
     logger.info("Testing ordering verification for a variant")
     # GIVEN a populated database with variants
@@ -1,8 +1,13 @@
 import os
+import time
 import logging
 
+import mongomock
 import pytest
 
+from scout.adapter.mongo.variant import page_key, seek_query, variant_projection
+from scout.adapter.mongo.variant_loader import ranked_variants
+
 TRAVIS = os.getenv('TRAVIS')
 
 log = logging.getLogger(__name__)
@@ -180,3 +185,244 @@ def test_get_region_vcf(populated_database, case_obj):
     os.remove(file_name)
 
     assert nr_variants > 0
+
+
+@pytest.mark.parametrize('sort_key', ['variant_rank', 'rank_score'])
+def test_variants_keyset_pagination(adapter, case_obj, sort_key):
+    ## GIVEN a database with variants where some have the same rank score
+    variant_objs = [
+        {
+            '_id': 'variant{0}'.format(index),
+            'case_id': case_obj['_id'],
+            'category': 'snv',
+            'variant_type': 'clinical',
+            'variant_rank': index + 1,
+            'rank_score': 20 - index // 3,
+        }
+        for index in range(20)
+    ]
+    adapter.variant_collection.insert_many(variant_objs)
+    all_ids = [var['_id'] for var in adapter.variants(case_obj['_id'],
+                                                       nr_of_variants=-1,
+                                                       sort_key=sort_key)]
+
+    ## WHEN paging through the variants with the key of the previous page
+    paged_ids = []
+    after = None
+    while True:
+        page = list(adapter.variants(case_obj['_id'], nr_of_variants=7,
+                                     sort_key=sort_key, after=after))
+        if not page:
+            break
+        paged_ids.extend(var['_id'] for var in page)
+        after = page_key(page[-1], sort_key)
+
+    ## THEN all variants should be returned once, in the same order
+    assert len(all_ids) == 20
+    assert paged_ids == all_ids
+
+
+def test_variants_keyset_pagination_duplicate_ranks(adapter, case_obj):
+    ## GIVEN variants with duplicated ranks
+    ranks = [1, 1, 1, 2, 2, 3, 4]
+    adapter.variant_collection.insert_many([
+        {'_id': str(index), 'case_id': case_obj['_id'], 'category': 'snv',
+         'variant_type': 'clinical', 'variant_rank': rank}
+        for index, rank in enumerate(ranks)
+    ])
+
+    ## WHEN paging through the variants two at a time
+    paged_ids = []
+    after = None
+    while True:
+        page = list(adapter.variants(case_obj['_id'], nr_of_variants=2, after=after))
+        if not page:
+            break
+        paged_ids.extend(var['_id'] for var in page)
+        after = page_key(page[-1])
+
+    ## THEN all variants should be returned once in rank order
+    assert paged_ids == [str(index) for index in range(len(ranks))]
+
+
+def test_seek_query_missing_value():
+    ## GIVEN the key of a variant without a rank
+    after = (None, 'a')
+
+    ## WHEN building the query for the next page
+    query = seek_query('variant_rank', after)
+
+    ## THEN the ranked variants and the unranked variants after it should be fetched
+    assert query == {'$or': [
+        {'variant_rank': {'$ne': None}},
+        {'variant_rank': None, '_id': {'$gt': 'a'}},
+    ]}
+
+    ## WHEN sorting descending on a field
+    query = seek_query('rank_score', after)
+
+    ## THEN only the variants without a value after it should be fetched
+    assert query == {'rank_score': None, '_id': {'$gt': 'a'}}
+
+
+def test_update_variant_rank_incremental(adapter, case_obj, monkeypatch):
+    # mongomock does not support unordered bulk writes
+    monkeypatch.setattr(adapter, '_update_variant_ranks',
+                        lambda requests, collection: collection.bulk_write(requests))
+    ## GIVEN a case with ranked variants where two have the same rank score
+    adapter.variant_collection.insert_many([
+        {'_id': _id, 'case_id': case_obj['_id'], 'category': 'snv',
+         'variant_type': 'clinical', 'rank_score': rank_score}
+        for _id, rank_score in [('a', 10), ('b', 8), ('c', 8), ('d', 2)]
+    ])
+    assert adapter.update_variant_rank(case_obj) == 4
+
+    ## WHEN a variant is added and the ranks are updated again
+    adapter.variant_collection.insert_one({'_id': 'e', 'case_id': case_obj['_id'],
+                                           'category': 'snv', 'variant_type': 'clinical',
+                                           'rank_score': 5})
+    nr_updated = adapter.update_variant_rank(case_obj)
+
+    ## THEN only the new variant and the variants ranked below it should be updated
+    assert nr_updated == 2
+    ranks = {var['_id']: var['variant_rank'] for var in adapter.variant_collection.find()}
+    assert ranks == {'a': 1, 'b': 2, 'c': 3, 'e': 4, 'd': 5}
+
+
+def test_ranked_variants_keeps_order_of_ties():
+    ## GIVEN variants sorted on rank score where tied variants have a previous rank
+    variants = [
+        {'_id': 'x', 'rank_score': 10, 'variant_rank': 1},
+        {'_id': 'new', 'rank_score': 8},
+        {'_id': 'z', 'rank_score': 8, 'variant_rank': 3},
+        {'_id': 'y', 'rank_score': 8, 'variant_rank': 2},
+    ]
+    ## WHEN ordering them by final rank
+    ranked = [var['_id'] for var in ranked_variants(variants)]
+    ## THEN ties should keep their previous order with new variants last
+    assert ranked == ['x', 'y', 'z', 'new']
+
+
+def test_variants_projection_profiles(adapter, case_obj):
+    ## GIVEN a variant with genes, transcripts and samples
+    adapter.variant_collection.insert_one({
+        '_id': 'variant', 'variant_id': 'simple', 'case_id': case_obj['_id'],
+        'category': 'snv', 'variant_type': 'clinical', 'variant_rank': 1,
+        'rank_score': 10, 'sanger_ordered': True,
+        'genes': [{'hgnc_id': 1, 'hgnc_symbol': 'A', 'transcripts': [{'is_canonical': True}]}],
+        'samples': [{'sample_id': 'sample', 'allele_depths': [10, 5]}],
+    })
+
+    ## WHEN fetching the variant with the list and sanger profiles
+    list_variant = next(adapter.variants(case_obj['_id'], projection='list'))
+    sanger_variant = adapter.variant('simple', case_id=case_obj['_id'], projection='sanger')
+
+    ## THEN only the fields of the profiles should be returned
+    assert list_variant['rank_score'] == 10
+    assert list_variant['genes'] == [{'hgnc_id': 1, 'hgnc_symbol': 'A'}]
+    assert 'samples' not in list_variant
+    assert set(sanger_variant) == {'_id', 'case_id', 'sanger_ordered'}
+
+
+def test_variant_projection_unknown_profile():
+    ## GIVEN fields and a profile that does not exist
+    fields = {'rank_score': 1}
+    ## WHEN resolving the projections
+    ## THEN fields should be kept and the unknown profile should raise an error
+    assert variant_projection(fields) is fields
+    assert variant_projection(None) is None
+    with pytest.raises(ValueError):
+        variant_projection('unknown')
+
+
+def test_load_variant_files_parallel(adapter, case_obj, monkeypatch):
+    ## GIVEN jobs for two variant files where the first one is slow
+    loaded = []
+
+    def load_variants(case_obj, variant_type, category, rank_threshold, build, generation):
+        if category == 'snv':
+            time.sleep(0.2)
+        loaded.append(category)
+        return len(loaded)
+
+    monkeypatch.setattr(adapter, 'load_variants', load_variants)
+    jobs = [
+        {'case_obj': case_obj, 'variant_type': 'clinical', 'category': 'snv'},
+        {'case_obj': case_obj, 'variant_type': 'clinical', 'category': 'sv'},
+    ]
+
+    ## WHEN loading the files with two workers
+    results = adapter.load_variant_files(jobs, workers=2)
+
+    ## THEN the files should be loaded at the same time and the results kept in job order
+    assert loaded == ['sv', 'snv']
+    assert results == [2, 1]
+
+
+@pytest.fixture
+def staging_adapter(adapter, case_obj, monkeypatch):
+    """An adapter with a case where mongomock runs the bulk writes of a shadow load"""
+    bulk_write = mongomock.collection.Collection.bulk_write
+    # mongomock does not support unordered bulk writes or create_indexes
+    monkeypatch.setattr(mongomock.collection.Collection, 'bulk_write',
+                        lambda self, requests, ordered=True: bulk_write(self, requests))
+    monkeypatch.setattr(mongomock.collection.Collection, 'create_indexes',
+                        lambda self, indexes: [], raising=False)
+    adapter.case_collection.insert_one(case_obj)
+    adapter.variant_collection.insert_one(
+        {'_id': 'old', 'case_id': case_obj['_id'], 'variant_type': 'clinical',
+         'category': 'snv', 'variant_rank': 1})
+    return adapter
+
+
+def test_load_variant_files_shadow(staging_adapter, case_obj, monkeypatch):
+    adapter = staging_adapter
+    ## GIVEN a case with variants from a previous load
+    live_during_load = []
+
+    def load_variants(case_obj, variant_type, category, rank_threshold, build, generation):
+        live_during_load.append([variant['_id'] for variant in adapter.variant_collection.find()])
+        adapter._load_collection(generation).insert_one(
+            {'_id': 'new', 'case_id': case_obj['_id'], 'variant_type': variant_type,
+             'category': category, 'load_generation': generation, 'variant_rank': 1})
+        return 1
+
+    monkeypatch.setattr(adapter, 'load_variants', load_variants)
+    jobs = [{'case_obj': case_obj, 'variant_type': 'clinical', 'category': 'snv',
+             'delete': True}]
+
+    ## WHEN replacing the variants with a shadow load
+    adapter.load_variant_files(jobs, shadow=True)
+
+    ## THEN only the old variants should be seen during the load and only the new ones after
+    assert live_during_load == [['old']]
+    variants = list(adapter.variant_collection.find())
+    assert [variant['_id'] for variant in variants] == ['new']
+    assert variants[0]['variant_rank'] == 1
+    assert adapter._load_collection('any').count_documents({}) == 0
+    assert adapter.case(case_obj['_id'])['variant_counts'] == {'clinical': {'snv': 1}}
+
+
+def test_load_variant_files_shadow_failure(staging_adapter, case_obj, monkeypatch):
+    adapter = staging_adapter
+    ## GIVEN a shadow load where the second file fails after the first one is staged
+
+    def load_variants(case_obj, variant_type, category, rank_threshold, build, generation):
+        if category == 'sv':
+            raise ValueError("Broken file")
+        adapter._load_collection(generation).insert_one(
+            {'_id': 'new', 'case_id': case_obj['_id'], 'variant_type': variant_type,
+             'category': category, 'load_generation': generation})
+        return 1
+
+    monkeypatch.setattr(adapter, 'load_variants', load_variants)
+    jobs = [{'case_obj': case_obj, 'variant_type': 'clinical', 'category': category}
+            for category in ['snv', 'sv']]
+
+    ## WHEN loading the files
+    with pytest.raises(ValueError):
+        adapter.load_variant_files(jobs, shadow=True)
+
+    ## THEN the case should keep its variants and nothing should be left in staging
+    assert [variant['_id'] for variant in adapter.variant_collection.find()] == ['old']
+    assert adapter._load_collection('any').count_documents({}) == 0
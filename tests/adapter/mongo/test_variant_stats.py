@@ -0,0 +1,71 @@
+from scout.adapter.mongo.variant_stats import nr_variants
+
+
+def test_count_case_variants(adapter):
+    ## GIVEN variants of different types and categories for a case
+    variants = [
+        {'_id': '1', 'case_id': 'case', 'variant_type': 'clinical', 'category': 'snv'},
+        {'_id': '2', 'case_id': 'case', 'variant_type': 'clinical', 'category': 'snv'},
+        {'_id': '3', 'case_id': 'case', 'variant_type': 'clinical', 'category': 'sv'},
+        {'_id': '4', 'case_id': 'case', 'variant_type': 'research', 'category': 'snv'},
+        {'_id': '5', 'case_id': 'other', 'variant_type': 'clinical', 'category': 'snv'},
+    ]
+    adapter.variant_collection.insert_many(variants)
+
+    ## WHEN counting the variants of the case and of a case without variants
+    counts = adapter.count_case_variants(['case', 'empty'])
+
+    ## THEN the variants should be counted by variant type and category
+    assert counts == {
+        'case': {'clinical': {'snv': 2, 'sv': 1}, 'research': {'snv': 1}},
+        'empty': {},
+    }
+    assert nr_variants(counts['case']) == 4
+    assert nr_variants(counts['case'], 'clinical') == 3
+    assert nr_variants(counts['case'], 'clinical', 'snv') == 2
+
+
+def test_variant_counts_stored_on_case(adapter, case_obj):
+    ## GIVEN a case with a variant
+    adapter.case_collection.insert_one(case_obj)
+    adapter.variant_collection.insert_one(
+        {'_id': '1', 'case_id': case_obj['_id'], 'variant_type': 'clinical', 'category': 'snv'})
+
+    ## WHEN storing the counts of the case
+    adapter.update_variant_counts(case_obj['_id'])
+    case_obj = adapter.case(case_obj['_id'])
+
+    ## THEN the stored counts should be used instead of counting again
+    adapter.variant_collection.delete_many({})
+    assert adapter.case_variant_counts([case_obj]) == {
+        case_obj['_id']: {'clinical': {'snv': 1}}}
+    assert adapter.case_variant_counts([case_obj], use_stored=False) == {case_obj['_id']: {}}
+
+
+def test_delete_variants_updates_counts(adapter, case_obj):
+    ## GIVEN a case with stored variant counts
+    adapter.case_collection.insert_one(case_obj)
+    adapter.variant_collection.insert_one(
+        {'_id': '1', 'case_id': case_obj['_id'], 'variant_type': 'clinical', 'category': 'snv'})
+    adapter.update_variant_counts(case_obj['_id'])
+
+    ## WHEN deleting the variants of the case
+    adapter.delete_variants(case_obj['_id'], 'clinical')
+
+    ## THEN the stored counts should be updated
+    assert adapter.case(case_obj['_id'])['variant_counts'] == {}
+
+
+def test_variant_counts_stored_when_counted(adapter, case_obj):
+    ## GIVEN a case without stored counts
+    adapter.case_collection.insert_one(case_obj)
+    adapter.variant_collection.insert_one(
+        {'_id': '1', 'case_id': case_obj['_id'], 'variant_type': 'clinical', 'category': 'snv'})
+    assert 'variant_counts' not in adapter.case(case_obj['_id'])
+
+    ## WHEN fetching the counts of the case
+    counts = adapter.case_variant_counts([case_obj])
+
+    ## THEN the counts should be stored on the case
+    assert counts == {case_obj['_id']: {'clinical': {'snv': 1}}}
+    assert adapter.case(case_obj['_id'])['variant_counts'] == {'clinical': {'snv': 1}}
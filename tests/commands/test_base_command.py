@@ -8,3 +8,15 @@ def test_version():
     runner = CliRunner()
     result = runner.invoke(cli, ['--version'])
     assert result.exit_code == 0
+
+
+def test_lazy_commands():
+    ## GIVEN the cli where commands are imported when they are used
+    ## WHEN listing the commands
+    commands = cli.list_commands(None)
+    ## THEN all commands should be listed
+    for command in ['load', 'serve', 'update', 'view', 'index']:
+        assert command in commands
+    ## THEN commands should be resolved by name
+    assert cli.get_command(None, 'view').name == 'view'
+    assert cli.get_command(None, 'non-existing') is None
@@ -0,0 +1,48 @@
+from scout.load.exon import load_exons
+from scout.load.transcript import load_transcripts
+
+EXON_HEADER = '\t'.join(['Chromosome/scaffold name', 'Gene stable ID', 'Transcript stable ID',
+                         'Exon region start (bp)', 'Exon region end (bp)',
+                         'Exon rank in transcript', 'Strand'])
+
+
+def load_genes(adapter, gene_bulk, transcripts_handle):
+    """Load genes and transcripts and return ensembl exon lines with one exon per transcript"""
+    adapter.load_hgnc_bulk(gene_bulk)
+    load_transcripts(adapter, transcripts_lines=transcripts_handle, build='37')
+    ensembl_ids = {gene_obj['hgnc_id']: gene_obj['ensembl_id'] for gene_obj in gene_bulk}
+    lines = [EXON_HEADER]
+    for tx_obj in adapter.transcripts(build='37'):
+        lines.append('\t'.join([
+            tx_obj['chrom'], ensembl_ids[tx_obj['hgnc_id']], tx_obj['ensembl_transcript_id'],
+            str(tx_obj['start']), str(tx_obj['start'] + 10), '1', '1'
+        ]))
+    return lines
+
+
+def test_load_exons_chunks(adapter, gene_bulk, transcripts_handle):
+    # GIVEN a database with genes and transcripts
+    exon_lines = load_genes(adapter, gene_bulk, transcripts_handle)
+
+    # WHEN loading the exons in small chunks
+    nr_loaded = load_exons(adapter, exon_lines, build='37', chunk_size=2)
+
+    # THEN the exons of the identifier transcripts should be loaded
+    assert nr_loaded > 0
+    assert adapter.exons(build='37').count() == nr_loaded
+
+
+def test_load_exons_staging(real_adapter, gene_bulk, transcripts_handle):
+    adapter = real_adapter
+    # GIVEN a database with genes, transcripts and an exon from the other build
+    exon_lines = load_genes(adapter, gene_bulk, transcripts_handle)
+    adapter.exon_collection.insert_one({'exon_id': '1-1-2', 'build': '38'})
+
+    # WHEN loading the exons through the staging collection
+    nr_loaded = load_exons(adapter, exon_lines, build='37', staging=True)
+
+    # THEN the exon collection should be replaced with the new exons and the other build
+    assert adapter.exons(build='37').count() == nr_loaded
+    assert adapter.exons(build='38').count() == 1
+    assert 'exon_staging' not in adapter.db.collection_names()
+    assert 'build_hgncid' in adapter.exon_collection.index_information()
@@ -1,9 +1,13 @@
 from scout.load.hpo import (load_hpo, load_disease_terms, load_hpo_terms)
 from scout.utils.handle import get_file_handle
 
-def test_load_disease_terms(gene_database, genemap_file, hpo_disease_handle):
+def test_load_disease_terms(gene_database, genemap_file, hpo_disease_handle, monkeypatch):
     adapter = gene_database
     alias_genes = adapter.genes_by_alias()
+    updated_versions = []
+    update_reference_version = adapter.update_reference_version
+    monkeypatch.setattr(adapter, 'update_reference_version', lambda namespace: (
+        updated_versions.append(namespace) or update_reference_version(namespace)))
     
     # GIVEN a populated database with genes and no disease terms
     assert len([term for term in adapter.disease_terms()]) == 0
@@ -22,7 +26,9 @@ def test_load_disease_terms(gene_database, genemap_file, hpo_disease_handle):
     disease_objs = adapter.disease_terms()
     
     assert len([disease for disease in disease_objs]) > 0
-    
+    # THEN the cached disease terms should be invalidated once
+    assert updated_versions == ['diseases']
+
 
 def test_load_hpo_terms(gene_database, hpo_terms_handle, hpo_to_genes_handle):
     adapter = gene_database
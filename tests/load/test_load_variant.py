@@ -6,6 +6,10 @@ from scout.server.blueprints.variants.controllers import variants
 
 from cyvcf2 import VCF
 
+from scout.parse.variant.headers import (parse_rank_results_header, parse_vep_header)
+from scout.adapter.mongo.variant_loader import region_windows
+from scout.utils.coding_intervals import CodingIntervals
+
 def test_load_variant(real_populated_database, variant_obj):
     """Test to load a variant into a real mongo database"""
     adapter = real_populated_database
@@ -320,3 +324,109 @@ def test_updated_panel(real_variant_database, case_obj):
                     assert panel_name not in variant.get('panels',[])
                     nr_variants += 1
     assert nr_variants > 0
+
+def test_load_variants_parallel(populated_database, case_obj, variant_clinical_file):
+    """Test to parse variants with several processes"""
+    adapter = populated_database
+    vcf_obj = VCF(variant_clinical_file)
+    individual_positions = {ind: i for i, ind in enumerate(vcf_obj.samples)}
+    load_info = dict(
+        variant_type='clinical',
+        case_obj=case_obj,
+        individual_positions=individual_positions,
+        rank_threshold=-10,
+        institute_id=case_obj['owner'],
+        rank_results_header=parse_rank_results_header(vcf_obj),
+        vep_header=parse_vep_header(vcf_obj),
+        category='snv',
+    )
+    # GIVEN a database with the variants of a case loaded in one process
+    nr_serial = adapter._load_variants(variants=vcf_obj, **load_info)
+    serial_variants = {var['_id']: var for var in adapter.variant_collection.find()}
+    assert nr_serial > 0
+    adapter.variant_collection.delete_many({})
+
+    # WHEN loading the same variants with one process per chromosome
+    nr_parallel = adapter._load_variants_parallel(
+        variant_file=variant_clinical_file,
+        regions=list(vcf_obj.seqnames),
+        processes=2,
+        **load_info
+    )
+
+    # THEN the same variants should be loaded
+    assert nr_parallel == nr_serial
+    parallel_variants = {var['_id']: var for var in adapter.variant_collection.find()}
+    assert set(parallel_variants) == set(serial_variants)
+    # THEN the compounds should be the same
+    for var_id, variant in parallel_variants.items():
+        assert variant.get('compounds') == serial_variants[var_id].get('compounds')
+
+
+def test_load_variants_parallel_windows(populated_database, case_obj, variant_clinical_file):
+    """Test to parse variants in windows smaller than the chromosomes"""
+    adapter = populated_database
+    vcf_obj = VCF(variant_clinical_file)
+    load_info = dict(
+        variant_type='clinical',
+        case_obj=case_obj,
+        individual_positions={ind: i for i, ind in enumerate(vcf_obj.samples)},
+        rank_threshold=-10,
+        institute_id=case_obj['owner'],
+        rank_results_header=parse_rank_results_header(vcf_obj),
+        vep_header=parse_vep_header(vcf_obj),
+        category='snv',
+    )
+    # GIVEN a database with the variants of a case loaded in one process
+    nr_serial = adapter._load_variants(variants=vcf_obj, **load_info)
+    serial_variants = {var['_id']: var for var in adapter.variant_collection.find()}
+    adapter.variant_collection.delete_many({})
+
+    # WHEN loading the same variants in windows of a million bases
+    coding_intervals = adapter.get_coding_intervals(build='37')
+    windows = region_windows('1', coding_intervals, window_size=1000000)
+    assert len(windows) > 1
+    nr_parallel = adapter._load_variants_parallel(
+        variant_file=variant_clinical_file,
+        regions=list(vcf_obj.seqnames),
+        processes=2,
+        window_size=1000000,
+        **load_info
+    )
+
+    # THEN the same variants and compounds should be loaded once
+    assert nr_parallel == nr_serial
+    parallel_variants = {var['_id']: var for var in adapter.variant_collection.find()}
+    assert set(parallel_variants) == set(serial_variants)
+    for var_id, variant in parallel_variants.items():
+        assert variant.get('compounds') == serial_variants[var_id].get('compounds')
+
+
+def test_region_windows():
+    # GIVEN coding regions on a chromosome
+    coding_intervals = CodingIntervals({'1': ([100, 250, 1000], [200, 300, 1100])})
+
+    # WHEN splitting the chromosome in windows of 200 bases
+    windows = region_windows('chr1', coding_intervals, window_size=200)
+
+    # THEN the windows should start at coding regions and the last one should be open
+    assert windows == [('chr1', 1, 249), ('chr1', 250, 999), ('chr1', 1000, None)]
+
+
+def test_load_variants_failure_keeps_other_categories(populated_database, case_obj,
+                                                      monkeypatch):
+    adapter = populated_database
+    # GIVEN a case with loaded SVs
+    adapter.variant_collection.insert_one({'_id': 'sv_variant', 'case_id': case_obj['_id'],
+                                           'variant_type': 'clinical', 'category': 'sv'})
+
+    def broken_load(**kwargs):
+        raise ValueError("Broken file")
+    monkeypatch.setattr(adapter, '_load_variants', broken_load)
+
+    # WHEN loading the SNVs fails
+    with pytest.raises(ValueError):
+        adapter.load_variants(case_obj, variant_type='clinical', category='snv')
+
+    # THEN the SVs of the case should be kept
+    assert [var['_id'] for var in adapter.variant_collection.find()] == ['sv_variant']
@@ -1,5 +1,6 @@
 from scout.parse.variant.coordinates import (get_cytoband_coordinates, get_sub_category, 
-                                             get_length, get_end, parse_coordinates)
+                                             get_length, get_end, parse_coordinates,
+                                             get_cytoband_coordinates_batch)
 
 
 class CyvcfVariant(object):
@@ -272,3 +273,11 @@ def test_get_end_deletion():
     assert end == svend
 
 
+def test_get_cytoband_coordinates_batch():
+    ## GIVEN positions on chromosome 1
+    positions = [2, 2300000, 249250620]
+    ## WHEN getting the cytobands of all positions
+    cytobands = get_cytoband_coordinates_batch('1', positions)
+    ## THEN they should be the same as when looked up one at a time
+    assert list(cytobands) == [get_cytoband_coordinates('1', pos) for pos in positions]
+    assert cytobands[0] == 'p36.33'
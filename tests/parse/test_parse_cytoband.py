@@ -0,0 +1,64 @@
+from scout.parse.cytoband import Cytobands, CytobandIndex, parse_cytoband
+from scout.resources import cytobands_path
+
+
+def test_parse_cytoband():
+    ## GIVEN cytoband lines
+    lines = [
+        "chr1\t0\t2300000\tp36.33\tgneg",
+        "chr1\t2300000\t5400000\tp36.32\tgpos25",
+    ]
+    ## WHEN parsing the lines
+    cytobands = parse_cytoband(lines)
+    ## THEN the bands should be found by position
+    assert [interval.data for interval in cytobands['1'][2300000]] == ['p36.32']
+
+
+def test_cytobands_parsed_on_first_access():
+    ## GIVEN cytobands from the resource file
+    cytobands = Cytobands(cytobands_path)
+    ## THEN the file is not parsed when created
+    assert cytobands._cytobands is None
+    ## WHEN looking up a band
+    ## THEN the file is parsed
+    assert [interval.data for interval in cytobands['1'][2]] == ['p36.33']
+    assert '1' in cytobands
+    assert 'chr1' not in cytobands
+    assert len(cytobands) == 24
+
+
+def test_cytoband_index_matches_interval_trees():
+    ## GIVEN the cytobands and an index built from them
+    cytobands = Cytobands(cytobands_path)
+    index = cytobands.index
+
+    for chrom, tree in cytobands.items():
+        ## WHEN looking up the first, last and middle position of every band
+        positions = [0, tree.end() + 10]
+        for interval in tree:
+            positions.extend([interval.begin, interval.end - 1, (interval.begin + interval.end) // 2])
+        expected = []
+        for position in positions:
+            names = [interval.data for interval in tree[position]]
+            expected.append(names[0] if names else '')
+
+        ## THEN the index should give the same bands as the interval trees
+        assert [index.cytoband(chrom, position) for position in positions] == expected
+        assert list(index.cytoband_batch(chrom, positions)) == expected
+
+
+def test_cytoband_index_gaps():
+    ## GIVEN a index with a gap between two bands
+    index = CytobandIndex(parse_cytoband([
+        "chr1\t100\t200\tp1\tgneg",
+        "chr1\t300\t400\tq1\tgneg",
+    ]))
+    positions = [50, 100, 199, 200, 250, 300, 399, 400]
+    expected = ['', 'p1', 'p1', '', '', 'q1', 'q1', '']
+
+    ## THEN positions outside the bands have no band
+    assert [index.cytoband('1', position) for position in positions] == expected
+    assert list(index.cytoband_batch('1', positions)) == expected
+    ## THEN chromosomes without bands give no bands
+    assert index.cytoband('2', 150) == ''
+    assert list(index.cytoband_batch('2', [150])) == ['']
@@ -1,4 +1,6 @@
-from scout.parse.variant.rank_score import parse_rank_score
+import math
+
+from scout.parse.variant.rank_score import (parse_rank_score, parse_rank_scores)
 
 def test_parse_rank_score():
     rank_scores_info = "123:10"
@@ -26,4 +28,21 @@ def test_parse_rank_score_no_score():
 #
 #         rank_score = rank_scores_dict[case_id]
 #
-#         assert float(rank_score) == parse_rank_score(variant, case_id)
\ No newline at end of file
+#         assert float(rank_score) == parse_rank_score(variant, case_id)
+def test_parse_rank_scores():
+    family_id = '123'
+    ## GIVEN rank score entries for one family and for several families
+    for rank_score_entries in (["123:10", None, "123:-2.5", "", "123:0"],
+                               ["123:10", "1234:3,123:-2.5", None, "1:4,12:5", ""],
+                               ["123:1", None, "123:5"]):
+        ## WHEN parsing all entries at once
+        rank_scores = parse_rank_scores(rank_score_entries, family_id)
+
+        ## THEN the scores should be the same as when parsed one by one
+        assert len(rank_scores) == len(rank_score_entries)
+        for entry, rank_score in zip(rank_score_entries, rank_scores):
+            expected = parse_rank_score(entry, family_id)
+            if expected is None:
+                assert math.isnan(rank_score)
+            else:
+                assert rank_score == expected
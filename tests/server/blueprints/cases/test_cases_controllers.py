@@ -0,0 +1,35 @@
+from scout.server.blueprints.cases.controllers import gene_variants
+from scout.models.hgnc_map import HgncGene
+
+
+def test_gene_variants(adapter, case_obj, variant_obj, parsed_gene):
+    ## GIVEN a gene and a case with three variants in the gene, one of them from another institute
+    adapter.load_hgnc_gene(HgncGene(**parsed_gene))
+    adapter._add_case(case_obj)
+    hgnc_id = parsed_gene['hgnc_id']
+    for nr, institute_id in enumerate([case_obj['owner'], case_obj['owner'], 'other']):
+        adapter.variant_collection.insert_one(dict(
+            variant_obj,
+            _id='variant{}'.format(nr),
+            institute=institute_id,
+            rank_score=20 - nr,
+            hgnc_symbols=[parsed_gene['hgnc_symbol']],
+            genes=[{'hgnc_id': hgnc_id, 'transcripts': []}],
+        ))
+
+    ## WHEN searching the gene in the institute of the case, one variant per page
+    query = {'hgnc_symbols': [parsed_gene['hgnc_symbol']]}
+    variants_query = adapter.gene_variants(query=query, institute_ids=[case_obj['owner']])
+    first_page = gene_variants(adapter, variants_query, page=1, per_page=1)
+    variants_query = adapter.gene_variants(query=query, institute_ids=[case_obj['owner']])
+    second_page = gene_variants(adapter, variants_query, page=2, per_page=1)
+
+    ## THEN only the variants of the institute should be returned, with case and gene info
+    assert [var['_id'] for var in first_page['variants']] == ['variant0']
+    assert first_page['more_variants'] is True
+    assert [var['_id'] for var in second_page['variants']] == ['variant1']
+    assert second_page['more_variants'] is False
+
+    variant = first_page['variants'][0]
+    assert variant['case_display_name'] == case_obj['display_name']
+    assert variant['genes'][0]['hgnc_symbol'] == parsed_gene['hgnc_symbol']
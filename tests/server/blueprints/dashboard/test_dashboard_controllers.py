@@ -106,3 +106,114 @@ def test_with_phenotype_group_query(real_adapter, case_obj):
             assert group['count'] == 1
         elif group['status'] == case_obj['status']:
             assert group['count'] == 1
+
+
+def test_validation_orders(adapter, case_obj, institute_obj, user_obj):
+    ## GIVEN a case with two variants, where one is validated as a true positive
+    adapter._add_case(case_obj)
+    variants = []
+    for nr, validation in enumerate([None, 'True positive']):
+        variant_obj = {
+            '_id': 'variant{}'.format(nr),
+            'variant_id': 'variant_id{}'.format(nr),
+            'case_id': case_obj['_id'],
+            'category': 'snv',
+            'validation': validation,
+        }
+        adapter.variant_collection.insert_one(variant_obj)
+        variants.append(variant_obj)
+
+    ## WHEN validation is ordered twice for the first variant and once for the second
+    for variant_obj in [variants[0], variants[0], variants[1]]:
+        adapter.create_event(institute=institute_obj, case=case_obj, user=user_obj,
+                             link='link', category='variant', verb='validate',
+                             subject='subject', variant=variant_obj)
+    ## AND validation is ordered for a variant that has been removed
+    adapter.create_event(institute=institute_obj, case=case_obj, user=user_obj,
+                         link='link', category='variant', verb='validate',
+                         subject='subject', variant={'variant_id': 'removed'})
+
+    data = get_dashboard_info(adapter, institute_id=case_obj['owner'])
+
+    ## THEN all orders of existing variants should be counted
+    counts = {info['title']: info['count'] for info in data['variants']}
+    assert counts['Validation ordered'] == 3
+    assert counts['Validated True Positive'] == 1
+    assert counts['Validated False Positive'] == 0
+    overview = {info['title']: info['count'] for info in data['overview']}
+    assert overview['Validation ordered'] == 1
+    assert overview['Validated cases (TP + FP)'] == 1
+
+
+def test_stored_statistics_expire_on_event(adapter, case_obj, institute_obj, user_obj):
+    ## GIVEN a database with one case and stored statistics
+    adapter._add_case(case_obj)
+    institute_id = case_obj['owner']
+    data = get_dashboard_info(adapter, institute_id=institute_id, stats_max_age=3600)
+    assert adapter.dashboard_stats(institute_id)['total_cases'] == 1
+
+    ## WHEN an event is created for the institute
+    adapter.create_event(institute=institute_obj, case=case_obj, user=user_obj,
+                         link='link', category='case', verb='status',
+                         subject='subject')
+
+    ## THEN the statistics should be computed again
+    assert adapter.dashboard_stats(institute_id) is None
+    data = get_dashboard_info(adapter, institute_id=institute_id, stats_max_age=3600)
+    assert data['total_cases'] == 1
+
+
+def test_stored_statistics_expire_on_case_changes(adapter, case_obj):
+    ## GIVEN a database with one case and stored statistics
+    adapter._add_case(case_obj)
+    institute_id = case_obj['owner']
+
+    def stored_total_cases():
+        get_dashboard_info(adapter, institute_id=institute_id, stats_max_age=3600)
+        return adapter.dashboard_stats(institute_id)['total_cases']
+
+    assert stored_total_cases() == 1
+
+    ## WHEN a case is added
+    other_case = dict(case_obj, _id='test1')
+    adapter._add_case(other_case)
+    ## THEN the statistics should be computed again
+    assert adapter.dashboard_stats(institute_id) is None
+    assert stored_total_cases() == 2
+
+    ## WHEN the variants of a case are counted after a load
+    adapter.update_variant_counts(other_case['_id'])
+    ## THEN the statistics should be expired
+    assert adapter.dashboard_stats(institute_id) is None
+    assert stored_total_cases() == 2
+
+    ## WHEN a case is updated
+    adapter.update_case(other_case)
+    ## THEN the statistics should be expired
+    assert adapter.dashboard_stats(institute_id) is None
+    assert stored_total_cases() == 2
+
+    ## WHEN a case is deleted
+    adapter.delete_case(case_id=other_case['_id'])
+    ## THEN the statistics should be computed again
+    assert adapter.dashboard_stats(institute_id) is None
+    assert stored_total_cases() == 1
+
+def test_loaded_variants(adapter, case_obj):
+    ## GIVEN a case with stored variant counts and a case without
+    case_obj['variant_counts'] = {'clinical': {'snv': 2, 'sv': 1}}
+    adapter._add_case(case_obj)
+    other_case = dict(case_obj, _id='other', display_name='other')
+    other_case.pop('variant_counts')
+    adapter._add_case(other_case)
+    adapter.variant_collection.insert_one(
+        {'_id': 'research', 'case_id': 'other', 'variant_type': 'research', 'category': 'snv'})
+
+    ## WHEN asking for data
+    data = get_dashboard_info(adapter)
+
+    ## THEN the variants of both cases should be counted
+    assert data['loaded_variants'] == [
+        {'title': 'Clinical variants', 'count': 3},
+        {'title': 'Research variants', 'count': 1},
+    ]
@@ -1,4 +1,5 @@
-from scout.server.blueprints.variants.controllers import variant_verification, variants_export_header, variant_export_lines
+from scout.server.blueprints.variants.controllers import variant_verification, variants_export_header, variant_export_lines, parse_variant
+from scout.models.hgnc_map import HgncGene
 
 def url_for(param, institute_id, case_name, variant_id):
     pass
@@ -59,7 +60,7 @@ def test_variant_csv_export(real_variant_database, case_obj):
     assert len(export_header) == 8 + 3 * len(case_obj['individuals'])
 
     # Given the lines of the document to be exported
-    export_lines = variant_export_lines(adapter, case_obj, variants_to_export)
+    export_lines = list(variant_export_lines(adapter, case_obj, variants_to_export))
 
     # Assert that all five variants are going to be exported to CSV
     assert len(export_lines) == 5
@@ -68,3 +69,45 @@ def test_variant_csv_export(real_variant_database, case_obj):
     for export_line in export_lines:
         export_cols = export_line.split(',')
         assert len(export_cols) == len(export_header)
+
+
+def test_variant_export_lines_batches(adapter, case_obj, variant_obj, parsed_gene):
+    ## GIVEN a gene in the database and a variant in the gene and one outside genes
+    adapter.load_hgnc_gene(HgncGene(**parsed_gene))
+    hgnc_id = parsed_gene['hgnc_id']
+    in_gene = dict(variant_obj, genes=[{'hgnc_id': hgnc_id, 'transcripts': []}])
+    no_genes = dict(variant_obj, genes=[])
+
+    ## WHEN exporting the variants one at a time
+    export_lines = list(variant_export_lines(adapter, case_obj, iter([in_gene, no_genes]),
+                                             batch_size=1))
+
+    ## THEN the gene symbol should be resolved and the gene fields filled for both variants
+    assert len(export_lines) == 2
+    gene_cols = export_lines[0].split(',')
+    assert gene_cols[5:8] == [str(hgnc_id), parsed_gene['hgnc_symbol'], '-']
+    no_gene_cols = export_lines[1].split(',')
+    assert no_gene_cols[5:8] == ['-', '-', '-']
+    assert len(gene_cols) == len(no_gene_cols)
+
+
+def test_parse_variant_updates_projected_variant(adapter, institute_obj, case_obj, parsed_gene):
+    ## GIVEN a variant with samples and a gene without hgnc symbol
+    adapter.load_hgnc_gene(HgncGene(**parsed_gene))
+    hgnc_id = parsed_gene['hgnc_id']
+    adapter.variant_collection.insert_one({
+        '_id': 'variant', 'variant_id': 'simple', 'case_id': case_obj['_id'],
+        'category': 'snv', 'variant_type': 'clinical', 'chromosome': '1', 'rank_score': 10,
+        'genes': [{'hgnc_id': hgnc_id, 'transcripts': [{'is_canonical': True}]}],
+        'samples': [{'sample_id': 'sample', 'allele_depths': [10, 5]}],
+    })
+    variant_obj = next(adapter.variants(case_obj['_id'], nr_of_variants=-1, projection='list'))
+
+    ## WHEN parsing the variant fetched with the list projection
+    parse_variant(adapter, institute_obj, case_obj, variant_obj, update=True)
+
+    ## THEN the symbol should be stored without removing the fields that were not fetched
+    stored = adapter.variant_collection.find_one({'_id': 'variant'})
+    assert stored['genes'][0]['hgnc_symbol'] == parsed_gene['hgnc_symbol']
+    assert stored['genes'][0]['transcripts'] == [{'is_canonical': True}]
+    assert stored['samples'] == [{'sample_id': 'sample', 'allele_depths': [10, 5]}]
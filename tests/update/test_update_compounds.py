@@ -102,3 +102,50 @@ def test_compounds_region(real_populated_database, case_obj, variant_clinical_fi
                 assert False
     assert nr_compounds > 0
     
+
+
+def test_update_case_compounds_threads(populated_database, case_obj, variant_clinical_file,
+                                       monkeypatch):
+    adapter = populated_database
+    # mongomock does not support unordered bulk writes and is not thread safe,
+    # so the updates are written when all threads are done
+    compound_requests = []
+    monkeypatch.setattr(adapter, '_write_compound_requests',
+                        lambda requests: compound_requests.extend(requests) or len(requests))
+    institute_id = adapter.institute_collection.find_one()['_id']
+
+    ## GIVEN a database with variants without updated compound information
+    vcf_obj = VCF(variant_clinical_file)
+    rank_results_header = parse_rank_results_header(vcf_obj)
+    vep_header = parse_vep_header(vcf_obj)
+    individual_positions = {ind: i for i, ind in enumerate(vcf_obj.samples)}
+    variants = []
+    for variant in vcf_obj:
+        parsed_variant = parse_variant(
+            variant=variant,
+            case=case_obj,
+            variant_type='clinical',
+            rank_results_header=rank_results_header,
+            vep_header=vep_header,
+            individual_positions=individual_positions,
+            category='snv',
+        )
+        variants.append(build_variant(variant=parsed_variant, institute_id=institute_id))
+    adapter.variant_collection.insert_many(variants)
+
+    ## WHEN updating the compounds with several threads
+    nr_updated = adapter.update_case_compounds(case_obj, threads=4)
+    adapter.variant_collection.bulk_write(compound_requests)
+
+    ## THEN the variants with compounds in coding regions should be updated
+    updated = [var for var in adapter.variant_collection.find()
+               if any('not_loaded' in comp for comp in var.get('compounds', []))]
+    assert nr_updated == len(updated) > 0
+    for var in updated:
+        for comp in var['compounds']:
+            if not comp['not_loaded']:
+                assert 'rank_score' in comp
+                assert set(comp['genes'][0]) == {
+                    'hgnc_id', 'hgnc_symbol', 'region_annotation', 'functional_annotation'}
+    ## THEN the other fields of the variants are kept
+    assert adapter.variant_collection.find_one({'_id': updated[0]['_id']})['samples']
@@ -0,0 +1,49 @@
+from scout.utils.coding_intervals import CodingIntervals
+
+
+def test_coding_intervals_merge_overlapping_genes():
+    ## GIVEN two overlapping genes and one separate gene
+    genes = [
+        {'chromosome': '1', 'start': 100000, 'end': 110000},
+        {'chromosome': '1', 'start': 50000, 'end': 60000},
+        {'chromosome': '1', 'start': 112000, 'end': 120000},
+    ]
+    ## WHEN building the coding intervals
+    intervals = CodingIntervals.from_genes(genes)
+
+    ## THEN the padded overlapping genes should be merged into one region
+    assert intervals.intervals('1') == [(45000, 65000), (95000, 125000)]
+    assert len(intervals) == 2
+
+
+def test_coding_intervals_region():
+    ## GIVEN coding intervals with two regions
+    genes = [
+        {'chromosome': '1', 'start': 10000, 'end': 20000},
+        {'chromosome': '1', 'start': 50000, 'end': 60000},
+    ]
+    intervals = CodingIntervals.from_genes(genes)
+
+    ## THEN variants should be mapped to the overlapping region
+    assert intervals.region('1', 5000, 5001) == ('1', 0)
+    assert intervals.region('1', 64999, 65000) == ('1', 1)
+    ## THEN intervals between or outside regions have no region
+    assert intervals.region('1', 25000, 25001) is None
+    assert intervals.region('1', 65000, 65001) is None
+    assert intervals.region('2', 15000, 15001) is None
+    ## THEN an interval that spans the gap is in the first region
+    assert intervals.region('1', 20000, 50000) == ('1', 0)
+
+
+def test_coding_intervals_documents():
+    ## GIVEN coding intervals
+    intervals = CodingIntervals.from_genes([
+        {'chromosome': 'X', 'start': 10000, 'end': 20000},
+    ])
+    ## WHEN converting to documents and back
+    documents = intervals.to_documents('37')
+    stored = CodingIntervals.from_documents(documents)
+
+    ## THEN the regions should be the same
+    assert documents[0]['build'] == '37'
+    assert stored.intervals('X') == intervals.intervals('X')
@@ -0,0 +1,34 @@
+from scout.utils.prefix_index import PrefixIndex
+
+
+def test_prefix_index_search():
+    ## GIVEN a prefix index with items on ranked keys
+    prefix_index = PrefixIndex([
+        ('first', [('ABCD', 1), ('XY', 0)]),
+        ('second', [('AB', 1)]),
+        ('third', [('ABC', 0), ('ABCDE', 0)]),
+    ])
+    assert len(prefix_index) == 3
+
+    ## WHEN searching for a prefix
+    ## THEN an exact key comes first, then items by rank and by length of the matching key
+    assert prefix_index.search('ab') == ['second', 'third', 'first']
+    assert prefix_index.search('ABC') == ['third', 'first']
+    assert prefix_index.search('abc', limit=1) == ['third']
+    ## THEN prefixes without keys give no items
+    assert prefix_index.search('b') == []
+    assert prefix_index.search(' ') == []
+
+
+def test_prefix_index_search_words():
+    ## GIVEN a prefix index with items on description words
+    prefix_index = PrefixIndex([
+        ('heart', [('abnormality', 1), ('of', 1), ('the', 1), ('heart', 1)]),
+        ('liver', [('abnormality', 0), ('of', 0), ('the', 0), ('liver', 0)]),
+    ])
+
+    ## WHEN searching for several words
+    ## THEN all words have to start a key of the item
+    assert prefix_index.search('abnorm') == ['liver', 'heart']
+    assert prefix_index.search('Abnorm  HEA') == ['heart']
+    assert prefix_index.search('abnorm kidney') == []